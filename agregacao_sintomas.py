@@ -0,0 +1,302 @@
+# agregacao_sintomas.py (Agregação genérica dos sintomas, com atualização incremental)
+#
+# Toda coluna de sintoma vira número (tipos de preprocessamento.py; numa escala
+# "3 From 10" o 10 fica como máximo da escala).
+# Para cada dimensão de agrupamento (qualquer coluna com poucos valores
+# distintos, inclusive os próprios sintomas) e cada sintoma é mantido um
+# histograma grupo x valor. Média, prevalência e quantis saem do histograma, e
+# linhas novas só somam contagens: anexar linhas ao CSV custa O(linhas novas).
+import io
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+from cache import LeituraLimitada, ler_anexo, origem_arquivo
+from importacao import modulo_tardio
+from preprocessamento import COLUNAS_ID, detectar_tipo, interpretar, normalizar_colunas_sintomas
+
+pd = modulo_tardio('pandas')
+
+ESTATISTICAS = ('media', 'prevalencia', 'quantil')
+MAX_GRUPOS = int(os.environ.get('SINTOMAS_MAX_GRUPOS', 50))
+TAMANHO_CHUNK = int(os.environ.get('SINTOMAS_CHUNK_SIZE', 200_000))
+
+# Prevalência = fração das linhas com valor acima do corte
+CORTE_PREVALENCIA = {'frequencia': 2, 'sim_nao': 0, 'numerica': 0}  # escala: metade do máximo
+
+
+def _rotulo(valor):
+    if isinstance(valor, (float, np.floating)) and float(valor).is_integer():
+        return str(int(valor))
+    return str(valor).strip()
+
+
+def _ordem_natural(rotulo):
+    # '2 From 10' antes de '10 From 10'
+    return [(0, int(p), '') if p.isdigit() else (1, 0, p) for p in re.split(r'(\d+)', rotulo)]
+
+
+class AgregadoSintomas:
+
+    def __init__(self, tipos, escalas, dimensoes):
+        self.tipos = dict(tipos)                 # sintoma -> tipo
+        self.escalas = dict(escalas)             # sintoma -> máximo da escala (tipo 'escala')
+        self.valores = {s: np.zeros(0) for s in self.tipos}        # domínio ordenado de cada sintoma
+        self.grupos = {d: [] for d in dimensoes}                   # rótulos na ordem de aparição
+        self.contagens = {d: np.zeros(0, dtype=np.int64) for d in dimensoes}
+        # hist[dimensão][sintoma]: (grupos, valores)
+        self.hist = {d: {s: np.zeros((0, 0), dtype=np.int64) for s in self.tipos} for d in dimensoes}
+        self.linhas = 0
+        self.origem = None
+        self._indices = {d: {} for d in dimensoes}
+
+    @classmethod
+    def esquema(cls, df):
+        # Tipos e dimensões decididos no primeiro bloco; blocos seguintes só somam
+        tipos, escalas, dimensoes = {}, {}, []
+        for col in df.columns:
+            if col in COLUNAS_ID:
+                continue
+            tipo, escala = detectar_tipo(df[col])
+            if tipo != 'categorica':
+                tipos[col] = tipo
+                if escala is not None:
+                    escalas[col] = escala
+            if df[col].nunique() <= MAX_GRUPOS:
+                dimensoes.append(col)
+        return cls(tipos, escalas, dimensoes)
+
+    def _codigos_grupo(self, dim, serie):
+        codigos, uniques = pd.factorize(serie)
+        indice, rotulos = self._indices[dim], self.grupos[dim]
+        remap = np.array([indice.setdefault(_rotulo(u), len(indice)) for u in uniques] + [-1], dtype=np.int64)
+        rotulos.extend(list(indice)[len(rotulos):])
+        novos = len(rotulos) - len(self.contagens[dim])
+        if novos > 0:
+            self.contagens[dim] = np.concatenate([self.contagens[dim], np.zeros(novos, dtype=np.int64)])
+            for s, h in self.hist[dim].items():
+                self.hist[dim][s] = np.vstack([h, np.zeros((novos, h.shape[1]), dtype=np.int64)])
+        return remap[codigos]
+
+    def _codigos_valor(self, sintoma, valores):
+        validos = ~np.isnan(valores)
+        dominio = self.valores[sintoma]
+        novos = np.setdiff1d(np.unique(valores[validos]), dominio)
+        if len(novos):
+            # Valor nunca visto: amplia o domínio e realoca as colunas dos histogramas
+            ampliado = np.union1d(dominio, novos)
+            posicoes = np.searchsorted(ampliado, dominio)
+            for dim in self.hist:
+                h = self.hist[dim][sintoma]
+                maior = np.zeros((h.shape[0], len(ampliado)), dtype=np.int64)
+                maior[:, posicoes] = h
+                self.hist[dim][sintoma] = maior
+            self.valores[sintoma] = dominio = ampliado
+        codigos = np.full(len(valores), -1, dtype=np.int64)
+        codigos[validos] = np.searchsorted(dominio, valores[validos])
+        return codigos
+
+    def adicionar(self, df):
+        # Soma as linhas de df (colunas já normalizadas); altera o próprio objeto
+        if not len(df):
+            return self
+        grupos = {d: self._codigos_grupo(d, df[d]) if d in df.columns else np.full(len(df), -1)
+                  for d in self.grupos}
+        valores = {s: self._codigos_valor(s, interpretar(df[s], t)) if s in df.columns
+                   else np.full(len(df), -1) for s, t in self.tipos.items()}
+
+        for dim, g in grupos.items():
+            presentes = g >= 0
+            n_grupos = len(self.grupos[dim])
+            self.contagens[dim] += np.bincount(g[presentes], minlength=n_grupos)
+            for s, v in valores.items():
+                n_valores = len(self.valores[s])
+                m = presentes & (v >= 0)
+                celula = g[m] * n_valores + v[m]
+                self.hist[dim][s] += np.bincount(celula, minlength=n_grupos * n_valores).reshape(n_grupos, n_valores)
+        self.linhas += len(df)
+        return self
+
+    def copia(self):
+        # Custo proporcional ao tamanho dos histogramas, não ao número de linhas
+        novo = AgregadoSintomas(self.tipos, self.escalas, list(self.grupos))
+        novo.valores = {s: v.copy() for s, v in self.valores.items()}
+        novo.grupos = {d: list(r) for d, r in self.grupos.items()}
+        novo._indices = {d: dict(i) for d, i in self._indices.items()}
+        novo.contagens = {d: c.copy() for d, c in self.contagens.items()}
+        novo.hist = {d: {s: h.copy() for s, h in hs.items()} for d, hs in self.hist.items()}
+        novo.linhas = self.linhas
+        novo.origem = dict(self.origem) if self.origem else None
+        return novo
+
+    # --- Serialização (JSON do armazém de artefatos) ---
+    def para_dict(self):
+        return {
+            "tipos": self.tipos,
+            "escalas": self.escalas,
+            "valores": {s: v.tolist() for s, v in self.valores.items()},
+            "grupos": self.grupos,
+            "contagens": {d: c.tolist() for d, c in self.contagens.items()},
+            "hist": {d: {s: h.tolist() for s, h in hs.items()} for d, hs in self.hist.items()},
+            "linhas": self.linhas,
+            "origem": self.origem,
+        }
+
+    @classmethod
+    def de_dict(cls, dados):
+        agregado = cls(dados["tipos"], dados["escalas"], list(dados["grupos"]))
+        for s, v in dados["valores"].items():
+            agregado.valores[s] = np.asarray(v, dtype=np.float64)
+        for d, rotulos in dados["grupos"].items():
+            agregado.grupos[d] = list(rotulos)
+            agregado._indices[d] = {r: i for i, r in enumerate(rotulos)}
+            agregado.contagens[d] = np.asarray(dados["contagens"][d], dtype=np.int64)
+            for s, h in dados["hist"][d].items():
+                agregado.hist[d][s] = np.asarray(h, dtype=np.int64).reshape(len(rotulos), len(agregado.valores[s]))
+        agregado.linhas = dados["linhas"]
+        agregado.origem = dados.get("origem")
+        return agregado
+
+    # --- Consultas ---
+    def faixa(self, sintoma):
+        tipo = self.tipos[sintoma]
+        if tipo == 'frequencia':
+            return 1.0, 4.0
+        if tipo == 'sim_nao':
+            return 0.0, 1.0
+        if tipo == 'escala':
+            return 0.0, self.escalas[sintoma]
+        v = self.valores[sintoma]
+        return (float(v[0]), float(v[-1])) if len(v) else (0.0, 0.0)
+
+    def opcoes(self):
+        return {
+            "dimensoes": list(self.grupos),
+            "sintomas": {s: {"tipo": t, "min": self.faixa(s)[0], "max": self.faixa(s)[1]}
+                         for s, t in self.tipos.items()},
+            "estatisticas": list(ESTATISTICAS),
+        }
+
+    def _estatistica(self, h, sintoma, estatistica, q):
+        v = self.valores[sintoma]
+        n = h.sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if estatistica == 'media':
+                resultado = h @ v / n
+            elif estatistica == 'prevalencia':
+                tipo = self.tipos[sintoma]
+                corte = self.escalas[sintoma] / 2 if tipo == 'escala' else CORTE_PREVALENCIA[tipo]
+                resultado = h[:, v > corte].sum(axis=1) / n
+            else:
+                # Quantil exato (menor valor com frequência acumulada >= q)
+                acumulado = h.cumsum(axis=1)
+                atingiu = (acumulado >= q * n[:, None]) & (acumulado > 0)
+                resultado = v[atingiu.argmax(axis=1)] if len(v) else np.full(len(n), np.nan)
+        return np.where(n > 0, resultado, np.nan)
+
+    def matriz(self, por='Expert Diagnose', estatistica='media', q=0.5, sintomas=None):
+        if por not in self.grupos:
+            raise ValueError(f"Dimensão '{por}' não existe. Opções: {list(self.grupos)}")
+        if estatistica not in ESTATISTICAS:
+            raise ValueError(f"Estatística '{estatistica}' não existe. Opções: {list(ESTATISTICAS)}")
+        if estatistica == 'quantil' and not 0 <= q <= 1:
+            raise ValueError("q deve estar entre 0 e 1.")
+        sintomas = list(sintomas) if sintomas else list(self.tipos)
+        desconhecidos = [s for s in sintomas if s not in self.tipos]
+        if desconhecidos:
+            raise ValueError(f"Sintoma(s) {desconhecidos} não existem. Opções: {list(self.tipos)}")
+
+        rotulos = self.grupos[por]
+        ordem = [i for i in sorted(range(len(rotulos)), key=lambda i: _ordem_natural(rotulos[i]))
+                 if self.contagens[por][i] > 0]
+        colunas = np.column_stack([self._estatistica(self.hist[por][s][ordem], s, estatistica, q)
+                                   for s in sintomas]) if sintomas and ordem else np.zeros((len(ordem), 0))
+        finitos = colunas[~np.isnan(colunas)]
+
+        resposta = {
+            "symptoms": sintomas,
+            "groups": [rotulos[i] for i in ordem],
+            "matrix": [[None if np.isnan(x) else float(x) for x in linha] for linha in colunas],
+            "min_val": min(0.0, float(finitos.min())) if len(finitos) else 0,
+            "max_val": float(finitos.max()) if len(finitos) else 0,
+            "por": por,
+            "estatistica": estatistica,
+            "linhas_por_grupo": [int(self.contagens[por][i]) for i in ordem],
+            "linhas": self.linhas,
+        }
+        if estatistica == 'quantil':
+            resposta["q"] = q
+        return resposta
+
+    # --- Arquivo de origem ---
+    def com_anexo(self, filename):
+        # Novo agregado com as linhas anexadas ao CSV desde a última leitura; o próprio
+        # objeto se nada mudou; None se o arquivo não é só uma extensão do que já foi lido
+        if not self.origem:
+            return None
+        anexo = ler_anexo(filename, self.origem)
+        if anexo is None:
+            return None
+        csv, origem = anexo
+        if csv is None:
+            return self
+
+        df = normalizar_colunas_sintomas(pd.read_csv(io.BytesIO(csv)))
+        novo = self.copia().adicionar(df)
+        novo.origem = origem
+        return novo
+
+
+def construir_agregado(filename, chunk_size=None):
+    inicio = time.perf_counter()
+    agregado = None
+    with open(filename, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        leitor = pd.read_csv(io.BufferedReader(LeituraLimitada(f, tamanho)), chunksize=chunk_size or TAMANHO_CHUNK)
+        for chunk in leitor:
+            chunk = normalizar_colunas_sintomas(chunk)
+            if agregado is None:
+                agregado = AgregadoSintomas.esquema(chunk)
+            agregado.adicionar(chunk)
+        if agregado is None:
+            return None
+        agregado.origem = origem_arquivo(f, tamanho)
+    print(f"[Sintomas] Agregado construído: {agregado.linhas} linhas, {len(agregado.tipos)} sintomas, "
+          f"{len(agregado.grupos)} dimensões em {time.perf_counter() - inicio:.2f}s.")
+    return agregado
+
+
+class AgregadorIncremental:
+    # Guarda o último agregado de um CSV; quando o arquivo só cresceu, soma as linhas
+    # novas num agregado novo (quem estiver lendo o anterior não é afetado)
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.agregado = None
+        self._lock = threading.Lock()
+
+    # Serializável (ex.: dataset despejado para o disco, ver datasets.py); o lock não vai junto
+    def __getstate__(self):
+        return {"filename": self.filename, "agregado": self.agregado}
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def sincronizar(self, carregar):
+        # carregar() -> agregado completo (ex.: do armazém de artefatos)
+        with self._lock:
+            if self.agregado is not None:
+                inicio = time.perf_counter()
+                novo = self.agregado.com_anexo(self.filename)
+                if novo is not None:
+                    if novo is not self.agregado:
+                        print(f"[Sintomas] +{novo.linhas - self.agregado.linhas} linhas somadas ao agregado "
+                              f"em {(time.perf_counter() - inicio) * 1000:.1f}ms (incremental).")
+                    self.agregado = novo
+                    return novo
+            self.agregado = carregar()
+            return self.agregado
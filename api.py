@@ -1,15 +1,92 @@
 # api.py (Unificado e Corrigido)
-import pandas as pd
 import numpy as np
 import os
-from fastapi import FastAPI, HTTPException
+import json
+import time
+import asyncio
+import functools
+from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
-from collections import Counter
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from coalescencia import ExecutorCoalescente
+from colunar import ler_tabela
+from atualizacao import AtualizadorBackground
+from datasets import RegistroDatasets
+from respostas import RespostaPronta, responder
+from cubo import CuboSegmentos
+from atribuicao import AtribuidorArquetipos, ler_registros
+from artefatos import ArmazemArtefatos, hash_conteudo
+from compartilhado import MEMORIA_COMPARTILHADA, ArmazemCompartilhado, devolver_memoria, limitar_arenas
+from linguistica import (METODO_KEYNESS, METODOS_KEYNESS, MIN_DF, NGRAMAS, ContadorTermos, IndicePalavras,
+                         construir_indice, normalizar_colunas_corpus)
+from fluxo_linguistica import METODO_FLUXO, FluxoPalavras
+from versoes import (ArmazemVersoes, agora_iso, diferenca_versoes, id_automatico, ler_clusters, ler_indice,
+                     ler_sintomas, partes_clusters, salvar_blocos_corpus, salvar_clusters, salvar_sintomas)
+from clusters_incremental import MINIBATCH_PARAMS, AjusteIncremental, ajustar_minibatch
+from preprocessamento import (ALVO_SINTOMAS, FEATURES_ARQUETIPOS, VERSAO_PREPROCESSAMENTO,
+                              preparar_lifestyle, preparar_sintomas)
+from metricas import ULTIMAS_METRICAS, MetricasEtapas, MiddlewareMetricas, registro as registro_metricas
+from agregacao_sintomas import AgregadoSintomas, AgregadorIncremental, construir_agregado
+from selecao_k import SELECAO_K_PARAMS, SELECAO_K_WORKERS, varrer_k
+from stopwords import FINAL_STOPS
+from vizinhos import MAX_CELULAS, VIZINHOS_K, VIZINHOS_MAX_K, IndiceVizinhos
+from importacao import IMPORTACAO_TARDIA, inicio_processo, modulo_tardio, modulos_carregados
+
+pd = modulo_tardio('pandas')
+
+ARQUIVO_ARQUETIPOS = 'mental_health_dataset.csv'
+ARQUIVO_SINTOMAS = 'Dataset-Mental-Disorders.csv'
+ARQUIVO_LINGUISTICA = 'Combined Data.csv'
+
+# Parâmetros do K-Means (fazem parte da chave do cache)
+CLUSTER_PARAMS = {"n_clusters": 3, "random_state": 42, "n_init": 10}
+
+# 'kmeans' (batch completo, padrão) ou 'minibatch' (CSV lido em blocos, ver clusters_incremental.py)
+CLUSTER_ENGINE = os.environ.get('CLUSTER_ENGINE', 'kmeans')
+
+# Número de clusters do dashboard: um inteiro ou 'auto' (melhor k da varredura, ver selecao_k.py)
+CLUSTER_K = os.environ.get('CLUSTER_K', str(CLUSTER_PARAMS["n_clusters"])).strip().lower()
+
+# Antes de qualquer thread: uma arena do malloc por processo (MALLOC_ARENAS, ver compartilhado.py)
+limitar_arenas()
+
+# Arrays dos artefatos mapeados (somente leitura) por todos os workers; MEMORIA_COMPARTILHADA=0 desliga
+armazem_compartilhado = ArmazemCompartilhado() if MEMORIA_COMPARTILHADA else None
+armazem = ArmazemArtefatos(compartilhado=armazem_compartilhado)
+atualizador = AtualizadorBackground(intervalo_verificacao=float(os.environ.get('REFRESH_INTERVALO', 5)),
+                                    ao_concluir=devolver_memoria)
+# Pool limitado para o trabalho de CPU das requisições; pedidos idênticos simultâneos viram um só
+calculos = ExecutorCoalescente()
+
+# Análises aquecidas antes das demais no arranque (separadas por vírgula; vazio = todas juntas)
+AQUECER_PRIMEIRO = [n for n in os.environ.get('AQUECER_PRIMEIRO', 'dashboard').split(',') if n.strip()]
+# Marcos do arranque do processo (epoch), para o relatório de /api/inicio
+ARRANQUE = {"processo": inicio_processo(), "api_importado": None, "servidor_pronto": None, "aquecimento": None}
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Opcional (AQUECIMENTO_WORKERS > 0): pré-calcula os artefatos em paralelo, um processo por
+    # análise. Desligado por padrão porque segura a subida até as três análises ficarem
+    # prontas; sem ele o dashboard sai primeiro e as demais seguem em segundo plano
+    workers = int(os.environ.get('AQUECIMENTO_WORKERS', 0))
+    if workers > 0:
+        from aquecimento import aquecer
+        ARRANQUE["aquecimento"] = {"workers": workers, **aquecer(workers)}
+    else:
+        print("[Aquecimento] Desligado (AQUECIMENTO_WORKERS=0): análises calculadas em segundo plano, "
+              f"{', '.join(AQUECER_PRIMEIRO) or 'todas'} primeiro.")
+    # As análises são calculadas em segundo plano; as requisições só leem snapshots
+    atualizador.iniciar(aquecer=True, primeiro=AQUECER_PRIMEIRO)
+    ARRANQUE["servidor_pronto"] = time.time()
+    yield
+    atualizador.parar()
+    datasets.encerrar()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configuração de CORS
 app.add_middleware(
@@ -20,84 +97,176 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Duração por rota (/metrics) e perfil por amostragem sob demanda: com o cabeçalho
+# X-Profile a resposta vira a pilha colapsada da requisição. Desligado por padrão (a pilha mostra
+# todas as threads do processo); PERFIL_HABILITADO=1 liga e PERFIL_TOKEN exige X-Profile: <token>
+app.add_middleware(MiddlewareMetricas, perfil_habilitado=os.environ.get('PERFIL_HABILITADO', '0') == '1',
+                   perfil_token=os.environ.get('PERFIL_TOKEN') or None)
+
 # ==========================================
 # PARTE 1: LÓGICA DE ARQUÉTIPOS (DASHBOARD)
 # ==========================================
-def process_clusters():
+def process_clusters(filename=ARQUIVO_ARQUETIPOS, params=None):
+    params = params or CLUSTER_PARAMS
+    metricas = MetricasEtapas("arquetipos")
     try:
         try:
-            # Tenta carregar o dataset de arquétipos
-            df = pd.read_csv('mental_health_dataset.csv')
+            # Tenta carregar o dataset de arquétipos (via cache colunar, sem parse do CSV)
+            with metricas.etapa("leitura"):
+                df = ler_tabela(filename)
             print("[Arquétipos] CSV carregado com sucesso.")
-            
-            df.columns = [c.strip().lower().replace(' ', '_').replace('-', '_') for c in df.columns]
-            
-            rename_map = {
-                'social_support_score': 'social_support',
-                'physical_activity_days': 'physical_activity_hours', 
-            }
-            df = df.rename(columns=rename_map)
-            df = df.dropna()
-            
-            le = LabelEncoder()
-            cat_cols = ['gender', 'employment_status', 'work_environment',
-                        'mental_health_history', 'seeks_treatment', 'mental_health_risk']
-            
-            for col in cat_cols:
-                if col in df.columns:
-                    df[col] = le.fit_transform(df[col].astype(str))
-                    
+            registro_metricas.definir_linhas(filename, "lidas", len(df))
+
+            # Colunas, dropna e códigos das categóricas (ver preprocessamento.py)
+            df = preparar_lifestyle(df, metricas=metricas)
+            registro_metricas.definir_linhas(filename, "validas", len(df))
+
         except FileNotFoundError:
-            print("[Arquétipos] ERRO: 'mental_health_dataset.csv' não encontrado.")
-            return None, None
+            print(f"[Arquétipos] ERRO: '{filename}' não encontrado.")
+            return None, None, None
 
-        features = ['sleep_hours', 'productivity_score', 'social_support', 
-                   'physical_activity_hours', 'stress_level']
-        
-        cols = [c for c in features if c in df.columns]
+        cols = [c for c in FEATURES_ARQUETIPOS if c in df.columns]
         if len(cols) < 5:
             print(f"[Arquétipos] AVISO: Colunas insuficientes. Usando: {cols}")
 
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(df[cols])
+        with metricas.etapa("kmeans"):
+            from sklearn.cluster import KMeans
+            from sklearn.preprocessing import StandardScaler
 
-        kmeans = KMeans(n_clusters=3, random_state=42, n_init=10)
-        df['Cluster'] = kmeans.fit_predict(X_scaled)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(df[cols])
 
-        summary = df.groupby('Cluster')[cols].mean()
+            kmeans = KMeans(**params)
+            df['Cluster'] = kmeans.fit_predict(X_scaled)
+
+        with metricas.etapa("agregacao"):
+            summary = df.groupby('Cluster')[cols].mean()
+        metricas.publicar()
         
-        return summary, df
+        return summary, df, (scaler, kmeans, cols)
 
     except Exception as e:
         print(f"[Arquétipos] Erro no processamento: {e}")
-        return None, None
+        return None, None, None
 
-@app.get("/api/dashboard-data")
-def get_dashboard_data():
-    summary, _ = process_clusters()
-    
+def calcular_modelo_clusters(filename=ARQUIVO_ARQUETIPOS, params=None):
+    # Tudo que o dashboard precisa, em arrays numpy (formato do armazém de artefatos)
+    summary, df, modelo = process_clusters(filename, params)
     if summary is None:
-        raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+        return None
+    scaler, kmeans, cols = modelo
+    return {
+        "cols": np.array(cols),
+        "cluster_ids": summary.index.to_numpy(dtype=np.int64),
+        "summary": summary.to_numpy(dtype=np.float64),
+        "scaler_mean": scaler.mean_,
+        "scaler_scale": scaler.scale_,
+        "centroids": kmeans.cluster_centers_,
+        "labels": df['Cluster'].to_numpy(dtype=np.int32),
+        "inertia": np.float64(kmeans.inertia_),
+    }
 
-    def get_val(row, col_name):
-        return float(row[col_name]) if col_name in row else 0.0
+def parametros_clusters(engine=None, n_clusters=None, ds=None):
+    # Tudo que influencia o ajuste; usado como chave do cache e dos artefatos
+    engine = engine or CLUSTER_ENGINE
+    if n_clusters is None:
+        n_clusters = k_configurado(engine, ds)
+    if engine == 'minibatch':
+        return {"engine": engine,
+                "n_clusters": n_clusters,
+                "random_state": CLUSTER_PARAMS["random_state"],
+                **MINIBATCH_PARAMS}
+    return {"engine": 'kmeans', **CLUSTER_PARAMS, "n_clusters": n_clusters}
 
-    try:
-        id_stressed = summary['stress_level'].idxmax()
-        remaining = [i for i in range(3) if i != id_stressed]
-        id_balanced = summary.loc[remaining, 'productivity_score'].idxmax() if remaining else 0
-        remaining_social = [i for i in remaining if i != id_balanced]
-        id_social = remaining_social[0] if remaining_social else (0 if id_stressed != 0 and id_balanced != 0 else 1)
-    except Exception as e:
-        print(f"Erro na classificação: {e}")
-        id_stressed, id_balanced, id_social = 0, 1, 2
+def k_configurado(engine=None, ds=None):
+    if CLUSTER_K != 'auto':
+        return int(CLUSTER_K)
+    selecao = obter_selecao_k(engine, ds)
+    return selecao["melhor_k"] if selecao else CLUSTER_PARAMS["n_clusters"]
 
-    cluster_map = {
-        id_stressed: {"name": "Estressado Isolado", "color": "hsl(0, 84%, 60%)", "desc": "Níveis críticos de estresse combinados com baixo suporte social."},
-        id_balanced: {"name": "Produtivo Sedentário", "color": "hsl(152, 69%, 40%)", "desc": "Alta performance profissional, mas baixa atividade física."},
-        id_social: {"name": "Social Disperso", "color": "hsl(38, 92%, 50%)", "desc": "Forte conexão social e física, mas produtividade reduzida."}
+def obter_selecao_k(engine=None, ds=None):
+    # Varredura de k (um ajuste por processo); cada ajuste também fica no armazém,
+    # então o modelo do k escolhido já está pronto quando o dashboard o pede
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["arquetipos"]
+    base = parametros_clusters(engine, n_clusters=0)
+    base.pop("n_clusters")
+    params = {**base, **SELECAO_K_PARAMS}
+    calcular = lambda: varrer_k(obter_modelo_clusters, arquivo, base,
+                                workers=SELECAO_K_WORKERS, **SELECAO_K_PARAMS)
+    return ds.cache.obter(
+        "selecao_k", arquivo, params,
+        lambda: armazem.obter_json("selecao_k", arquivo, params, calcular),
+    )
+
+def ajuste_clusters(ds, filename, params):
+    # Último ajuste mini-batch do dataset (um por conjunto de parâmetros); vive em ds.objetos,
+    # então acompanha o dataset quando ele é despejado para o disco
+    chave = "ajuste_clusters:" + json.dumps(params, sort_keys=True)
+    return ds.objetos.setdefault(chave, AjusteIncremental(filename, params))
+
+def obter_modelo_clusters(filename=ARQUIVO_ARQUETIPOS, params=None, ds=None):
+    # Lê o modelo do disco se já foi ajustado para este CSV + parâmetros. No modo mini-batch,
+    # com o dataset, linhas anexadas ao CSV atualizam o último ajuste em vez de refazê-lo
+    params = dict(params or parametros_clusters())
+    engine = params.pop("engine", 'kmeans')
+    if engine == 'minibatch' and ds is not None:
+        calcular = ajuste_clusters(ds, filename, params).sincronizar
+    elif engine == 'minibatch':
+        calcular = lambda: ajustar_minibatch(filename, **params)
+    else:
+        calcular = lambda: calcular_modelo_clusters(filename, params)
+    return armazem.obter_npz("clusters", filename, {"engine": engine, **params}, calcular)
+
+def resumo_de_modelo(modelo):
+    # {cluster: {coluna: média}} a partir dos arrays; não depende de pandas
+    cols = [str(c) for c in modelo["cols"]]
+    return {
+        int(idx): dict(zip(cols, (float(v) for v in linha)))
+        for idx, linha in zip(modelo["cluster_ids"], modelo["summary"])
     }
 
+# Arquétipos na ordem em que são atribuídos: cada um fica com o cluster restante
+# de maior (max) ou menor (min) média na coluna indicada. Com k=3 são os três originais.
+CATALOGO_ARQUETIPOS = [
+    ("stress_level", max, {"name": "Estressado Isolado", "color": "hsl(0, 84%, 60%)", "desc": "Níveis críticos de estresse combinados com baixo suporte social."}),
+    ("productivity_score", max, {"name": "Produtivo Sedentário", "color": "hsl(152, 69%, 40%)", "desc": "Alta performance profissional, mas baixa atividade física."}),
+    ("social_support", max, {"name": "Social Disperso", "color": "hsl(38, 92%, 50%)", "desc": "Forte conexão social e física, mas produtividade reduzida."}),
+    ("physical_activity_hours", max, {"name": "Ativo Físico", "color": "hsl(200, 80%, 48%)", "desc": "Maior volume de atividade física entre os perfis restantes."}),
+    ("sleep_hours", min, {"name": "Privado de Sono", "color": "hsl(270, 60%, 55%)", "desc": "Menos horas de sono entre os perfis restantes."}),
+    ("stress_level", min, {"name": "Tranquilo", "color": "hsl(180, 55%, 40%)", "desc": "Menor nível de estresse entre os perfis restantes."}),
+]
+
+def classificar_clusters(resumo):
+    # Ids dos clusters na ordem do catálogo (para qualquer k); os que sobrarem vão no fim
+    restantes = sorted(resumo)
+    ids = []
+    for coluna, escolher, _ in CATALOGO_ARQUETIPOS:
+        if not restantes:
+            break
+        escolhido = escolher(restantes, key=lambda i: resumo[i].get(coluna, 0.0))
+        ids.append(escolhido)
+        restantes.remove(escolhido)
+    return ids + restantes
+
+def mapa_arquetipos(ids):
+    mapa = {}
+    for pos, idx in enumerate(ids):
+        if pos < len(CATALOGO_ARQUETIPOS):
+            mapa[idx] = CATALOGO_ARQUETIPOS[pos][2]
+        else:
+            # Além do catálogo: nome genérico e matizes espaçados pelo ângulo áureo
+            mapa[idx] = {"name": f"Perfil {pos + 1}", "color": f"hsl({(pos * 137) % 360}, 65%, 50%)",
+                         "desc": "Perfil adicional encontrado pela seleção automática de k."}
+    return mapa
+
+def montar_dashboard(resumo, ids=None):
+    # ids: nomeação já decidida (ex.: a global, ao montar um recorte por segmento)
+    def get_val(row, col_name):
+        return float(row[col_name]) if col_name in row else 0.0
+
+    cluster_map = mapa_arquetipos(ids or classificar_clusters(resumo))
+
     radar_data = [
         {"metric": "Sono", "fullMark": 10},
         {"metric": "Produtividade", "fullMark": 10}, 
@@ -106,7 +275,7 @@ def get_dashboard_data():
         {"metric": "Estresse", "fullMark": 10},
     ]
 
-    for idx, row in summary.iterrows():
+    for idx, row in resumo.items():
         if idx not in cluster_map: continue
         name = cluster_map[idx]["name"]
         radar_data[0][name] = round(get_val(row, 'sleep_hours'), 1)
@@ -117,8 +286,8 @@ def get_dashboard_data():
 
     clusters_info = []
     for idx, info in cluster_map.items():
-        if idx not in summary.index: continue
-        row = summary.loc[idx]
+        if idx not in resumo: continue
+        row = resumo[idx]
         
         prod_val = get_val(row, 'productivity_score')
         stress_val = get_val(row, 'stress_level')
@@ -154,42 +323,228 @@ def get_dashboard_data():
 
     return {"radarData": radar_data, "clusters": clusters_info}
 
+def calcular_dashboard(filename=ARQUIVO_ARQUETIPOS, params=None, ds=None):
+    modelo = obter_modelo_clusters(filename, params, ds)
+    if modelo is None:
+        return None
+    return montar_dashboard(resumo_de_modelo(modelo))
+
+def obter_dashboard(ds=None):
+    # Serve o payload pronto; só reajusta o K-Means se o CSV ou os parâmetros mudarem
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["arquetipos"]
+    params = parametros_clusters(ds=ds)
+    return ds.cache.obter(
+        "dashboard", arquivo, params,
+        lambda: calcular_dashboard(arquivo, params, ds),
+    )
+
+def calcular_cubo(filename=ARQUIVO_ARQUETIPOS, params=None, ds=None):
+    # Somas/contagens por (cluster, segmento) a partir dos rótulos do modelo já ajustado
+    modelo = obter_modelo_clusters(filename, params, ds)
+    if modelo is None:
+        return None
+    df = preparar_lifestyle(ler_tabela(filename), codificar=False)
+    if len(df) != len(modelo["labels"]):
+        print("[Arquétipos] AVISO: rótulos do modelo não batem com o dataset; cubo não gerado.")
+        return None
+    cols = [str(c) for c in modelo["cols"]]
+    return CuboSegmentos.construir(df, modelo["labels"], cols, modelo["cluster_ids"]).para_arrays()
+
+def obter_cubo(ds=None):
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["arquetipos"]
+    params = parametros_clusters(ds=ds)
+    def calcular():
+        arrays = armazem.obter_npz("cubo", arquivo, params,
+                                   lambda: calcular_cubo(arquivo, params, ds))
+        if arrays is None:
+            return None
+        cubo = CuboSegmentos.de_arrays(arrays)
+        # Nomeação global: um segmento usa os mesmos nomes de arquétipo do dashboard geral
+        cubo.ids_arquetipos = classificar_clusters(cubo.consultar()[0])
+        return cubo
+    return ds.cache.obter("cubo", arquivo, params, calcular)
+
+@app.get("/api/dashboard-data")
+async def get_dashboard_data(
+    request: Request,
+    gender: list[str] = Query(None),
+    employment_status: list[str] = Query(None),
+    work_environment: list[str] = Query(None),
+    age: list[str] = Query(None, description="Faixas etárias, ex.: 25-34"),
+    dataset: str = None,
+):
+    ds = await abrir_dataset(dataset)
+    filtros = {dim: valores for dim, valores in {
+        "gender": gender, "employment_status": employment_status,
+        "work_environment": work_environment, "age": age,
+    }.items() if valores}
+
+    if filtros:
+        snapshot = await atualizador.obter_async(ds.analise("cubo"))
+        if snapshot is None:
+            raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+        chave = ("segmento", ds.id, snapshot.geracao, tuple(sorted((d, tuple(v)) for d, v in filtros.items())))
+        return await calculos.executar(chave, get_dashboard_segmento, snapshot.valor, filtros)
+
+    resposta = await responder_snapshot(ds, "dashboard", request)
+
+    if resposta is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+
+    return resposta
+
+def get_dashboard_segmento(cubo, filtros):
+    # Recorte por segmento: soma de células do cubo, sem reler o CSV nem reajustar
+    try:
+        resumo, linhas = cubo.consultar(filtros)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    data = montar_dashboard(resumo, cubo.ids_arquetipos)
+    data["segmento"] = {"filtros": filtros, "linhas": linhas}
+    return data
+
+@app.get("/api/dashboard-data/segmentos")
+async def get_segmentos(dataset: str = None):
+    # Valores aceitos em cada filtro de /api/dashboard-data
+    ds = await abrir_dataset(dataset)
+    snapshot = await atualizador.obter_async(ds.analise("cubo"))
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+    return snapshot.valor.opcoes()
+
+def obter_atribuidor(ds=None):
+    # Centróides + escala do modelo atual, com os nomes de arquétipo do dashboard
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["arquetipos"]
+    params = parametros_clusters(ds=ds)
+    def calcular():
+        modelo = obter_modelo_clusters(arquivo, params, ds)
+        if modelo is None:
+            return None
+        ids = classificar_clusters(resumo_de_modelo(modelo))
+        nomes = {idx: info["name"] for idx, info in mapa_arquetipos(ids).items()}
+        return AtribuidorArquetipos(modelo, nomes)
+    return ds.cache.obter("atribuidor", arquivo, params, calcular)
+
+def atribuir_registros(corpo, content_type, ds=None):
+    atribuidor = obter_atribuidor(ds)
+    if atribuidor is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+
+    inicio = time.perf_counter()
+    try:
+        X = atribuidor.matriz_de_registros(ler_registros(corpo, content_type))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Registros inválidos: {e}")
+
+    clusters, dist = atribuidor.atribuir_matriz(X)
+    resultado = {
+        "archetypes": atribuidor.nomes,
+        "count": len(clusters),
+        "results": atribuidor.resultados(clusters, dist),
+    }
+    corpo_resposta = json.dumps(resultado, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    segundos = time.perf_counter() - inicio
+    return Response(content=corpo_resposta, media_type='application/json', headers={
+        "X-Assign-Seconds": f"{segundos:.4f}",
+        "X-Records-Per-Second": f"{len(clusters) / segundos:.0f}" if segundos > 0 else "0",
+    })
+
+@app.post("/api/arquetipos/assign")
+async def atribuir_arquetipos(request: Request, dataset: str = None):
+    # Corpo: lista JSON de registros, NDJSON (application/x-ndjson) ou CSV (text/csv)
+    # Cada corpo é diferente: sem coalescência, só o limite do pool
+    ds = await abrir_dataset(dataset)
+    corpo = await request.body()
+    return await calculos.executar(None, atribuir_registros, corpo, request.headers.get('content-type'), ds)
+
+@app.get("/api/arquetipos/selecao-k")
+async def get_selecao_k(dataset: str = None):
+    # Inércia e silhouette de cada k avaliado + o k em uso no dashboard
+    ds = await abrir_dataset(dataset)
+    selecao = await calculos.executar(("selecao_k", ds.id), obter_selecao_k, None, ds)
+    if selecao is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de arquétipos.")
+    return {**selecao, "modo": CLUSTER_K, "k_em_uso": k_configurado(ds=ds)}
+
+@app.get("/api/cache-stats")
+async def get_cache_stats():
+    # Contadores do cache do dataset padrão (os de cada dataset estão em /api/datasets)
+    compartilhado = armazem_compartilhado.stats() if armazem_compartilhado else None
+    return {**cache_resultados.stats(), "calculos": calculos.stats(), "compartilhado": compartilhado}
+
+@app.get("/api/preprocessamento-metricas")
+async def get_preprocessamento_metricas():
+    # Tempo (e pico de memória, com PREPROCESSAMENTO_MEMORIA=1) de cada etapa da última execução
+    return ULTIMAS_METRICAS
+
+def metricas_caches():
+    # Séries calculadas na hora da coleta a partir dos contadores dos caches
+    def razao(acertos, total):
+        return round(acertos / total, 4) if total else 0.0
+
+    memoria = [({"dataset": ds.id, "cache": nome}, c)
+               for ds in datasets.conhecidos() for nome, c in ds.cache.stats()["por_nome"].items()]
+    por_dataset = datasets.stats()["datasets"]
+    disco = {tipo: dict(c) for tipo, c in sorted(armazem.contagens.items())}
+    return [
+        ("mindscape_cache_consultas_total", "counter", "Consultas ao cache em memória por resultado.",
+         [({**rotulos, "resultado": r}, n) for rotulos, c in memoria for r, n in c.items()]),
+        ("mindscape_cache_hit_ratio", "gauge", "Fração das consultas ao cache em memória atendidas sem recálculo.",
+         [(rotulos, razao(c["hits"], sum(c.values()))) for rotulos, c in memoria]),
+        ("mindscape_dataset_bytes", "gauge", "Bytes de cada dataset: no heap, mapeados de arquivo e despejados no disco.",
+         [({"dataset": d, "local": local}, s[campo]) for d, s in por_dataset.items()
+          for local, campo in (("heap", "bytes"), ("mapeado", "mapeado_bytes"), ("disco", "spill_bytes"))]),
+        ("mindscape_dataset_acessos_total", "counter", "Acessos a cada dataset: já em memória (hit) ou carregado (miss).",
+         [({"dataset": d, "resultado": r}, s[r]) for d, s in por_dataset.items() for r in ("hits", "misses")]),
+        ("mindscape_dataset_despejos_total", "counter", "Datasets despejados para o disco pelo orçamento de memória.",
+         [({"dataset": d}, s["despejos"]) for d, s in por_dataset.items()]),
+        ("mindscape_dataset_segundos_desde_acesso", "gauge", "Segundos desde o último acesso a cada dataset.",
+         [({"dataset": d}, s["segundos_desde_acesso"]) for d, s in por_dataset.items()
+          if s["segundos_desde_acesso"] is not None]),
+        ("mindscape_artefatos_consultas_total", "counter", "Artefatos carregados do disco ou recalculados.",
+         [({"tipo": tipo, "origem": o}, n) for tipo, c in disco.items() for o, n in c.items()]),
+        ("mindscape_artefatos_hit_ratio", "gauge", "Fração dos artefatos carregados do disco.",
+         [({"tipo": tipo}, razao(c["disco"], sum(c.values()))) for tipo, c in disco.items()]),
+        ("mindscape_calculos_total", "counter", "Cálculos das requisições executados ou coalescidos com um idêntico.",
+         [({"resultado": "executados"}, calculos.executados), ({"resultado": "coalescidos"}, calculos.coalescidos)]),
+    ]
+
+@app.get("/metrics")
+async def get_metrics():
+    # Texto do Prometheus: histogramas por etapa e por rota, linhas por dataset e acertos dos caches.
+    # No pool, como /api/datasets: datasets.stats() espera a trava do registro (presa durante
+    # um despejo/restauração) e mede os objetos
+    texto = await calculos.executar("metrics", lambda: registro_metricas.exportar(metricas_caches()))
+    return PlainTextResponse(texto, media_type="text/plain; version=0.0.4; charset=utf-8")
+
 
 # ==========================================
 # PARTE 2: LÓGICA DE SINTOMAS (HEATMAP) - CORRIGIDA (IDENTICA AO COLAB)
 # ==========================================
 # No arquivo: viniciushashizume/.../api.py
 
-def processar_sintomas():
+def processar_sintomas(filename=ARQUIVO_SINTOMAS):
     try:
-        filename = 'Dataset-Mental-Disorders.csv'
         if not os.path.exists(filename):
              print(f"[Sintomas] AVISO: '{filename}' não encontrado.")
              return None
 
-        # 1. Carregar CSV
-        df = pd.read_csv(filename)
-
-        if 'Patient Number' in df.columns:
-            df = df.drop('Patient Number', axis=1)
-
-        # 2. Renomear colunas (IGUAL AO COLAB)
-        # O Colab usa este mapa para corrigir os nomes. O API precisa dele também.
-        col_rename_map = {
-            'Euphoric': 'Euphoria',
-            'Sleep dissorder': 'Sleep_dissorder',
-            'Mood Swing': 'Mood_Swing',
-            'Suicidal thoughts': 'Suicidal_thoughts',
-            'Anorxia': 'Anorexia',
-            'Sexual Activity': 'Sexual_Activity'
-        }
-        df = df.rename(columns=col_rename_map)
+        metricas = MetricasEtapas("sintomas")
 
-        # 3. Mapas de Valores
-        freq_map = {'Seldom': 1, 'Sometimes': 2, 'Usually': 3, 'Most-Often': 4}
-        yes_no_map = {'YES': 1, 'NO': 0, 'YES ': 1} # 'YES ' com espaço p/ garantir
+        # 1. Carregar CSV (via cache colunar; texto chega como pd.Categorical)
+        with metricas.etapa("leitura"):
+            df = ler_tabela(filename)
+        registro_metricas.definir_linhas(filename, "lidas", len(df))
+
+        # 2-4. Renomear colunas (IGUAL AO COLAB), inferir o tipo de cada coluna e
+        # converter tudo para número numa passada (ver preprocessamento.py)
+        target = ALVO_SINTOMAS
+        df = preparar_sintomas(df, alvo=target, metricas=metricas)
 
-        target = 'Expert Diagnose'
         potential_symptoms = [
             'Sadness', 'Euphoria', 'Exhausted', 'Sleep_dissorder',
             'Mood_Swing', 'Suicidal_thoughts', 'Anorexia', 'Sexual_Activity'
@@ -201,35 +556,14 @@ def processar_sintomas():
         if not symptoms:
             return None
 
-        # 4. Conversão de Texto para Números
-        for col in df.columns:
-            if col == target:
-                continue
-
-            if df[col].dtype == 'object':
-                # Pega o primeiro valor válido para decidir qual mapa usar
-                try:
-                    first_val = df[col].dropna().iloc[0]
-                except IndexError:
-                    continue
-
-                if first_val in freq_map:
-                    df[col] = df[col].map(freq_map)
-                elif first_val in yes_no_map:
-                    df[col] = df[col].map(yes_no_map)
-                else:
-                    # Fallback
-                    le = LabelEncoder()
-                    df[col] = le.fit_transform(df[col].astype(str))
-
-        df = df.fillna(0)
-
         # 5. Agrupar e Calcular Média
-        symptom_matrix = df.groupby(target)[symptoms].mean()
+        with metricas.etapa("agregacao"):
+            symptom_matrix = df.groupby(target)[symptoms].mean()
 
-        # 6. Forçar a ordem das classes (Igual ao Colab)
-        class_labels = ['Bipolar Type-1', 'Bipolar Type-2', 'Depression', 'Normal']
-        symptom_matrix = symptom_matrix.reindex(class_labels, fill_value=0)
+            # 6. Forçar a ordem das classes (Igual ao Colab)
+            class_labels = ['Bipolar Type-1', 'Bipolar Type-2', 'Depression', 'Normal']
+            symptom_matrix = symptom_matrix.reindex(class_labels, fill_value=0)
+        metricas.publicar()
 
         return {
             "symptoms": list(symptom_matrix.columns),
@@ -243,108 +577,537 @@ def processar_sintomas():
         print(f"[Sintomas] Erro ao processar dataset: {e}")
         return None
 
+# Versão do pré-processamento na chave: payloads gravados com a codificação antiga não são reaproveitados
+PARAMS_SINTOMAS = {"preprocessamento": VERSAO_PREPROCESSAMENTO}
+
+def obter_sintomas_persistido(ds=None):
+    arquivo = (ds or datasets.padrao).arquivos["sintomas"]
+    return armazem.obter_json("sintomas", arquivo, PARAMS_SINTOMAS,
+                              lambda: processar_sintomas(arquivo))
+
+def obter_sintomas(ds=None):
+    # Memória -> disco -> recálculo, nessa ordem
+    ds = ds or datasets.padrao
+    return ds.cache.obter("sintomas", ds.arquivos["sintomas"], PARAMS_SINTOMAS,
+                          lambda: obter_sintomas_persistido(ds))
+
 @app.get("/api/sintomas-heatmap")
-def get_sintomas_heatmap():
-    data = processar_sintomas()
-    if data:
-        return data
-    return {"error": "Erro ao processar dados de sintomas. Verifique se 'Dataset-Mental-Disorders.csv' existe."}
+async def get_sintomas_heatmap(request: Request, dataset: str = None):
+    ds = await abrir_dataset(dataset)
+    resposta = await responder_snapshot(ds, "sintomas", request)
+    if resposta is not None:
+        return resposta
+    return {"error": f"Erro ao processar dados de sintomas. Verifique se '{ds.arquivos['sintomas']}' existe."}
+
+def agregador_sintomas(ds=None):
+    # Histogramas por (dimensão, sintoma); linhas anexadas ao CSV são somadas sem reler o arquivo
+    ds = ds or datasets.padrao
+    return ds.objetos.setdefault("agregador_sintomas", AgregadorIncremental(ds.arquivos["sintomas"]))
+
+def obter_agregado_sintomas(ds=None):
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["sintomas"]
+    if not os.path.exists(arquivo):
+        print(f"[Sintomas] AVISO: '{arquivo}' não encontrado.")
+        return None
+    def construir():
+        # None para CSV vazio ou só com cabeçalho
+        agregado = construir_agregado(arquivo)
+        return agregado.para_dict() if agregado else None
+    def carregar():
+        dados = armazem.obter_json("agregado_sintomas", arquivo, None, construir)
+        return AgregadoSintomas.de_dict(dados) if dados else None
+    return ds.cache.obter("agregado_sintomas", arquivo, None,
+                          lambda: agregador_sintomas(ds).sincronizar(carregar))
+
+@app.get("/api/sintomas-heatmap/agregado")
+async def get_sintomas_agregado(
+    por: str = 'Expert Diagnose',
+    estatistica: str = Query('media', description="media, prevalencia ou quantil"),
+    q: float = 0.5,
+    sintomas: list[str] = Query(None),
+    dataset: str = None,
+):
+    # Qualquer dimensão de agrupamento e estatística; todas as colunas de sintoma já numéricas
+    ds = await abrir_dataset(dataset)
+    snapshot = await atualizador.obter_async(ds.analise("sintomas_agregado"))
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de sintomas.")
+    chave = ("agregado", ds.id, snapshot.geracao, por, estatistica, q, tuple(sintomas or ()))
+    try:
+        return await calculos.executar(chave, snapshot.valor.matriz, por, estatistica, q, sintomas)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/sintomas-heatmap/opcoes")
+async def get_sintomas_opcoes(dataset: str = None):
+    ds = await abrir_dataset(dataset)
+    snapshot = await atualizador.obter_async(ds.analise("sintomas_agregado"))
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de sintomas.")
+    return snapshot.valor.opcoes()
+
+# Índice de vizinhos: matriz int8 dos sintomas, agrupada em células (ver vizinhos.py)
+PARAMS_VIZINHOS = {"preprocessamento": VERSAO_PREPROCESSAMENTO, "max_celulas": MAX_CELULAS}
+
+def obter_indice_vizinhos(ds=None):
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["sintomas"]
+    if not os.path.exists(arquivo):
+        print(f"[Sintomas] AVISO: '{arquivo}' não encontrado.")
+        return None
+    def calcular():
+        def construir():
+            indice = IndiceVizinhos.construir(ler_tabela(arquivo))
+            return indice.para_arrays() if indice else None
+        arrays = armazem.obter_npz("vizinhos", arquivo, PARAMS_VIZINHOS, construir)
+        return IndiceVizinhos.de_arrays(arrays) if arrays else None
+    return ds.cache.obter("vizinhos", arquivo, PARAMS_VIZINHOS, calcular)
+
+def buscar_vizinhos(indice, corpo, content_type, k):
+    inicio = time.perf_counter()
+    try:
+        consultas, informados = indice.codificar(ler_registros(corpo, content_type))
+    except (ValueError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Perfis inválidos: {e}")
+
+    resultado = {
+        "symptoms": indice.sintomas,
+        "k": k,
+        "count": len(consultas),
+        "results": indice.consultar(consultas, informados, k),
+    }
+    corpo_resposta = json.dumps(resultado, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    segundos = time.perf_counter() - inicio
+    return Response(content=corpo_resposta, media_type='application/json', headers={
+        "X-Search-Seconds": f"{segundos:.4f}",
+        "X-Queries-Per-Second": f"{len(consultas) / segundos:.0f}" if segundos > 0 else "0",
+    })
+
+@app.post("/api/sintomas/vizinhos")
+async def get_sintomas_vizinhos(request: Request, k: int = VIZINHOS_K, dataset: str = None):
+    # Corpo: um perfil {sintoma: valor}, lista de perfis, NDJSON ou CSV (como em /api/arquetipos/assign).
+    # Valores como no CSV ("Usually", "YES", "3 From 10") ou já numéricos; sintoma ausente não conta
+    if not 1 <= k <= VIZINHOS_MAX_K:
+        raise HTTPException(status_code=400, detail=f"k deve estar entre 1 e {VIZINHOS_MAX_K}.")
+    ds = await abrir_dataset(dataset)
+    snapshot = await atualizador.obter_async(ds.analise("vizinhos"))
+    if snapshot is None:
+        raise HTTPException(status_code=500, detail="Erro ao processar dados de sintomas.")
+    corpo = await request.body()
+    return await calculos.executar(None, buscar_vizinhos, snapshot.valor, corpo,
+                                   request.headers.get('content-type'), k)
 
 
 # ==========================================
 # PARTE 3: LÓGICA DE LINGUÍSTICA (NLP)
 # ==========================================
 
-def get_vocab_cleaned(texts, final_stops):
-    all_text = ' '.join(texts).lower()
-    raw_words = all_text.split()
-    cleaned_words = []
-    for w in raw_words:
-        clean_w = w.strip(".,!?:;\"'()[]{}*-")
-        if len(clean_w) > 2 and clean_w not in final_stops and clean_w.isalpha():
-            cleaned_words.append(clean_w)
-    return cleaned_words
+# Parâmetros do índice de palavras (chave do cache/artefatos)
+PARAMS_INDICE = {"stops": sorted(FINAL_STOPS), "ngramas": list(NGRAMAS), "min_df": MIN_DF}
 
 def analyze_distinctive_words_logic(df, class_a_label, class_b_label):
-    base_stops = set(ENGLISH_STOP_WORDS)
-    custom_stops = {
-        "me", "my", "myself", "i", "im", "i'm", "ive", "i've", "id", "i'd",
-        "its", "it's", "dont", "don't", "cant", "can't", "wont", "won't",
-        "didnt", "didn't", "doesnt", "doesn't", "isnt", "isn't", "arent", "aren't",
-        "wasnt", "wasn't", "werent", "weren't", "hasnt", "hasn't", "havent", "haven't",
-        "hadnt", "hadn't", "wouldnt", "wouldn't", "shouldnt", "shouldn't", "couldnt", "couldn't",
-        "thats", "that's", "theres", "there's", "heres", "here's", "whats", "what's",
-        "youre", "you're", "we're", "they're", "yall", "just", "really", "very", "like", 
-        "actually", "literally", "basically", "want", "know", "think", "going", "got", 
-        "get", "make", "time", "day", "people", "thing", "things", "said"
-    }
-    final_stops = base_stops.union(custom_stops)
+    final_stops = FINAL_STOPS
 
     texts_a = df[df['status'] == class_a_label]['clean_statement'].astype(str)
     texts_b = df[df['status'] == class_b_label]['clean_statement'].astype(str)
 
-    vocab_a = Counter(get_vocab_cleaned(texts_a, final_stops))
-    vocab_b = Counter(get_vocab_cleaned(texts_b, final_stops))
+    # Mesmo cálculo do índice: n-gramas + keyness (log-odds por padrão)
+    contador = ContadorTermos(final_stops)
+    contador.adicionar(str(class_a_label), texts_a)
+    contador.adicionar(str(class_b_label), texts_b)
+    return contador.indice().palavras_distintivas(str(class_a_label), str(class_b_label))
 
-    total_a = sum(vocab_a.values())
-    total_b = sum(vocab_b.values())
+def obter_indice_palavras(ds=None):
+    # Índice por classe: memória -> disco -> uma passada de tokenização no CSV
+    ds = ds or datasets.padrao
+    arquivo = ds.arquivos["linguistica"]
+    params = PARAMS_INDICE
+    def calcular():
+        arrays = armazem.obter_npz(
+            "indice_palavras", arquivo, params,
+            lambda: construir_indice(arquivo, FINAL_STOPS).para_arrays(),
+        )
+        return IndicePalavras.de_arrays(arrays)
+    return ds.cache.obter("indice_palavras", arquivo, params, calcular)
 
-    if total_a == 0 or total_b == 0:
-        return []
+def calcular_linguistica(ds=None):
+    # Índice + payload do endpoint; exceções viram erro no snapshot
+    ds = ds or datasets.padrao
+    filename = ds.arquivos["linguistica"]
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"Arquivo '{filename}' não encontrado.")
 
-    distinctive_score = {}
-    all_keys = set(vocab_a.keys()).union(set(vocab_b.keys()))
+    metricas = MetricasEtapas("linguistica")
+    with metricas.etapa("indice"):
+        indice = obter_indice_palavras(ds)
 
-    for word in all_keys:
-        freq_a = vocab_a.get(word, 0) / total_a
-        freq_b = vocab_b.get(word, 0) / total_b
-        score = (freq_a - freq_b) * 1000
-        distinctive_score[word] = score
+    diagnosticos_alvo = ['Depression', 'Anxiety', 'Suicidal', 'Stress', 'Bipolar']
+    base_normal = 'Normal'
+    
+    response_data = {}
 
-    top_a = sorted(distinctive_score.items(), key=lambda x: x[1], reverse=True)[:20]
-    result_data = [{"word": word, "score": round(score, 1)} for word, score in top_a if score > 0]
-    return result_data[:15]
+    with metricas.etapa("palavras_distintivas"):
+        # Todos os diagnósticos contra a base numa única conta vetorizada
+        response_data.update(indice.palavras_chave(diagnosticos_alvo, base_normal))
+    metricas.publicar()
 
-@app.get("/api/linguistica-data")
-def get_linguistica_data():
-    filename = 'Combined Data.csv'
-    if not os.path.exists(filename):
-        return {"error": f"Arquivo '{filename}' não encontrado."}
-    
-    try:
-        df = pd.read_csv(filename)
-        df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
-        
-        if 'statement' in df.columns and 'clean_statement' not in df.columns:
-            df['clean_statement'] = df['statement']
-            
-        if 'status' not in df.columns:
-             return {"error": "Coluna 'status' não encontrada no CSV."}
+    for classe, total in zip(indice.classes, indice.totais):
+        registro_metricas.definir("mindscape_corpus_palavras", "Palavras (sem stopwords) por classe no índice.",
+                                  ("dataset", "classe"), (ds.id, str(classe)), int(total))
 
-        df['clean_statement'] = df['clean_statement'].fillna('')
+    return {"indice": indice, "payload": response_data}
 
-        diagnosticos_alvo = ['Depression', 'Anxiety', 'Suicidal', 'Stress', 'Bipolar']
-        base_normal = 'Normal'
-        
-        response_data = {}
+@app.get("/api/linguistica-data")
+async def get_linguistica_data(request: Request, dataset: str = None):
+    ds = await abrir_dataset(dataset)
+    try:
+        resposta = await responder_snapshot(ds, "linguistica", request, lambda valor: valor["payload"])
+        if resposta is None:
+            return {"error": atualizador.erro(ds.analise("linguistica")) or "Erro ao processar dados linguísticos."}
+        return resposta
 
-        for diag in diagnosticos_alvo:
-            unique_statuses = df['status'].unique()
-            match = next((s for s in unique_statuses if str(s).lower() == diag.lower()), None)
-            match_normal = next((s for s in unique_statuses if str(s).lower() == base_normal.lower()), None)
-            
-            if match and match_normal:
-                words_data = analyze_distinctive_words_logic(df, match, match_normal)
-                response_data[diag] = words_data
-            else:
-                response_data[diag] = []
+    except Exception as e:
+        print(f"Erro NLP: {e}")
+        return {"error": str(e)}
 
-        return response_data
+@app.get("/api/linguistica-data/comparar")
+async def comparar_classes(response: Response, classe_a: str, classe_b: str = 'Normal', top: int = 15,
+                           metodo: str = None, dataset: str = None):
+    # Qualquer par de classes, não só diagnóstico vs Normal
+    ds = await abrir_dataset(dataset)
+    try:
+        snapshot = await servir_snapshot(ds.analise("linguistica"), response)
+        if snapshot is None:
+            return {"error": atualizador.erro(ds.analise("linguistica")) or "Erro ao processar dados linguísticos."}
+        indice = snapshot.valor["indice"]
+        for classe in (classe_a, classe_b):
+            if indice.resolver_classe(classe) is None:
+                raise HTTPException(status_code=404, detail=f"Classe '{classe}' não encontrada.")
+        metodo = metodo or METODO_KEYNESS
+        if metodo not in METODOS_KEYNESS:
+            raise HTTPException(status_code=400,
+                                detail=f"Método '{metodo}' desconhecido. Opções: {list(METODOS_KEYNESS)}")
+        top = max(1, top)
+        chave = ("comparar", ds.id, snapshot.geracao, classe_a.lower(), classe_b.lower(), top, metodo)
+        return {
+            "classe_a": classe_a,
+            "classe_b": classe_b,
+            "metodo": metodo,
+            "words": await calculos.executar(chave, indice.palavras_distintivas, classe_a, classe_b,
+                                             top=top, metodo=metodo),
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Erro NLP: {e}")
         return {"error": str(e)}
 
+# Modo contínuo: frases rotuladas chegam pela API e vão para resumos de tamanho
+# fixo (Count-Min + Space-Saving por classe), sem depender do CSV
+fluxo_palavras = FluxoPalavras(FINAL_STOPS)
+
+def ingerir_fluxo(corpo, content_type):
+    try:
+        df = normalizar_colunas_corpus(ler_registros(corpo, content_type))
+        ingeridas = fluxo_palavras.ingerir(df['status'].astype(str), df['clean_statement'].astype(str))
+    except (ValueError, KeyError, pd.errors.ParserError) as e:
+        raise HTTPException(status_code=400, detail=f"Registros inválidos: {e}")
+    stats = fluxo_palavras.stats()
+    for classe, c in stats["classes"].items():
+        registro_metricas.definir("mindscape_fluxo_documentos", "Frases ingeridas no modo contínuo por classe.",
+                                  ("classe",), (classe,), c["documentos"])
+    return {"ingeridas": ingeridas, **stats}
+
+@app.post("/api/linguistica-data/fluxo")
+async def post_fluxo(request: Request):
+    # Corpo: registros com 'status' e 'statement' (JSON, NDJSON ou CSV, como em /api/arquetipos/assign)
+    corpo = await request.body()
+    return await calculos.executar(None, ingerir_fluxo, corpo, request.headers.get('content-type'))
+
+@app.get("/api/linguistica-data/fluxo")
+async def get_fluxo():
+    # Mesmo formato de /api/linguistica-data, estimado pelos resumos, + limites de erro. O score
+    # é outro: o de frequência ((freq_a - freq_b) * 1000), o único com limite de erro pelos
+    # resumos; o de /api/linguistica-data é o z-score do log-odds (METODO_KEYNESS)
+    diagnosticos_alvo = ['Depression', 'Anxiety', 'Suicidal', 'Stress', 'Bipolar']
+    payload = await calculos.executar(None, fluxo_palavras.palavras_chave, diagnosticos_alvo, 'Normal')
+    return {"payload": payload, "metodo": METODO_FLUXO, **fluxo_palavras.stats()}
+
+@app.get("/api/linguistica-data/fluxo/comparar")
+async def comparar_classes_fluxo(classe_a: str, classe_b: str = 'Normal', top: int = 15):
+    for classe in (classe_a, classe_b):
+        if fluxo_palavras.resolver_classe(classe) is None:
+            raise HTTPException(status_code=404, detail=f"Classe '{classe}' não encontrada no fluxo.")
+    words = await calculos.executar(None, fluxo_palavras.palavras_distintivas, classe_a, classe_b, max(1, top))
+    return {"classe_a": classe_a, "classe_b": classe_b, "metodo": METODO_FLUXO, "words": words,
+            "limites": fluxo_palavras.limites()}
+
+# ==========================================
+# PARTE 3B: VERSÕES (EXPORTAÇÕES PERIÓDICAS)
+# ==========================================
+# Cada versão registra o resultado das três análises sobre os CSVs do momento,
+# em partições endereçadas por conteúdo (ver versoes.py)
+armazem_versoes = ArmazemVersoes()
+
+def partes_clusters_atuais(params, arquivo=ARQUIVO_ARQUETIPOS, ds=None):
+    modelo = obter_modelo_clusters(arquivo, params, ds)
+    if modelo is None:
+        return None
+    ids = classificar_clusters(resumo_de_modelo(modelo))
+    nomes = mapa_arquetipos(ids)
+    linha = {int(c): i for i, c in enumerate(modelo["cluster_ids"])}
+    tamanhos = np.bincount(modelo["labels"], minlength=max(linha) + 1)
+    return partes_clusters([nomes[i]["name"] for i in ids], [str(c) for c in modelo["cols"]],
+                           [modelo["summary"][linha[i]] for i in ids], [tamanhos[i] for i in ids])
+
+def registrar_versao(id_versao=None, rotulo=None, ds=None):
+    # Análise cujo CSV (+ parâmetros) já apareceu numa versão reaproveita as partições dela;
+    # clusters e sintomas vêm dos caminhos de sempre (armazém de artefatos incluído) e o
+    # corpus só tem tokenizados os blocos de linhas que ainda não estão guardados
+    inicio = time.perf_counter()
+    ds = ds or datasets.padrao
+    arquivos = ds.arquivos
+    fontes = {
+        "clusters": (arquivos["arquetipos"], parametros_clusters(ds=ds),
+                     lambda params: salvar_clusters(armazem_versoes,
+                                                    partes_clusters_atuais(params, arquivos["arquetipos"], ds))),
+        "sintomas": (arquivos["sintomas"], PARAMS_SINTOMAS,
+                     lambda _: salvar_sintomas(armazem_versoes, obter_sintomas_persistido(ds))),
+        "palavras": (arquivos["linguistica"], PARAMS_INDICE,
+                     lambda _: salvar_blocos_corpus(armazem_versoes, arquivos["linguistica"], FINAL_STOPS, NGRAMAS)[0]),
+    }
+    origens, partes, reaproveitadas = {}, {}, []
+    for analise, (arquivo, params, calcular) in fontes.items():
+        if not os.path.exists(arquivo):
+            origens[analise] = partes[analise] = None
+            continue
+        origens[analise] = hash_conteudo(arquivo, params)
+        partes[analise] = armazem_versoes.partes_de_origem(analise, origens[analise])
+        if partes[analise] is None:
+            partes[analise] = calcular(params)
+        else:
+            reaproveitadas.append(analise)
+
+    manifesto = armazem_versoes.registrar({
+        "id": id_versao or id_automatico(),
+        "rotulo": rotulo,
+        "criado_em": agora_iso(),
+        "dataset": ds.id,
+        "arquivos": {"clusters": arquivos["arquetipos"], "sintomas": arquivos["sintomas"],
+                     "palavras": arquivos["linguistica"]},
+        "origens": origens,
+        "min_df": MIN_DF,
+        "partes": partes,
+    })
+    print(f"[Versões] '{manifesto['id']}' registrada em {time.perf_counter() - inicio:.2f}s "
+          f"(reaproveitadas: {', '.join(reaproveitadas) or 'nenhuma'}).")
+    return manifesto
+
+@functools.lru_cache(maxsize=32)
+def montar_versao(id_versao):
+    # Versões são imutáveis: o payload montado de cada uma pode ficar em memória
+    manifesto = armazem_versoes.manifesto(id_versao)
+    if manifesto is None:
+        raise KeyError(id_versao)
+    partes = manifesto["partes"]
+    clusters = ler_clusters(armazem_versoes, partes["clusters"])
+    dashboard = None
+    if clusters is not None:
+        # Partição já na ordem do catálogo: a posição dá o mesmo nome de arquétipo
+        resumo = {i: c["metricas"] for i, c in enumerate(clusters.values())}
+        dashboard = {**montar_dashboard(resumo, list(resumo)),
+                     "sizes": {nome: c["tamanho"] for nome, c in clusters.items()}}
+    indice = ler_indice(armazem_versoes, partes["palavras"], manifesto["min_df"])
+    linguistica = None
+    if indice is not None:
+        linguistica = indice.palavras_chave(['Depression', 'Anxiety', 'Suicidal', 'Stress', 'Bipolar'], 'Normal')
+    return {
+        "id": manifesto["id"],
+        "rotulo": manifesto["rotulo"],
+        "criado_em": manifesto["criado_em"],
+        "dashboard": dashboard,
+        "sintomas": ler_sintomas(armazem_versoes, partes["sintomas"]),
+        "linguistica": linguistica,
+    }
+
+def _manifesto_ou_404(id_versao):
+    manifesto = armazem_versoes.manifesto(id_versao)
+    if manifesto is None:
+        raise HTTPException(status_code=404, detail=f"Versão '{id_versao}' não encontrada.")
+    return manifesto
+
+@app.post("/api/versoes")
+async def post_versao(id_versao: str = Query(None, alias="id"), rotulo: str = None, dataset: str = None):
+    # Registra os CSVs atuais (do dataset pedido) como uma nova versão (id padrão: data/hora UTC)
+    ds = await abrir_dataset(dataset)
+    try:
+        return await calculos.executar(("versao", id_versao) if id_versao else None,
+                                       registrar_versao, id_versao, rotulo, ds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/versoes")
+async def get_versoes(desde: str = None, ate: str = None, dataset: str = None):
+    # desde/ate: prefixos de data ISO (ex.: '2026-01' ou '2026-01-31'), comparados com criado_em.
+    # Versões anteriores aos datasets contam como do padrão
+    def listar():
+        versoes = [{**{k: m[k] for k in ("id", "rotulo", "criado_em", "origens")},
+                    "dataset": m.get("dataset", datasets.padrao.id)}
+                   for m in armazem_versoes.listar(desde, ate)]
+        if dataset:
+            versoes = [v for v in versoes if v["dataset"] == dataset]
+        return {"versoes": versoes, "armazenamento": armazem_versoes.stats()}
+    return await calculos.executar(("versoes", desde, ate, dataset), listar)
+
+@app.get("/api/versoes/{id_versao}")
+async def get_versao(id_versao: str):
+    _manifesto_ou_404(id_versao)
+    return await calculos.executar(("versao_payload", id_versao), montar_versao, id_versao)
+
+@app.get("/api/versoes/{versao_a}/diff/{versao_b}")
+async def get_diferenca_versoes(versao_a: str, versao_b: str, top: int = 15):
+    a, b = _manifesto_ou_404(versao_a), _manifesto_ou_404(versao_b)
+    return await calculos.executar(("versao_diff", versao_a, versao_b, top),
+                                   diferenca_versoes, armazem_versoes, a, b, max(1, top))
+
+# ==========================================
+# PARTE 4: ATUALIZAÇÃO EM SEGUNDO PLANO
+# ==========================================
+
+# Caches em memória que cada análise usa (limpos num refresh forçado)
+CACHES_POR_ANALISE = {
+    "dashboard": ["dashboard", "atribuidor", "selecao_k"],
+    "cubo": ["cubo"],
+    "sintomas": ["sintomas"],
+    "sintomas_agregado": ["agregado_sintomas"],
+    "vizinhos": ["vizinhos"],
+    "linguistica": ["indice_palavras"],
+}
+
+def analises_dataset(ds):
+    # Análises registradas no AtualizadorBackground para cada dataset (ver datasets.py)
+    arquetipos, sintomas, linguistica = (ds.arquivos[p] for p in ("arquetipos", "sintomas", "linguistica"))
+    return {
+        "dashboard": ([arquetipos], lambda: obter_dashboard(ds)),
+        "cubo": ([arquetipos], lambda: obter_cubo(ds)),
+        "sintomas": ([sintomas], lambda: obter_sintomas(ds)),
+        "sintomas_agregado": ([sintomas], lambda: obter_agregado_sintomas(ds)),
+        "vizinhos": ([sintomas], lambda: obter_indice_vizinhos(ds)),
+        "linguistica": ([linguistica], lambda: calcular_linguistica(ds)),
+    }
+
+# Os CSVs da raiz são o dataset padrão (análises com os nomes de sempre); outros datasets
+# ficam em DATASETS_DIR/<id>/, com os mesmos nomes de arquivo
+datasets = RegistroDatasets(atualizador, {"arquetipos": ARQUIVO_ARQUETIPOS, "sintomas": ARQUIVO_SINTOMAS,
+                                          "linguistica": ARQUIVO_LINGUISTICA}, analises_dataset)
+cache_resultados = datasets.padrao.cache
+
+# Segundos que o navegador pode reutilizar a resposta antes de revalidar com If-None-Match
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', 60))
+
+def _cabecalhos_snapshot(snapshot):
+    return {
+        "X-Generated-At": datetime.fromtimestamp(snapshot.gerado_em, timezone.utc).isoformat(),
+        "X-Generation": str(snapshot.geracao),
+    }
+
+async def servir_snapshot(nome, response):
+    # Último snapshot bom (cabeçalhos de quando foi gerado já na resposta); nunca recalcula
+    # no caminho da requisição (exceto na primeiríssima chamada, que espera o cálculo inicial)
+    snapshot = await atualizador.obter_async(nome)
+    if snapshot is None:
+        return None
+    response.headers.update(_cabecalhos_snapshot(snapshot))
+    return snapshot
+
+def serializar_snapshot(nome, valor):
+    with MetricasEtapas(nome, medir_memoria=False).etapa("serializacao"):
+        return RespostaPronta(valor)
+
+async def responder_snapshot(ds, analise, request, extrair=None):
+    # Como servir_snapshot, mas devolve os bytes já serializados (com ETag/304/gzip).
+    # Só a geração atual de cada análise fica guardada em ds.respostas
+    nome = ds.analise(analise)
+    snapshot = await atualizador.obter_async(nome)
+    if snapshot is None:
+        return None
+    pronta = ds.respostas.get(analise)
+    if pronta is None or pronta[0] != snapshot.geracao:
+        valor = extrair(snapshot.valor) if extrair else snapshot.valor
+        # Uma vez por geração do snapshot, fora do event loop
+        corpo = await calculos.executar(("resposta", nome, snapshot.geracao), serializar_snapshot, nome, valor)
+        pronta = (snapshot.geracao, corpo)
+        ds.respostas[analise] = pronta
+    return responder(request, pronta[1], CACHE_MAX_AGE, _cabecalhos_snapshot(snapshot))
+
+async def abrir_dataset(dataset):
+    # Dataset do parâmetro ?dataset= (None = padrão). Já em memória, só marca o uso;
+    # restaurar do disco ou despejar outros para caber no orçamento roda no pool
+    ds = datasets.obter(dataset)
+    if ds is None:
+        raise HTTPException(status_code=404, detail=f"Dataset '{dataset}' não encontrado.")
+    if not datasets.tocar(ds):
+        await calculos.executar(("dataset", ds.id), datasets.acessar, ds)
+    return ds
+
+def _invalidar_caches(nome):
+    ds, analise = datasets.da_analise(nome)
+    for cache_nome in CACHES_POR_ANALISE.get(analise, []):
+        ds.cache.invalidar(cache_nome)
+
+@app.post("/api/refresh")
+async def forcar_refresh(analise: str = None, esperar: bool = False, dataset: str = None):
+    # Sem dataset, vale para todos os já carregados
+    if analise is not None and analise not in CACHES_POR_ANALISE:
+        raise HTTPException(status_code=404, detail=f"Análise '{analise}' não existe.")
+    alvos = [await abrir_dataset(dataset)] if dataset else [d for d in datasets.conhecidos() if d.analises]
+    futuros = {}
+    for ds in alvos:
+        for nome in ([analise] if analise else ds.analises):
+            futuros.update(atualizador.forcar(ds.analise(nome), antes=_invalidar_caches))
+    if esperar:
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in futuros.values()))
+    return atualizador.status()
+
+@app.get("/api/refresh")
+async def get_refresh_status():
+    return atualizador.status()
+
+@app.get("/api/datasets")
+async def get_datasets():
+    # Tamanho em memória (heap e mapeado), hit rate e último acesso de cada dataset, para calibrar
+    # DATASETS_ORCAMENTO_MB; medir percorre os objetos, então roda no pool
+    return await calculos.executar("datasets", datasets.stats)
+
+def relatorio_arranque():
+    # Segundos desde o início do processo até cada marco (None = ainda não aconteceu)
+    base = ARRANQUE["processo"]
+
+    def desde_inicio(momento):
+        return round(momento - base, 3) if base is not None and momento is not None else None
+
+    return {
+        "importacao_tardia": IMPORTACAO_TARDIA,
+        "api_importado_s": desde_inicio(ARRANQUE["api_importado"]),
+        "servidor_pronto_s": desde_inicio(ARRANQUE["servidor_pronto"]),
+        # Duração de cada etapa do aquecimento (None = desligado)
+        "aquecimento_s": ARRANQUE["aquecimento"],
+        "primeira_geracao_s": {nome: desde_inicio(s["primeira_geracao_em"])
+                               for nome, s in atualizador.status().items()},
+        "modulos_pesados": {nome: {**info, "em": desde_inicio(info.get("em"))}
+                            for nome, info in modulos_carregados().items()},
+    }
+
+@app.get("/api/inicio")
+async def get_inicio():
+    return relatorio_arranque()
+
+ARRANQUE["api_importado"] = time.time()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
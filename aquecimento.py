@@ -0,0 +1,111 @@
+# aquecimento.py (Pré-cálculo paralelo dos artefatos na subida do serviço)
+#
+# As três análises são independentes, então cada uma roda num processo do
+# ProcessPoolExecutor; a tokenização do corpus ainda é dividida em shards (um
+# processo por shard) e as contagens de termos parciais são mescladas no processo pai.
+# O resultado vai para o armazém de artefatos, de onde o AtualizadorBackground
+# carrega tudo em seguida só lendo arquivos.
+#
+# Na API é opcional (AQUECIMENTO_WORKERS, padrão 0 = desligado): a subida espera
+# o aquecimento terminar, então o dashboard só responde depois da etapa mais lenta
+# (a linguística). Sem ele, o dashboard sai primeiro e o resto segue em segundo
+# plano. benchmarks/bench_aquecimento.py mede as duas coisas no hardware do deploy;
+# a duração de cada etapa também aparece em /api/inicio.
+#
+#   python aquecimento.py [--workers 8]
+#   (ou AQUECIMENTO_WORKERS=8 uvicorn api:app)
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import api
+from artefatos import hash_conteudo
+from compartilhado import contexto_processos
+from linguistica import MIN_DF, contar_termos_por_classe
+
+
+# Cada etapa é cronometrada a partir do próprio início (no processo que a roda), não do
+# início do aquecimento: tarefas na fila do pool não contam como tempo da etapa
+def _etapa_clusters():
+    # Inclui parametros_clusters(): com CLUSTER_K=auto é ali que a varredura de k roda
+    inicio = time.perf_counter()
+    api.obter_modelo_clusters(api.ARQUIVO_ARQUETIPOS, api.parametros_clusters())
+    return time.perf_counter() - inicio
+
+
+def _etapa_sintomas():
+    inicio = time.perf_counter()
+    api.obter_sintomas_persistido()
+    return time.perf_counter() - inicio
+
+
+def _shard_linguistica(shard, n_shards):
+    # Instantes de relógio (time.time) para o pai juntar os shards numa etapa só
+    inicio = time.time()
+    contador = contar_termos_por_classe(api.ARQUIVO_LINGUISTICA, api.FINAL_STOPS,
+                                        shard=shard, n_shards=n_shards)
+    return contador, inicio, time.time()
+
+
+def _indice_ja_persistido():
+    chave = hash_conteudo(api.ARQUIVO_LINGUISTICA, api.PARAMS_INDICE)
+    return os.path.exists(api.armazem.caminho("indice_palavras", chave, 'npz')), chave
+
+
+def aquecer(workers=None):
+    workers = max(1, workers or os.cpu_count() or 1)
+    inicio = time.perf_counter()
+    tempos = {}
+
+    # Filhos limpos (forkserver): roda de dentro do lifespan, com threads já criadas
+    with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_processos()) as executor:
+        etapas = {
+            executor.submit(_etapa_clusters): "clusters",
+            executor.submit(_etapa_sintomas): "sintomas",
+        }
+
+        shards = []
+        chave_indice = None
+        if os.path.exists(api.ARQUIVO_LINGUISTICA):
+            persistido, chave_indice = _indice_ja_persistido()
+            if not persistido:
+                # Os dois primeiros processos ficam com clusters/sintomas
+                n_shards = max(1, workers - 2)
+                shards = [executor.submit(_shard_linguistica, i, n_shards) for i in range(n_shards)]
+
+        for futuro in wait(etapas).done:
+            try:
+                tempos[etapas[futuro]] = futuro.result()
+            except Exception as e:
+                print(f"[Aquecimento] Etapa '{etapas[futuro]}' falhou: {e}")
+
+        if shards:
+            try:
+                resultados = [f.result() for f in shards]
+                t_mescla = time.time()
+                contador = resultados[0][0]
+                for parcial, _, _ in resultados[1:]:
+                    contador.mesclar(parcial)
+                indice = contador.indice(MIN_DF)
+                api.armazem.salvar_npz("indice_palavras", chave_indice, **indice.para_arrays())
+                # Do início do primeiro shard até o índice gravado
+                tempos["linguistica"] = time.time() - min(r[1] for r in resultados)
+                print(f"[Aquecimento] linguistica: {len(shards)} shards "
+                      f"(mais lento {max(r[2] - r[1] for r in resultados):.2f}s), "
+                      f"mescla {time.time() - t_mescla:.2f}s")
+            except Exception as e:
+                print(f"[Aquecimento] Etapa 'linguistica' falhou: {e}")
+
+    for nome, segundos in tempos.items():
+        print(f"[Aquecimento] {nome}: {segundos:.2f}s")
+    total = time.perf_counter() - inicio
+    print(f"[Aquecimento] Total (paralelo, {workers} processos): {total:.2f}s "
+          f"| soma das etapas: {sum(tempos.values()):.2f}s")
+    return {**tempos, "total": total}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    aquecer(parser.parse_args().workers)
@@ -1,18 +1,11 @@
-# --- DATASET 1: mental_health_dataset.csv (Fatores de Risco e Estilo de Vida) ---
-try:
-    df_lifestyle = pd.read_csv('mental_health_dataset.csv')
-
-    # Limpeza básica
-    df_lifestyle = df_lifestyle.dropna()
+import pandas as pd
 
-    # Codificação de variáveis categóricas (Gender, Employment, etc.)
-    le_lifestyle = LabelEncoder()
-    cat_cols_lifestyle = ['gender', 'employment_status', 'work_environment',
-                          'mental_health_history', 'seeks_treatment', 'mental_health_risk']
+from preprocessamento import preparar_lifestyle, preparar_sintomas
 
-    for col in cat_cols_lifestyle:
-        if col in df_lifestyle.columns:
-            df_lifestyle[col] = le_lifestyle.fit_transform(df_lifestyle[col].astype(str))
+# --- DATASET 1: mental_health_dataset.csv (Fatores de Risco e Estilo de Vida) ---
+try:
+    # Limpeza básica + codificação das categóricas (Gender, Employment, etc.), ver preprocessamento.py
+    df_lifestyle = preparar_lifestyle(pd.read_csv('mental_health_dataset.csv'))
 
     print("Dataset 1 (Lifestyle) Pré-processado. Shape:", df_lifestyle.shape)
 
@@ -21,30 +14,9 @@ except Exception as e:
 
 # --- DATASET 2: Dataset-Mental-Disorders.csv (Sintomas Clínicos) ---
 try:
-    df_clinical = pd.read_csv('Dataset-Mental-Disorders.csv')
-
-    # Remover coluna de ID se existir
-    if 'Patient Number' in df_clinical.columns:
-        df_clinical = df_clinical.drop('Patient Number', axis=1)
-
-    # Mapeamento manual para transformar texto em números (Ordem importa aqui)
-    freq_map = {'Seldom': 1, 'Sometimes': 2, 'Usually': 3, 'Most-Often': 4}
-    yes_no_map = {'YES': 1, 'NO': 0, 'YES ': 1} # Tratando espaços extras
-
-    # Aplicando mapeamentos
-    for col in df_clinical.columns:
-        if df_clinical[col].dtype == 'object':
-            # Tenta mapear frequência, se não der, tenta sim/não, se não, usa LabelEncoder
-            if df_clinical[col].iloc[0] in freq_map:
-                df_clinical[col] = df_clinical[col].map(freq_map)
-            elif df_clinical[col].iloc[0] in yes_no_map:
-                df_clinical[col] = df_clinical[col].map(yes_no_map)
-            else:
-                # Para a coluna alvo (Expert Diagnose) e outras mistas
-                le = LabelEncoder()
-                df_clinical[col] = le.fit_transform(df_clinical[col].astype(str))
-
-    df_clinical = df_clinical.fillna(0) # Tratar nulos residuais
+    # Remove o ID, converte frequência / sim-não / "X From 10" em números e codifica o
+    # diagnóstico (mesmos códigos do LabelEncoder), ver preprocessamento.py
+    df_clinical = preparar_sintomas(pd.read_csv('Dataset-Mental-Disorders.csv'), codificar_alvo=True)
     print("Dataset 2 (Clinical) Pré-processado. Shape:", df_clinical.shape)
 
 except Exception as e:
@@ -0,0 +1,127 @@
+# artefatos.py (Armazém em disco dos modelos e resumos já calculados)
+#
+# Cada artefato é gravado em DIRETORIO_ARTEFATOS com o nome
+#   <tipo>-v<versão>-<hash>.npz|.json
+# onde o hash cobre o conteúdo do CSV de origem e os parâmetros da análise.
+# Um worker novo só precisa ler esses arquivos (numpy/json), sem pandas nem sklearn.
+# Com um ArmazemCompartilhado, os .npz passam por ele: os workers mapeiam a mesma
+# cópia em vez de cada um carregar a sua (ver compartilhado.py).
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+VERSAO_ARTEFATOS = 1
+DIRETORIO_ARTEFATOS = os.environ.get('ARTEFATOS_DIR', '.artefatos')
+
+
+def hash_conteudo(filename, params=None, bloco=1 << 20):
+    h = hashlib.sha256()
+    h.update(f"v{VERSAO_ARTEFATOS}".encode())
+    h.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    with open(filename, 'rb') as f:
+        while True:
+            parte = f.read(bloco)
+            if not parte:
+                break
+            h.update(parte)
+    return h.hexdigest()[:32]
+
+
+def gravar_atomico(diretorio, destino, escrever):
+    # Grava num temporário e renomeia: outro worker nunca lê um arquivo pela metade
+    os.makedirs(diretorio, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=diretorio, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            escrever(f)
+        os.replace(tmp, destino)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class ArmazemArtefatos:
+
+    def __init__(self, diretorio=DIRETORIO_ARTEFATOS, compartilhado=None):
+        self.diretorio = diretorio
+        self.compartilhado = compartilhado
+        # tipo -> {"disco": carregados do disco, "calculados": recalculados}
+        self.contagens = {}
+
+    def caminho(self, tipo, chave, ext):
+        return os.path.join(self.diretorio, f"{tipo}-v{VERSAO_ARTEFATOS}-{chave}.{ext}")
+
+    def _gravar_atomico(self, destino, escrever):
+        gravar_atomico(self.diretorio, destino, escrever)
+
+    def salvar_npz(self, tipo, chave, **arrays):
+        destino = self.caminho(tipo, chave, 'npz')
+        self._gravar_atomico(destino, lambda f: np.savez(f, **arrays))
+        return destino
+
+    def carregar_npz(self, tipo, chave):
+        origem = self.caminho(tipo, chave, 'npz')
+        if not os.path.exists(origem):
+            return None
+        try:
+            with np.load(origem, allow_pickle=False) as dados:
+                return {k: dados[k] for k in dados.files}
+        except Exception as e:
+            print(f"[Artefatos] Ignorando '{origem}' corrompido: {e}")
+            return None
+
+    def salvar_json(self, tipo, chave, dados):
+        destino = self.caminho(tipo, chave, 'json')
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self._gravar_atomico(destino, lambda f: f.write(corpo))
+        return destino
+
+    def carregar_json(self, tipo, chave):
+        origem = self.caminho(tipo, chave, 'json')
+        if not os.path.exists(origem):
+            return None
+        try:
+            with open(origem, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[Artefatos] Ignorando '{origem}' corrompido: {e}")
+            return None
+
+    def _obter(self, tipo, filename, params, calcular, carregar, salvar, chave=None):
+        if not os.path.exists(filename):
+            return calcular()
+        chave = chave or hash_conteudo(filename, params)
+        dados = carregar(tipo, chave)
+        contagem = self.contagens.setdefault(tipo, {"disco": 0, "calculados": 0})
+        if dados is not None:
+            contagem["disco"] += 1
+            print(f"[Artefatos] '{tipo}' carregado do disco ({chave}).")
+            return dados
+        contagem["calculados"] += 1
+        dados = calcular()
+        if dados is not None:
+            try:
+                salvar(tipo, chave, dados)
+            except OSError as e:
+                # Sem permissão de escrita o serviço continua funcionando, só não persiste
+                print(f"[Artefatos] Não foi possível gravar '{tipo}': {e}")
+        return dados
+
+    def obter_npz(self, tipo, filename, params, calcular):
+        # calcular() deve devolver um dict de arrays numpy (ou None em caso de erro)
+        salvar = lambda t, c, d: self.salvar_npz(t, c, **d)
+        if self.compartilhado is None or not os.path.exists(filename):
+            return self._obter(tipo, filename, params, calcular, self.carregar_npz, salvar)
+        chave = hash_conteudo(filename, params)
+        # Mesmo CSV + parâmetros: uma versão nova substitui a anterior no diretório compartilhado
+        origem = f"{os.path.abspath(filename)}|{json.dumps(params or {}, sort_keys=True, default=str)}"
+        return self.compartilhado.obter(
+            tipo, chave, lambda: self._obter(tipo, filename, params, calcular, self.carregar_npz, salvar, chave),
+            origem)
+
+    def obter_json(self, tipo, filename, params, calcular):
+        return self._obter(tipo, filename, params, calcular, self.carregar_json, self.salvar_json)
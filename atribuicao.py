@@ -0,0 +1,81 @@
+# atribuicao.py (Atribuição de novos registros aos arquétipos já ajustados)
+#
+# Usa só os arrays do modelo persistido (média/escala do StandardScaler e
+# centróides do K-Means): padroniza, calcula a distância a cada centróide com
+# ||x||² - 2·x·c + ||c||² e escolhe o mais próximo. Processa em blocos de
+# tamanho fixo, então a memória cresce linearmente com o número de registros.
+import io
+import json
+
+import numpy as np
+
+from importacao import modulo_tardio
+from preprocessamento import normalizar_colunas_lifestyle
+
+pd = modulo_tardio('pandas')
+
+TAMANHO_BLOCO = 16_384
+
+
+class AtribuidorArquetipos:
+
+    def __init__(self, modelo, nomes):
+        # nomes: {cluster_id: nome do arquétipo}
+        self.cols = [str(c) for c in modelo["cols"]]
+        self.media = np.asarray(modelo["scaler_mean"], dtype=np.float64)
+        self.escala = np.asarray(modelo["scaler_scale"], dtype=np.float64)
+        self.centroides = np.asarray(modelo["centroids"], dtype=np.float64)
+        self._c2 = (self.centroides ** 2).sum(axis=1)
+        self.cluster_ids = np.arange(len(self.centroides))
+        self.nomes = [nomes.get(int(i), f"Cluster {int(i)}") for i in self.cluster_ids]
+
+    def distancias(self, X):
+        Xs = (X - self.media) / self.escala
+        d2 = (Xs ** 2).sum(axis=1)[:, None] - 2.0 * Xs @ self.centroides.T + self._c2
+        return np.sqrt(np.maximum(d2, 0.0))
+
+    def atribuir_matriz(self, X, bloco=TAMANHO_BLOCO):
+        # X: (n, len(cols)) em float64; linhas com NaN ficam com cluster -1
+        n = len(X)
+        clusters = np.full(n, -1, dtype=np.int64)
+        dist = np.full((n, len(self.centroides)), np.nan)
+        for ini in range(0, n, bloco):
+            parte = X[ini:ini + bloco]
+            validas = ~np.isnan(parte).any(axis=1)
+            if validas.any():
+                d = self.distancias(parte[validas])
+                idx = np.flatnonzero(validas) + ini
+                dist[idx] = d
+                clusters[idx] = d.argmin(axis=1)
+        return clusters, dist
+
+    def matriz_de_registros(self, df):
+        df = normalizar_colunas_lifestyle(df)
+        faltando = [c for c in self.cols if c not in df.columns]
+        if faltando:
+            raise ValueError(f"Colunas obrigatórias ausentes: {faltando}")
+        return df[self.cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+
+    def resultados(self, clusters, dist):
+        # Um dict por registro, na ordem de entrada; "distances" segue a ordem de self.nomes
+        nomes = self.nomes
+        vazio = {"cluster": None, "archetype": None, "distances": None}
+        return [
+            {"cluster": c, "archetype": nomes[c], "distances": linha} if c >= 0 else vazio
+            for c, linha in zip(clusters.tolist(), np.round(dist, 4).tolist())
+        ]
+
+
+def ler_registros(corpo, content_type):
+    # JSON (lista de objetos), NDJSON (um objeto por linha) ou CSV com cabeçalho
+    tipo = (content_type or 'application/json').split(';')[0].strip().lower()
+    if tipo in ('text/csv', 'application/csv'):
+        return pd.read_csv(io.BytesIO(corpo))
+    if tipo in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return pd.read_json(io.BytesIO(corpo), lines=True)
+    dados = json.loads(corpo or b'[]')
+    if isinstance(dados, dict):
+        dados = dados.get("records", [dados])
+    if not isinstance(dados, list):
+        raise ValueError("Envie uma lista de registros.")
+    return pd.DataFrame.from_records(dados)
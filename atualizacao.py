@@ -0,0 +1,223 @@
+# atualizacao.py (Recalculo das análises fora do caminho da requisição)
+#
+# Cada análise registrada tem um "snapshot": o último resultado bom, com a hora
+# e o número da geração. Os handlers só leem o snapshot; quando um CSV de origem
+# muda, o recalculo roda num pool de threads e o novo resultado substitui o
+# antigo de uma vez (troca de referência). Enquanto isso, quem chega recebe o
+# snapshot antigo (stale-while-revalidate).
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from cache import assinatura_arquivo
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    valor: object
+    gerado_em: float
+    geracao: int
+    assinatura: tuple
+
+
+class _Analise:
+
+    def __init__(self, nome, arquivos, calcular):
+        self.nome = nome
+        self.arquivos = list(arquivos)
+        self.calcular = calcular
+        self.snapshot = None
+        self.primeiro_em = None
+        self.futuro = None
+        self.geracao = 0
+        self.ultimo_erro = None
+        self.assinatura_falha = None
+        self.lock = threading.Lock()
+
+    def assinatura(self):
+        return tuple(assinatura_arquivo(f) for f in self.arquivos)
+
+
+class AtualizadorBackground:
+
+    def __init__(self, max_workers=3, intervalo_verificacao=5.0, ao_concluir=None):
+        self._analises = {}
+        # Chamado no worker depois de cada cálculo (ex.: devolver a memória temporária ao sistema)
+        self.ao_concluir = ao_concluir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self.intervalo_verificacao = intervalo_verificacao
+        self._parar = threading.Event()
+        self._vigia = None
+
+    def registrar(self, nome, arquivos, calcular):
+        # calcular() devolve o resultado; None ou exceção = falha (mantém o snapshot anterior)
+        self._analises[nome] = _Analise(nome, arquivos, calcular)
+
+    def nomes(self):
+        return list(self._analises)
+
+    def registrada(self, nome):
+        return nome in self._analises
+
+    def snapshot(self, nome):
+        # Snapshot atual sem agendar nada (None = ainda não calculado ou descartado)
+        return self._analises[nome].snapshot
+
+    def ocupada(self, nome):
+        futuro = self._analises[nome].futuro
+        return futuro is not None and not futuro.done()
+
+    def descartar(self, nome):
+        # Tira o snapshot da memória e o devolve; o próximo obter() recalcula, a menos
+        # que ele volte antes por restaurar()
+        analise = self._analises[nome]
+        with analise.lock:
+            snapshot, analise.snapshot = analise.snapshot, None
+        return snapshot
+
+    def restaurar(self, nome, snapshot):
+        # Devolve um snapshot descartado; se já houver um recalculado nesse meio-tempo, vale o novo.
+        # Arquivo alterado desde então é percebido pelo vigia como em qualquer snapshot
+        analise = self._analises[nome]
+        with analise.lock:
+            if analise.snapshot is None and snapshot is not None:
+                analise.snapshot = snapshot
+                analise.geracao = max(analise.geracao, snapshot.geracao)
+
+    def _executar(self, analise, assinatura, antes):
+        inicio = time.perf_counter()
+        try:
+            if antes is not None:
+                antes()
+            valor = analise.calcular()
+            if valor is None:
+                raise RuntimeError("cálculo não retornou resultado")
+        except Exception as e:
+            analise.ultimo_erro = str(e)
+            analise.assinatura_falha = assinatura
+            print(f"[Refresh] '{analise.nome}' falhou, mantendo o último snapshot: {e}")
+            return analise.snapshot
+        finally:
+            if self.ao_concluir is not None:
+                self.ao_concluir()
+
+        analise.geracao += 1
+        snapshot = Snapshot(valor, time.time(), analise.geracao, assinatura)
+        analise.snapshot = snapshot
+        if analise.primeiro_em is None:
+            analise.primeiro_em = snapshot.gerado_em
+        analise.ultimo_erro = None
+        analise.assinatura_falha = None
+        print(f"[Refresh] '{analise.nome}' geração {analise.geracao} pronta "
+              f"em {time.perf_counter() - inicio:.2f}s.")
+        return snapshot
+
+    def agendar(self, nome, antes=None):
+        # Dispara um recalculo (se já não houver um em andamento) e devolve o Future
+        analise = self._analises[nome]
+        with analise.lock:
+            if analise.futuro is not None and not analise.futuro.done():
+                return analise.futuro
+            analise.futuro = self._executor.submit(self._executar, analise, analise.assinatura(), antes)
+            return analise.futuro
+
+    def _precisa_revalidar(self, analise):
+        # Arquivo mudou desde o snapshot (e essa versão ainda não falhou antes)
+        atual = analise.assinatura()
+        return analise.snapshot.assinatura != atual and analise.assinatura_falha != atual
+
+    def obter(self, nome, esperar=True):
+        analise = self._analises[nome]
+        snapshot = analise.snapshot
+
+        if snapshot is None:
+            # Ainda não existe nenhum resultado: só resta esperar o primeiro cálculo
+            futuro = self.agendar(nome)
+            return futuro.result() if esperar else None
+
+        if self._precisa_revalidar(analise):
+            # Serve o antigo e revalida em segundo plano
+            self.agendar(nome)
+        return snapshot
+
+    async def obter_async(self, nome):
+        # Como obter(), mas a espera pelo primeiro cálculo não prende nenhuma thread:
+        # todas as requisições aguardam o mesmo Future do recalculo
+        snapshot = self.obter(nome, esperar=False)
+        if snapshot is None:
+            snapshot = await asyncio.wrap_future(self.agendar(nome))
+        return snapshot
+
+    def forcar(self, nome=None, esperar=False, antes=None):
+        # antes(nome) roda no worker antes do cálculo (ex.: invalidar caches em memória)
+        nomes = [nome] if nome else self.nomes()
+        futuros = {n: self.agendar(n, (lambda n=n: antes(n)) if antes else None) for n in nomes}
+        if esperar:
+            for futuro in futuros.values():
+                futuro.result()
+        return futuros
+
+    def erro(self, nome):
+        return self._analises[nome].ultimo_erro
+
+    def status(self):
+        resultado = {}
+        for nome, analise in list(self._analises.items()):
+            snapshot = analise.snapshot
+            resultado[nome] = {
+                "geracao": snapshot.geracao if snapshot else analise.geracao,
+                "gerado_em": snapshot.gerado_em if snapshot else None,
+                "primeira_geracao_em": analise.primeiro_em,
+                "desatualizado": bool(snapshot and snapshot.assinatura != analise.assinatura()),
+                "recalculando": bool(analise.futuro and not analise.futuro.done()),
+                "ultimo_erro": analise.ultimo_erro,
+            }
+        return resultado
+
+    # --- Vigia de arquivos ---
+    def _vigiar(self):
+        while not self._parar.wait(self.intervalo_verificacao):
+            # Cópia: datasets novos registram análises de outras threads (ver datasets.py)
+            for nome, analise in list(self._analises.items()):
+                if analise.snapshot is not None and self._precisa_revalidar(analise):
+                    print(f"[Refresh] Arquivo de '{nome}' mudou, recalculando.")
+                    self.agendar(nome)
+
+    def _aquecer(self, primeiro):
+        # As de 'primeiro' sozinhas no pool; as demais só quando todas elas terminarem
+        # (no arranque, o dashboard não disputa o GIL com o import do pandas das outras)
+        primeiras = [n for n in primeiro if n in self._analises]
+        restantes = [n for n in list(self._analises) if n not in primeiras]
+        if not primeiras:
+            for nome in restantes:
+                self.agendar(nome)
+            return
+        pendentes = [len(primeiras)]
+        lock = threading.Lock()
+
+        def concluida(_):
+            with lock:
+                pendentes[0] -= 1
+                ultima = pendentes[0] == 0
+            if ultima and not self._parar.is_set():
+                for nome in restantes:
+                    self.agendar(nome)
+
+        for nome in primeiras:
+            self.agendar(nome).add_done_callback(concluida)
+
+    def iniciar(self, aquecer=True, primeiro=()):
+        if aquecer:
+            self._aquecer(primeiro)
+        if self._vigia is None:
+            self._parar.clear()
+            self._vigia = threading.Thread(target=self._vigiar, name='refresh-vigia', daemon=True)
+            self._vigia.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._vigia is not None:
+            self._vigia.join(timeout=1)
+            self._vigia = None
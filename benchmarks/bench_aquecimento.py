@@ -0,0 +1,90 @@
+# benchmarks/bench_aquecimento.py
+#
+# Arranque a frio (sem artefatos, cache colunar nem memória compartilhada) com o
+# aquecimento paralelo desligado (AQUECIMENTO_WORKERS=0) e ligado com N processos.
+# Processo novo a cada rodada; do /api/inicio saem:
+#   - servidor pronto: fim do lifespan (com aquecimento, ele espera as etapas)
+#   - dashboard / todas: primeira geração do snapshot do dashboard e da última análise
+#   - a duração de cada etapa do aquecimento, medida a partir do início da própria etapa
+# O número de núcleos vai no relatório: com um só, os processos do aquecimento
+# disputam a mesma CPU e ele não tem como ganhar.
+#
+#   python benchmarks/bench_aquecimento.py [--linhas 200000] [--workers 0 3] [--rodadas 3]
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.suite import gerar_dados  # noqa: E402
+
+PASTAS = {'ARTEFATOS_DIR': '.artefatos', 'COLUNAR_DIR': '.colunar',
+          'COMPARTILHADO_DIR': '.compartilhado', 'VERSOES_DIR': '.versoes'}
+
+# Espera todas as análises terem a primeira geração (ou falharem) e grava o /api/inicio
+FILHO = """
+import json, os, time
+import api
+from fastapi.testclient import TestClient
+with TestClient(api.app) as cliente:
+    while True:
+        status = cliente.get('/api/refresh').json()
+        if all(s['primeira_geracao_em'] or s['ultimo_erro'] for s in status.values()):
+            break
+        time.sleep(0.02)
+    inicio = cliente.get('/api/inicio').json()
+with open(os.environ['BENCH_RESULTADO'], 'w') as f:
+    json.dump(inicio, f)
+"""
+
+
+def partida_fria(diretorio, workers):
+    for pasta in PASTAS.values():
+        shutil.rmtree(os.path.join(diretorio, pasta), ignore_errors=True)
+    env = dict(os.environ, PYTHONPATH=RAIZ, REFRESH_INTERVALO='3600', AQUECIMENTO_WORKERS=str(workers),
+               BENCH_RESULTADO=os.path.join(diretorio, 'resultado.json'),
+               **{var: os.path.join(diretorio, pasta) for var, pasta in PASTAS.items()})
+    subprocess.run([sys.executable, '-c', FILHO], cwd=diretorio, env=env, capture_output=True, check=True)
+    with open(env['BENCH_RESULTADO']) as f:
+        inicio = json.load(f)
+    geracoes = [s for s in inicio['primeira_geracao_s'].values() if s is not None]
+    return {
+        "pronto": inicio['servidor_pronto_s'],
+        "dashboard": inicio['primeira_geracao_s'].get('dashboard'),
+        "todas": max(geracoes) if geracoes else None,
+        "etapas": inicio.get('aquecimento_s') or {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 3])
+    parser.add_argument('--rodadas', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gerar_dados(tmp, args.linhas)
+        print(f"\n{args.linhas:,} linhas por CSV, {os.cpu_count()} núcleo(s), mediana de {args.rodadas} rodadas")
+        print(f"{'workers':>8} {'pronto':>9} {'dashboard':>10} {'todas':>9}   etapas do aquecimento")
+        for workers in args.workers:
+            inicio = time.perf_counter()
+            rodadas = [partida_fria(tmp, workers) for _ in range(args.rodadas)]
+            mediana = {c: float(np.median([r[c] for r in rodadas])) for c in ('pronto', 'dashboard', 'todas')}
+            etapas = {nome: float(np.median([r['etapas'].get(nome, np.nan) for r in rodadas]))
+                      for nome in rodadas[0]['etapas'] if nome != 'workers'}
+            texto = ', '.join(f"{nome} {s:.2f}s" for nome, s in etapas.items()) or '-'
+            print(f"{workers:>8} {mediana['pronto']:>8.2f}s {mediana['dashboard']:>9.2f}s "
+                  f"{mediana['todas']:>8.2f}s   {texto}   ({time.perf_counter() - inicio:.0f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_atribuicao.py
+#
+# Vazão da atribuição de arquétipos: núcleo vetorizado e o endpoint
+# /api/arquetipos/assign (cliente ASGI em processo, sem rede) em JSON, NDJSON e CSV.
+#
+#   python benchmarks/bench_atribuicao.py [--registros 100000]
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+from benchmarks.dados_sinteticos import gerar_lifestyle  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--registros', type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = gerar_lifestyle(args.registros)
+    atribuidor = api.obter_atribuidor()
+
+    X = atribuidor.matriz_de_registros(df.copy())
+    tracemalloc.start()
+    t = time.perf_counter()
+    clusters, dist = atribuidor.atribuir_matriz(X)
+    t_nucleo = time.perf_counter() - t
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Núcleo vetorizado: {args.registros:,} registros em {t_nucleo * 1000:.1f}ms "
+          f"({args.registros / t_nucleo:,.0f} registros/s, pico {pico / 2**20:.1f} MiB)")
+
+    # Referência ingênua: uma linha por vez
+    amostra = min(2_000, args.registros)
+    t = time.perf_counter()
+    for linha in X[:amostra]:
+        Xs = (linha - atribuidor.media) / atribuidor.escala
+        int(np.argmin([np.linalg.norm(Xs - c) for c in atribuidor.centroides]))
+    t_loop = (time.perf_counter() - t) / amostra * args.registros
+    print(f"Laço linha a linha (estimado): {t_loop * 1000:.0f}ms ({args.registros / t_loop:,.0f} registros/s)")
+
+    from fastapi.testclient import TestClient
+    corpos = {
+        'application/json': json.dumps(df.to_dict(orient='records')).encode(),
+        'application/x-ndjson': df.to_json(orient='records', lines=True).encode(),
+        'text/csv': df.to_csv(index=False).encode(),
+    }
+    with TestClient(api.app) as cliente:
+        for tipo, corpo in corpos.items():
+            t = time.perf_counter()
+            r = cliente.post('/api/arquetipos/assign', content=corpo, headers={'Content-Type': tipo})
+            total = time.perf_counter() - t
+            assert r.status_code == 200, r.text
+            print(f"Endpoint {tipo:22s}: {total * 1000:7.0f}ms ponta a ponta "
+                  f"({args.registros / total:,.0f} registros/s; "
+                  f"núcleo {r.headers['X-Records-Per-Second']} registros/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_compartilhado.py
+#
+# Memória de N workers com os snapshots carregados (dashboard, cubo, sintomas,
+# agregado, índice de palavras), com e sem o armazém compartilhado
+# (MEMORIA_COMPARTILHADA=1/0). Os artefatos .npz já estão no disco; cada worker é
+# um processo novo que importa o api e calcula os snapshots, e todos ficam vivos
+# até o pai ler o /proc/<pid>/smaps de cada um:
+#   - PSS total (páginas compartilhadas divididas entre quem as mapeia): a
+#     memória real ocupada pelo conjunto
+#   - PSS dos arrays mapeados do armazém compartilhado
+#   - dados: PSS total acima do de N workers vazios (só o import do api e das
+#     bibliotecas que os snapshots puxam), que é o piso de cada processo
+# Com o armazém, o custo dos dados fica igual para 1 ou 16 workers; sem ele,
+# cresce com o número de workers.
+#
+#   python benchmarks/bench_compartilhado.py [--linhas 500000] [--workers 16]
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.suite import gerar_dados  # noqa: E402
+
+# Processo worker: carrega todos os snapshots (ou só as bibliotecas, no worker vazio),
+# avisa que está pronto e espera ser encerrado
+WORKER = """
+import os, sys, time
+import api
+falhas = {}
+if sys.argv[2] == 'vazio':
+    import scipy.sparse
+else:
+    api.atualizador.forcar(esperar=True)
+    falhas = {n: e for n in api.atualizador.nomes() if (e := api.atualizador.erro(n))}
+with open(sys.argv[1], 'w') as f:
+    f.write(repr(falhas))
+time.sleep(3600)
+"""
+
+
+def ambiente(diretorio, compartilhado):
+    env = dict(os.environ, PYTHONPATH=RAIZ, MEMORIA_COMPARTILHADA='1' if compartilhado else '0')
+    for var, pasta in (('ARTEFATOS_DIR', '.artefatos'), ('COLUNAR_DIR', '.colunar'),
+                       ('COMPARTILHADO_DIR', '.compartilhado')):
+        env[var] = os.path.join(diretorio, pasta)
+    return env
+
+
+def pss(pid, prefixo):
+    # (PSS total, PSS dos arquivos sob prefixo) em bytes
+    total = mapeado = 0
+    caminho = None
+    with open(f'/proc/{pid}/smaps') as f:
+        for linha in f:
+            partes = linha.split()
+            if not partes[0].endswith(':'):
+                # Cabeçalho de mapeamento: "inicio-fim perms offset dev inode [caminho]"
+                caminho = partes[5] if len(partes) > 5 else None
+            elif partes[0] == 'Pss:':
+                kb = int(partes[1]) * 1024
+                total += kb
+                if caminho and caminho.startswith(prefixo):
+                    mapeado += kb
+    return total, mapeado
+
+
+def medir(diretorio, workers, compartilhado, vazio=False):
+    env = ambiente(diretorio, compartilhado)
+    prontos = [os.path.join(diretorio, f'.pronto-{i}') for i in range(workers)]
+    for p in prontos:
+        if os.path.exists(p):
+            os.remove(p)
+    inicio = time.perf_counter()
+    processos = [subprocess.Popen([sys.executable, '-c', WORKER, p, 'vazio' if vazio else 'dados'],
+                                  cwd=diretorio, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) for p in prontos]
+    try:
+        while not all(os.path.exists(p) and os.path.getsize(p) for p in prontos):
+            if any(proc.poll() is not None for proc in processos):
+                raise RuntimeError("um worker terminou antes de ficar pronto")
+            time.sleep(0.05)
+        segundos = time.perf_counter() - inicio
+        falhas = [open(p).read() for p in prontos if open(p).read() != '{}']
+        if falhas:
+            raise RuntimeError(f"snapshots com erro: {falhas[0]}")
+        medidas = [pss(proc.pid, os.path.realpath(env['COMPARTILHADO_DIR'])) for proc in processos]
+    finally:
+        for proc in processos:
+            proc.kill()
+            proc.wait()
+    return {'total': sum(m[0] for m in medidas), 'mapeado': sum(m[1] for m in medidas), 'segundos': segundos}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=500_000)
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gerar_dados(tmp, args.linhas)
+        print("Calculando os artefatos (.npz) uma vez...")
+        medir(tmp, 1, compartilhado=False)
+
+        mb = 2 ** 20
+        contagens = sorted({1, args.workers})
+        vazios = {n: medir(tmp, n, False, vazio=True)['total'] for n in contagens}
+        print(f"\nWorkers vazios (import do api + scipy.sparse): "
+              + ", ".join(f"{n} -> {v / mb:.1f} MB" for n, v in vazios.items()))
+        print(f"\n{'modo':<14} {'workers':>7} {'PSS total':>11} {'dados':>10} {'arrays mapeados':>16} {'subida':>8}")
+        dados = {}
+        for compartilhado in (False, True):
+            modo = "compartilhado" if compartilhado else "cópia própria"
+            for n in contagens:
+                r = medir(tmp, n, compartilhado)
+                dados[compartilhado, n] = r['total'] - vazios[n]
+                print(f"{modo:<14} {n:>7} {r['total'] / mb:>8.1f} MB {dados[compartilhado, n] / mb:>7.1f} MB "
+                      f"{r['mapeado'] / mb:>13.1f} MB {r['segundos']:>7.1f}s")
+
+        n = args.workers
+        for compartilhado in (False, True):
+            print(f"Dados com {n} workers / com 1 ({'compartilhado' if compartilhado else 'cópia própria'}): "
+                  f"{dados[compartilhado, n] / dados[compartilhado, 1]:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+# benchmarks/bench_concorrencia.py
+#
+# Teste de carga com 50 clientes simultâneos (cliente ASGI em processo, sem rede),
+# cada cenário num processo novo com caches vazios:
+#   - partida_fria: todos abrem o dashboard no instante em que o servidor sobe
+#   - leves_durante_calculo: 4/5 dos clientes pedem /api/arquetipos/selecao-k
+#     (varredura de k, cara e ainda não calculada) e o resto faz requisições
+#     leves ao mesmo tempo; mede quanto as leves esperam atrás do cálculo pesado
+#   - regime: todos fazem uma mistura de endpoints com os snapshots prontos
+# Para cada cenário: p50/p99/máximo da latência, vazão e o pico de threads vivas.
+#
+#   python benchmarks/bench_concorrencia.py [--linhas 100000] [--clientes 50] [--saida r.json]
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.suite import gerar_dados  # noqa: E402
+
+LEVES = [
+    ('/api/dashboard-data', None),
+    ('/api/dashboard-data', {'gender': 'Female'}),
+    ('/api/sintomas-heatmap', None),
+    ('/api/sintomas-heatmap/agregado', {'por': 'Sadness'}),
+    ('/api/linguistica-data/comparar', {'classe_a': 'Anxiety', 'classe_b': 'Stress'}),
+]
+
+
+class PicoThreads:
+    # Amostra threading.active_count() enquanto o cenário roda
+
+    def __init__(self):
+        self.pico = threading.active_count()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def _amostrar(self):
+        while not self._parar.wait(0.002):
+            self.pico = max(self.pico, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+
+def resumir(latencias, segundos):
+    lat = np.asarray(latencias) * 1000
+    return {
+        'requisicoes': int(len(lat)),
+        'p50_ms': round(float(np.percentile(lat, 50)), 1),
+        'p99_ms': round(float(np.percentile(lat, 99)), 1),
+        'max_ms': round(float(lat.max()), 1),
+        'vazao_por_s': round(len(lat) / segundos, 1),
+    }
+
+
+async def _cronometrar(cliente, url, params, latencias):
+    inicio = time.perf_counter()
+    r = await cliente.get(url, params=params)
+    latencias.append(time.perf_counter() - inicio)
+    assert r.status_code == 200, f"{url}: {r.status_code} {r.text[:200]}"
+
+
+async def _cenario(nome, clientes, requisicoes):
+    import httpx
+
+    import api
+
+    async with api.app.router.lifespan_context(api.app):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url='http://bench', timeout=None) as cliente:
+            if nome != 'partida_fria':
+                # Snapshots prontos antes de medir
+                for url, params in LEVES:
+                    await cliente.get(url, params=params)
+
+            resultado = {}
+            with PicoThreads() as threads:
+                inicio = time.perf_counter()
+                if nome == 'partida_fria':
+                    latencias = []
+                    await asyncio.gather(*(_cronometrar(cliente, '/api/dashboard-data', None, latencias)
+                                           for _ in range(clientes)))
+                    resultado['dashboard'] = resumir(latencias, time.perf_counter() - inicio)
+
+                elif nome == 'leves_durante_calculo':
+                    pesadas, leves = [], []
+
+                    async def cliente_leve(i):
+                        for j in range(requisicoes):
+                            url, params = LEVES[(i + j) % len(LEVES)]
+                            await _cronometrar(cliente, url, params, leves)
+
+                    n_pesados = clientes * 4 // 5
+                    await asyncio.gather(
+                        *(_cronometrar(cliente, '/api/arquetipos/selecao-k', None, pesadas) for _ in range(n_pesados)),
+                        *(cliente_leve(i) for i in range(clientes - n_pesados)),
+                    )
+                    total = time.perf_counter() - inicio
+                    resultado['selecao_k'] = resumir(pesadas, total)
+                    resultado['leves'] = resumir(leves, total)
+
+                else:
+                    latencias = []
+
+                    async def cliente_misto(i):
+                        for j in range(requisicoes):
+                            url, params = LEVES[(i + j) % len(LEVES)]
+                            await _cronometrar(cliente, url, params, latencias)
+
+                    await asyncio.gather(*(cliente_misto(i) for i in range(clientes)))
+                    resultado['misto'] = resumir(latencias, time.perf_counter() - inicio)
+            resultado['pico_threads'] = threads.pico
+    return resultado
+
+
+def rodar_cenario(diretorio, nome, clientes, requisicoes):
+    # Processo novo: caches em memória e artefatos vazios
+    os.chdir(diretorio)
+    tmp = tempfile.mkdtemp(prefix='carga-')
+    os.environ['ARTEFATOS_DIR'] = os.path.join(tmp, '.artefatos')
+    os.environ['COLUNAR_DIR'] = os.path.join(tmp, '.colunar')
+    return asyncio.run(_cenario(nome, clientes, requisicoes))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--clientes', type=int, default=50)
+    parser.add_argument('--requisicoes', type=int, default=20, help="requisições por cliente leve")
+    parser.add_argument('--dados', help="diretório dos CSVs gerados (reaproveitados entre execuções)")
+    parser.add_argument('--saida')
+    args = parser.parse_args()
+
+    # Varredura de k curta, para o cenário pesado caber num teste
+    os.environ.setdefault('SELECAO_K_MAX', '4')
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        diretorio = os.path.abspath(args.dados or tmp)
+        gerar_dados(diretorio, args.linhas)
+        for nome in ('partida_fria', 'leves_durante_calculo', 'regime'):
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                resultados[nome] = executor.submit(rodar_cenario, diretorio, nome,
+                                                   args.clientes, args.requisicoes).result()
+
+    print(f"\n{args.clientes} clientes simultâneos, {args.linhas:,} linhas")
+    print(f"{'cenário':<24} {'grupo':<10} {'req':>6} {'p50 ms':>9} {'p99 ms':>9} {'máx ms':>9} {'req/s':>8} {'threads':>8}")
+    for nome, resultado in resultados.items():
+        for grupo, s in resultado.items():
+            if grupo == 'pico_threads':
+                continue
+            print(f"{nome:<24} {grupo:<10} {s['requisicoes']:>6} {s['p50_ms']:>9.1f} {s['p99_ms']:>9.1f} "
+                  f"{s['max_ms']:>9.1f} {s['vazao_por_s']:>8.1f} {resultado['pico_threads']:>8}")
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
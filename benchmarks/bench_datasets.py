@@ -0,0 +1,135 @@
+# benchmarks/bench_datasets.py
+#
+# N datasets sintéticos (DATASETS_DIR/<id>/) servidos pela mesma API, com um
+# orçamento de memória em que só cabe uma fração deles. Os acessos seguem uma
+# distribuição de Zipf (poucas clínicas concentram o uso); cada acesso lê o
+# dashboard, os segmentos, o heatmap e as opções de sintomas e a linguística do
+# dataset. O orçamento conta heap + arrays mapeados (ver datasets.py). O tempo de cada
+# acesso é separado pelo estado em que o dataset estava:
+#   - ativação: primeiro acesso (snapshots montados a partir do armazém)
+#   - em memória: dataset residente
+#   - restauração: despejado para o disco e lido de volta (modo spill)
+#   - recálculo: despejado sem spill, montado de novo do armazém (modo descarte)
+# Os artefatos são calculados antes, num processo à parte; os dois modos rodam em
+# processos novos sobre eles. No fim vem o
+# /api/datasets do modo spill (tamanho, hit rate, despejos de cada dataset).
+#
+#   python benchmarks/bench_datasets.py [--datasets 8] [--linhas 100000] [--acessos 300] [--fracao 0.4]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.suite import gerar_dados  # noqa: E402
+
+ROTAS = ('/api/dashboard-data', '/api/dashboard-data/segmentos', '/api/sintomas-heatmap',
+         '/api/sintomas-heatmap/opcoes', '/api/linguistica-data')
+
+
+def executar(diretorio, modo, ids, acessos, fracao, seed):
+    # Processo filho: ambiente já apontado para o diretório (ver ambiente())
+    import api
+    from fastapi.testclient import TestClient
+
+    tempos = {}
+
+    def acessar(cliente, id_dataset):
+        ds = api.datasets.obter(id_dataset)
+        caso = {'residente': 'em memória', 'em_disco': 'restauração'}.get(ds.estado)
+        if caso is None:
+            caso = 'recálculo' if ds.despejos else 'ativação'
+        inicio = time.perf_counter()
+        for rota in ROTAS:
+            r = cliente.get(rota, params={'dataset': id_dataset})
+            assert r.status_code == 200 and 'error' not in r.json(), f"{rota} ({id_dataset}): {r.text[:200]}"
+        tempos.setdefault(caso, []).append(time.perf_counter() - inicio)
+
+    with TestClient(api.app) as cliente:
+        # Todos residentes uma vez, sem limite, para medir o total e fixar o orçamento
+        api.datasets.orcamento = 0
+        for id_dataset in ids:
+            acessar(cliente, id_dataset)
+        total = sum(s["bytes"] + s["mapeado_bytes"] for s in api.datasets.stats()["datasets"].values())
+        api.datasets.orcamento = max(1, int(total * fracao))
+
+        rng = np.random.default_rng(seed)
+        pesos = 1 / np.arange(1, len(ids) + 1)
+        for i in rng.choice(len(ids), size=acessos, p=pesos / pesos.sum()):
+            acessar(cliente, ids[i])
+        stats = api.datasets.stats()
+
+    casos = {caso: {"n": len(t), "p50_ms": float(np.median(t) * 1000), "p99_ms": float(np.percentile(t, 99) * 1000)}
+             for caso, t in tempos.items()}
+    return {"modo": modo, "total_bytes": total, "casos": casos, "stats": stats}
+
+
+def ambiente(diretorio, modo):
+    env = dict(os.environ, PYTHONPATH=RAIZ, DATASETS_DIR=os.path.join(diretorio, 'datasets'))
+    for var, pasta in (('ARTEFATOS_DIR', '.artefatos'), ('COLUNAR_DIR', '.colunar'),
+                       ('COMPARTILHADO_DIR', '.compartilhado'), ('DATASETS_SPILL_DIR', '.spill')):
+        env[var] = os.path.join(diretorio, pasta)
+    if modo == 'descarte':
+        # Sem onde gravar o spill, o dataset despejado é descartado e recalculado do armazém
+        env['DATASETS_SPILL_DIR'] = '/proc/sem-spill'
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--datasets', type=int, default=8)
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--acessos', type=int, default=300)
+    parser.add_argument('--fracao', type=float, default=0.4, help="orçamento = fração do total residente")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--filho', nargs=2, metavar=('DIRETORIO', 'MODO'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    ids = [f"clinica_{i:02d}" for i in range(args.datasets)]
+
+    if args.filho:
+        diretorio, modo = args.filho
+        os.chdir(diretorio)
+        resultado = executar(diretorio, modo, ids, args.acessos, args.fracao, args.seed)
+        print("RESULTADO " + json.dumps(resultado))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, id_dataset in enumerate(ids):
+            # Tamanhos diferentes por clínica
+            gerar_dados(os.path.join(tmp, 'datasets', id_dataset), args.linhas * (1 + i % 3) // 2)
+        resultados = {}
+        for modo in ('preparo', 'spill', 'descarte'):
+            saida = subprocess.run([sys.executable, os.path.abspath(__file__), '--filho', tmp, modo,
+                                    '--datasets', str(args.datasets), '--acessos', str(args.acessos),
+                                    '--fracao', str(args.fracao), '--seed', str(args.seed)],
+                                   env=ambiente(tmp, modo), capture_output=True, text=True)
+            linha = next((l for l in saida.stdout.splitlines() if l.startswith("RESULTADO ")), None)
+            if linha is None:
+                raise RuntimeError(f"modo '{modo}' falhou:\n{saida.stderr[-2000:]}")
+            if modo != 'preparo':
+                resultados[modo] = json.loads(linha[len("RESULTADO "):])
+
+    mb = 2 ** 20
+    spill = resultados['spill']
+    print(f"\n{args.datasets} datasets, {spill['total_bytes'] / mb:.1f} MB residentes no total (heap + mapeado), "
+          f"orçamento {spill['stats']['orcamento_bytes'] / mb:.1f} MB ({args.fracao:.0%}), {args.acessos} acessos (Zipf)")
+    print(f"\n{'modo':<9} {'caso':<12} {'acessos':>8} {'p50':>10} {'p99':>10}")
+    for modo, r in resultados.items():
+        for caso, c in r['casos'].items():
+            print(f"{modo:<9} {caso:<12} {c['n']:>8} {c['p50_ms']:>7.1f} ms {c['p99_ms']:>7.1f} ms")
+
+    print(f"\n{'dataset':<12} {'estado':<10} {'heap':>9} {'mapeado':>9} {'disco':>9} {'hit rate':>9} {'despejos':>9}")
+    for id_dataset, s in spill['stats']['datasets'].items():
+        print(f"{id_dataset:<12} {s['estado']:<10} {s['bytes'] / mb:>6.1f} MB {s['mapeado_bytes'] / mb:>6.1f} MB "
+              f"{s['spill_bytes'] / mb:>6.1f} MB {s['hit_ratio']:>9.2%} {s['despejos']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_fluxo.py
+#
+# Ingestão contínua no FluxoPalavras (Count-Min + Space-Saving por classe) em
+# lotes, comparando com o índice exato (Counter por classe):
+#   - memória dos resumos a cada ponto de controle (tem que ficar constante)
+#     contra o tamanho do vocabulário exato (que só cresce)
+#   - vazão da ingestão
+#   - no fim: erro máximo dos scores devolvidos contra o score exato (limite
+#     teórico 1000·ε) e quantas das top-15 exatas aparecem no top-15 aproximado
+#
+#   python benchmarks/bench_fluxo.py [--frases 1000000] [--lote 1000]
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import FINAL_STOPS  # noqa: E402
+from benchmarks.dados_sinteticos import gerar_corpus  # noqa: E402
+from fluxo_linguistica import FluxoPalavras  # noqa: E402
+from benchmarks.referencias import indice_de_contadores  # noqa: E402
+from linguistica import Tokenizador  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frases', type=int, default=1_000_000)
+    parser.add_argument('--lote', type=int, default=1000)
+    parser.add_argument('--pontos', type=int, default=5, help="pontos de controle da memória")
+    args = parser.parse_args()
+
+    print(f"Gerando {args.frases:,} frases sintéticas...")
+    frases, status = gerar_corpus(args.frases)
+
+    fluxo = FluxoPalavras(FINAL_STOPS)
+    tokenizador = Tokenizador(FINAL_STOPS)
+    contadores = {}
+    controle = set(np.linspace(args.lote, args.frases, args.pontos, dtype=int) // args.lote * args.lote)
+
+    print(f"\n{'frases':>10} {'memória resumos':>16} {'vocab exato':>12}")
+    t_fluxo = 0.0
+    for ini in range(0, args.frases, args.lote):
+        textos, rotulos = frases[ini:ini + args.lote], status[ini:ini + args.lote]
+        t = time.perf_counter()
+        fluxo.ingerir(rotulos, textos)
+        t_fluxo += time.perf_counter() - t
+
+        # Referência exata (fora da medição)
+        grupos = {}
+        for s, f in zip(rotulos, textos):
+            grupos.setdefault(s, []).append(f)
+        for s, lista in grupos.items():
+            contadores.setdefault(s, Counter()).update(tokenizador.contar(lista))
+        if ini + args.lote in controle:
+            vocab = len(set().union(*contadores.values()))
+            print(f"{ini + args.lote:>10,} {tamanho_fluxo(fluxo) / 2 ** 20:>13.1f} MB {vocab:>12,}")
+
+    n = args.frases
+    print(f"\nIngestão: {t_fluxo:.2f}s ({n / t_fluxo:,.0f} frases/s, lotes de {args.lote})")
+
+    indice = indice_de_contadores(contadores)
+    limites = fluxo.limites()
+    print(f"Limites: erro do score <= {limites['erro_maximo_score']} (confiança {limites['confianca']}), "
+          f"score fora do top-k < {limites['score_maximo_fora_do_topk']}")
+
+    # Os scores saem arredondados em 0,1: o erro medido inclui até 0,05 do arredondamento
+    print(f"\n{'classe':<22} {'erro máx':>9} {'top-15 em comum':>16}")
+    for classe in [c for c in indice.classes if c != 'Normal']:
+        aproximado = fluxo.palavras_distintivas(classe, 'Normal')
+        referencia = indice.palavras_distintivas(classe, 'Normal', metodo='frequencia')
+        # Score exato de cada palavra devolvida pelo fluxo
+        i_a, i_b = indice.resolver_classe(classe), indice.resolver_classe('Normal')
+        posicao = {w: j for j, w in enumerate(indice.vocab)}
+        erros = []
+        for p in aproximado:
+            j = posicao[p['word']]
+            real = (indice.contagens[i_a, j] / indice.totais[i_a] - indice.contagens[i_b, j] / indice.totais[i_b]) * 1000
+            erros.append(abs(p['score'] - real))
+        comuns = len({p['word'] for p in aproximado} & {p['word'] for p in referencia})
+        print(f"{classe:<22} {max(erros, default=0):>9.3f} {comuns:>13}/{len(referencia)}")
+
+
+def tamanho_fluxo(fluxo):
+    # Tabelas do Count-Min + entradas do Space-Saving (contagem e erro)
+    total = 0
+    for esboco in fluxo.classes.values():
+        total += esboco.count_min.tabela.nbytes
+        frequentes = esboco.frequentes
+        total += sys.getsizeof(frequentes.contagens) + sys.getsizeof(frequentes.erros)
+        total += sum(sys.getsizeof(p) for p in frequentes.contagens)
+    return total
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_inicio.py
+#
+# Arranque a frio do serviço, com importação tardia (IMPORTACAO_TARDIA=1) e sem:
+#   - python -X importtime -c "import api", resumido por pacote de topo
+#     (soma do tempo próprio de cada módulo importado)
+#   - tempo até a primeira resposta de /api/dashboard-data com os artefatos já
+#     no disco: processo novo a cada rodada (import do api + lifespan + espera
+#     pelo snapshot), cliente ASGI em processo, sem rede; mais o relatório de
+#     /api/inicio (quando cada biblioteca pesada foi carregada)
+#
+#   python benchmarks/bench_inicio.py [--linhas 100000] [--rodadas 5]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.suite import gerar_dados  # noqa: E402
+
+# Roda no processo filho: o relógio começa no pai, antes do spawn. O resultado vai para
+# um arquivo (o stdout tem os logs das threads de refresh misturados)
+FILHO = """
+import json, os, sys, time
+import api
+importado = time.time()
+from fastapi.testclient import TestClient
+with TestClient(api.app) as cliente:
+    while True:
+        r = cliente.get('/api/dashboard-data')
+        if r.status_code == 200:
+            break
+        time.sleep(0.005)
+    respondido = time.time()
+    inicio = cliente.get('/api/inicio').json()
+with open(os.environ['BENCH_RESULTADO'], 'w') as f:
+    json.dump({'import_api': importado, 'primeira_resposta': respondido, 'inicio': inicio,
+               'pesados_no_dashboard': [m for m in ('pandas', 'scipy', 'sklearn') if m in sys.modules]}, f)
+"""
+
+
+def ambiente(tardia, diretorio):
+    env = dict(os.environ, IMPORTACAO_TARDIA='1' if tardia else '0', PYTHONPATH=RAIZ, REFRESH_INTERVALO='3600',
+               BENCH_RESULTADO=os.path.join(diretorio, 'resultado.json'))
+    for var, pasta in (('ARTEFATOS_DIR', '.artefatos'), ('COLUNAR_DIR', '.colunar'), ('VERSOES_DIR', '.versoes')):
+        env[var] = os.path.join(diretorio, pasta)
+    return env
+
+
+def importtime(tardia, diretorio):
+    saida = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import api'], cwd=diretorio,
+                           env=ambiente(tardia, diretorio), capture_output=True, text=True, check=True).stderr
+    por_pacote = defaultdict(int)
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, _, nome = linha[len('import time:'):].split('|')
+        por_pacote[nome.strip().split('.')[0]] += int(proprio)
+    return por_pacote
+
+
+def partida_fria(tardia, diretorio):
+    inicio = time.time()
+    env = ambiente(tardia, diretorio)
+    subprocess.run([sys.executable, '-c', FILHO], cwd=diretorio, env=env, capture_output=True, check=True)
+    with open(env['BENCH_RESULTADO']) as f:
+        resultado = json.load(f)
+    resultado['import_api'] -= inicio
+    resultado['primeira_resposta'] -= inicio
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--rodadas', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help="pacotes listados no resumo do importtime")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gerar_dados(tmp, args.linhas)
+        # Artefatos no disco antes das medições (a partida fria só os lê)
+        subprocess.run([sys.executable, '-c', FILHO], cwd=tmp, env=ambiente(True, tmp),
+                       capture_output=True, check=True)
+
+        for tardia in (False, True):
+            rotulo = "tardia" if tardia else "imediata"
+            por_pacote = importtime(tardia, tmp)
+            total = sum(por_pacote.values())
+            print(f"\nImportação {rotulo}: import api = {total / 1e6:.2f}s (soma do -X importtime)")
+            for nome, us in sorted(por_pacote.items(), key=lambda x: -x[1])[:args.top]:
+                print(f"  {nome:<24} {us / 1e3:>8.1f} ms")
+
+            rodadas = [partida_fria(tardia, tmp) for _ in range(args.rodadas)]
+            imports = np.array([r['import_api'] for r in rodadas]) * 1000
+            primeiras = np.array([r['primeira_resposta'] for r in rodadas]) * 1000
+            print(f"  spawn -> api importado:        p50 {np.median(imports):7.0f} ms  (máx {imports.max():.0f})")
+            print(f"  spawn -> 1ª resposta dashboard: p50 {np.median(primeiras):7.0f} ms  (máx {primeiras.max():.0f})")
+            print(f"  bibliotecas pesadas carregadas até a resposta: {rodadas[-1]['pesados_no_dashboard'] or 'nenhuma'}")
+            print(f"  /api/inicio: {json.dumps(rodadas[-1]['inicio']['primeira_geracao_s'])}")
+
+
+if __name__ == '__main__':
+    main()
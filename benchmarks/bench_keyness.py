@@ -0,0 +1,63 @@
+# benchmarks/bench_keyness.py
+#
+# Construção do índice de termos + ranqueamento de todas as classes contra
+# Normal, a partir de um CSV sintético no formato de Combined Data.csv:
+#   - antigo: Counter de unigramas por classe + um cálculo de frequência por classe
+#   - novo:   matriz documento-termo com unigramas e bigramas (min_df) +
+#             keyness de todas as classes numa conta só, para cada método
+#
+#   python benchmarks/bench_keyness.py [--frases 1000000] [--dados corpus.csv]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import FINAL_STOPS  # noqa: E402
+from benchmarks.dados_sinteticos import gerar_linguistica  # noqa: E402
+from benchmarks.referencias import contar_palavras_por_classe, indice_de_contadores  # noqa: E402
+from linguistica import METODOS_KEYNESS, MIN_DF, construir_indice  # noqa: E402
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frases', type=int, default=1_000_000)
+    parser.add_argument('--dados', help="CSV do corpus (gerado se não existir)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = args.dados or os.path.join(tmp, 'corpus.csv')
+        if not os.path.exists(arquivo):
+            print(f"Gerando {args.frases:,} frases sintéticas...")
+            gerar_linguistica(args.frases).to_csv(arquivo)
+
+        t = time.perf_counter()
+        antigo = indice_de_contadores(contar_palavras_por_classe(arquivo, FINAL_STOPS))
+        t_antigo = time.perf_counter() - t
+        alvos = [c for c in antigo.classes if c != 'Normal']
+        t = time.perf_counter()
+        for c in alvos:
+            antigo.palavras_distintivas(c, 'Normal', metodo='frequencia')
+        t_antigo_score = time.perf_counter() - t
+
+        t = time.perf_counter()
+        novo = construir_indice(arquivo, FINAL_STOPS)
+        t_novo = time.perf_counter() - t
+
+    print(f"\n{'':<28} {'termos':>9} {'construção':>11} {'ranqueamento':>13}")
+    print(f"{'antigo (unigramas)':<28} {len(antigo.vocab):>9,} {t_antigo:>10.2f}s "
+          f"{t_antigo_score * 1000:>11.1f}ms")
+    for metodo in METODOS_KEYNESS:
+        t = time.perf_counter()
+        novo.palavras_chave(alvos, 'Normal', metodo=metodo)
+        t_score = time.perf_counter() - t
+        print(f"{f'novo 1+2-gramas ({metodo})':<28} {len(novo.vocab):>9,} {t_novo:>10.2f}s "
+              f"{t_score * 1000:>11.1f}ms")
+    print(f"(min_df={MIN_DF:g}; {len(alvos)} classes contra Normal)")
+    exemplo = novo.palavras_chave(alvos[:1], 'Normal', metodo='log_odds')[alvos[0]]
+    print(f"Exemplo (log_odds, {alvos[0]}): {[p['word'] for p in exemplo[:8]]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/bench_sintomas_incremental.py
+#
+# Agregado de sintomas: construção completa vs. anexar poucas linhas ao CSV
+# (só as linhas novas são lidas e somadas aos histogramas).
+#
+#   python benchmarks/bench_sintomas_incremental.py [--linhas 1000000] [--novas 1000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregacao_sintomas import AgregadorIncremental, construir_agregado  # noqa: E402
+from benchmarks.dados_sinteticos import gerar_sintomas  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=1_000_000)
+    parser.add_argument('--novas', type=int, default=1_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        arquivo = os.path.join(tmp, 'sintomas.csv')
+        print(f"Gerando {args.linhas:,} linhas sintéticas...")
+        gerar_sintomas(args.linhas).to_csv(arquivo, index=False)
+
+        agregador = AgregadorIncremental(arquivo)
+        t = time.perf_counter()
+        agregador.sincronizar(lambda: construir_agregado(arquivo))
+        t_completo = time.perf_counter() - t
+
+        gerar_sintomas(args.novas, seed=1, inicio=args.linhas + 1).to_csv(arquivo, index=False, header=False, mode='a')
+        t = time.perf_counter()
+        incremental = agregador.sincronizar(lambda: None)
+        t_incremental = time.perf_counter() - t
+
+        t = time.perf_counter()
+        referencia = construir_agregado(arquivo)
+        t_refeito = time.perf_counter() - t
+
+        iguais = all(incremental.matriz(por, e) == referencia.matriz(por, e)
+                     for por in ('Expert Diagnose', 'Sadness') for e in ('media', 'prevalencia', 'quantil'))
+        print(f"\nConstrução completa ({args.linhas:,} linhas): {t_completo * 1000:8.1f}ms")
+        print(f"Anexar {args.novas:,} linhas (incremental):   {t_incremental * 1000:8.1f}ms")
+        print(f"Reconstrução completa após o anexo:        {t_refeito * 1000:8.1f}ms")
+        print(f"Resultados idênticos à reconstrução: {iguais}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# benchmarks/bench_tokenizador.py
+#
+# Compara o tokenizador antigo (get_vocab_cleaned + laço de score + sorted)
+# com o Tokenizador em lote + índice esparso.
+#
+#   python benchmarks/bench_tokenizador.py [--frases 1000000]
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import FINAL_STOPS  # noqa: E402
+from linguistica import Tokenizador  # noqa: E402
+from benchmarks.dados_sinteticos import gerar_corpus  # noqa: E402
+from benchmarks.referencias import get_vocab_cleaned, indice_de_contadores  # noqa: E402
+
+
+def score_antigo(vocab_a, vocab_b):
+    total_a = sum(vocab_a.values())
+    total_b = sum(vocab_b.values())
+    distinctive_score = {}
+    for word in set(vocab_a.keys()).union(set(vocab_b.keys())):
+        distinctive_score[word] = (vocab_a.get(word, 0) / total_a - vocab_b.get(word, 0) / total_b) * 1000
+    top_a = sorted(distinctive_score.items(), key=lambda x: (-x[1], x[0]))[:20]
+    return [{"word": w, "score": round(s, 1)} for w, s in top_a if s > 0][:15]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frases', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"Gerando {args.frases:,} frases sintéticas...")
+    frases, status = gerar_corpus(args.frases)
+    grupos = {}
+    for f, s in zip(frases, status):
+        grupos.setdefault(s, []).append(f)
+    n_tokens = sum(len(f.split()) for f in frases)
+    print(f"{n_tokens:,} tokens brutos\n")
+
+    t = time.perf_counter()
+    antigo = {s: Counter(get_vocab_cleaned(textos, FINAL_STOPS)) for s, textos in grupos.items()}
+    t_antigo = time.perf_counter() - t
+
+    t = time.perf_counter()
+    tokenizador = Tokenizador(FINAL_STOPS)
+    novo = {s: tokenizador.contar(textos) for s, textos in grupos.items()}
+    t_novo = time.perf_counter() - t
+
+    assert antigo == novo, "Contagens divergentes!"
+    print(f"Tokenização  antigo: {t_antigo:7.2f}s  {n_tokens / t_antigo:14,.0f} tokens/s")
+    print(f"Tokenização  novo:   {t_novo:7.2f}s  {n_tokens / t_novo:14,.0f} tokens/s  ({t_antigo / t_novo:.1f}x)")
+
+    alvos = [c for c in novo if c != 'Normal']
+    t = time.perf_counter()
+    res_antigo = {c: score_antigo(antigo[c], antigo['Normal']) for c in alvos}
+    t_antigo = time.perf_counter() - t
+
+    indice = indice_de_contadores(novo)
+    t = time.perf_counter()
+    res_novo = {c: indice.palavras_distintivas(c, 'Normal', metodo='frequencia') for c in alvos}
+    t_novo = time.perf_counter() - t
+
+    assert res_antigo == res_novo, "Rankings divergentes!"
+    print(f"\nScore+top-k  antigo: {t_antigo * 1000:9.2f}ms ({len(alvos)} classes)")
+    print(f"Score+top-k  novo:   {t_novo * 1000:9.2f}ms ({t_antigo / t_novo:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_versoes.py
+#
+# Simula exportações diárias: a cada dia chegam linhas novas de sintomas (de
+# alguns diagnósticos) e frases novas no corpus; o dataset de estilo de vida
+# só muda uma vez por semana. Registra uma versão por dia e mede:
+#   - tempo de registro (dias em que um CSV não mudou reaproveitam as partições)
+#   - espaço em disco com deduplicação contra guardar cada versão inteira
+#   - latência de ler uma versão e de comparar duas (só leitura de objetos)
+#
+#   python benchmarks/bench_versoes.py [--dias 30] [--linhas 10000]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_lifestyle, gerar_linguistica, gerar_sintomas  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--linhas', type=int, default=10_000)
+    parser.add_argument('--novas', type=int, default=200, help="linhas novas por dia em cada CSV")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        for var, pasta in (('ARTEFATOS_DIR', '.artefatos'), ('COLUNAR_DIR', '.colunar'), ('VERSOES_DIR', '.versoes')):
+            os.environ[var] = os.path.join(tmp, pasta)
+        import api
+
+        gerar_lifestyle(args.linhas).to_csv(api.ARQUIVO_ARQUETIPOS, index=False)
+        gerar_sintomas(args.linhas).to_csv(api.ARQUIVO_SINTOMAS, index=False)
+        gerar_linguistica(args.linhas).to_csv(api.ARQUIVO_LINGUISTICA)
+        rng = np.random.default_rng(0)
+
+        tempos = []
+        for dia in range(args.dias):
+            if dia > 0:
+                if dia % 7 == 0:
+                    gerar_lifestyle(args.novas, seed=dia).to_csv(api.ARQUIVO_ARQUETIPOS, mode='a', header=False,
+                                                                 index=False)
+                # Só alguns diagnósticos recebem pacientes novos no dia
+                novos = gerar_sintomas(args.novas, seed=dia, inicio=args.linhas + dia * args.novas)
+                diagnosticos = novos['Expert Diagnose'].unique()
+                escolhidos = rng.choice(diagnosticos, max(1, len(diagnosticos) // 2), replace=False)
+                novos[novos['Expert Diagnose'].isin(escolhidos)].to_csv(api.ARQUIVO_SINTOMAS, mode='a',
+                                                                        header=False, index=False)
+                gerar_linguistica(args.novas, seed=dia, inicio=args.linhas + dia * args.novas).to_csv(
+                    api.ARQUIVO_LINGUISTICA, mode='a', header=False)
+            t = time.perf_counter()
+            api.registrar_versao(f"dia-{dia:03d}")
+            tempos.append(time.perf_counter() - t)
+
+        stats = api.armazem_versoes.stats()
+        t = time.perf_counter()
+        api.montar_versao(f"dia-{args.dias // 2:03d}")
+        t_ler = time.perf_counter() - t
+        a, b = api.armazem_versoes.manifesto("dia-000"), api.armazem_versoes.manifesto(f"dia-{args.dias - 1:03d}")
+        t = time.perf_counter()
+        api.diferenca_versoes(api.armazem_versoes, a, b)
+        t_diff = time.perf_counter() - t
+
+    tempos = np.array(tempos)
+    print(f"\n{args.dias} versões diárias ({args.linhas:,} linhas iniciais, +{args.novas}/dia)")
+    print(f"Registro: primeira {tempos[0]:.2f}s, demais p50 {np.median(tempos[1:]):.2f}s, "
+          f"máx {tempos[1:].max():.2f}s" if len(tempos) > 1 else f"Registro: {tempos[0]:.2f}s")
+    print(f"Disco: {stats['bytes'] / 2 ** 20:.2f} MB em {stats['objetos']} objetos "
+          f"(sem deduplicação: {stats['bytes_sem_deduplicacao'] / 2 ** 20:.2f} MB, "
+          f"{stats['referencias']} partições referenciadas)")
+    print(f"Ler uma versão: {t_ler * 1000:.1f}ms | diferença primeira x última: {t_diff * 1000:.1f}ms")
+    print(f"Extrapolação para 365 versões: ~{stats['bytes'] / args.dias * 365 / 2 ** 20:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
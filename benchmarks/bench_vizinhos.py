@@ -0,0 +1,118 @@
+# benchmarks/bench_vizinhos.py
+#
+# Índice de vizinhos dos sintomas (vizinhos.py) sobre N pacientes sintéticos, com
+# três tipos de perfil: completo, parcial (~60% dos sintomas, algum das células)
+# e sem nenhum sintoma das células (varredura em blocos). Para cada um:
+#   - latência de uma consulta por vez (p50/p99) e por consulta num lote
+#   - varredura ingênua em pandas (distância de todas as linhas + ordenação), numa
+#     amostra de consultas, conferindo que os vizinhos e distâncias são os mesmos
+# Mais, só para perfis completos, uma árvore KD do scipy sobre os mesmos pontos.
+#
+#   python benchmarks/bench_vizinhos.py [--pacientes 1000000] [--k 10] [--lote 64]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_sintomas  # noqa: E402
+from preprocessamento import preparar_sintomas  # noqa: E402
+from vizinhos import IndiceVizinhos  # noqa: E402
+
+
+def perfis(indice, matriz, modo, n, rng):
+    # Pacientes sorteados, com alguns sintomas deslocados de um passo
+    consultas = matriz[rng.integers(0, len(matriz), n)].astype(np.int64)
+    consultas += rng.integers(-1, 2, consultas.shape) * (rng.random(consultas.shape) < 0.2)
+    consultas = np.clip(consultas, indice.minimos, indice.maximos)
+    informados = np.ones(consultas.shape, dtype=bool)
+    if modo == 'parcial':
+        informados = rng.random(consultas.shape) < 0.6
+        informados[np.arange(n), rng.choice(indice.chaves, n)] = True
+    elif modo == 'sem_chave':
+        informados[:, indice.chaves] = False
+    return consultas, informados
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pacientes', type=int, default=1_000_000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--lote', type=int, default=64)
+    parser.add_argument('--consultas', type=int, default=200, help="consultas avulsas por tipo de perfil")
+    parser.add_argument('--amostra-pandas', type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(1)
+    k = args.k
+
+    df = gerar_sintomas(args.pacientes)
+    t = time.perf_counter()
+    indice = IndiceVizinhos.construir(df.copy())
+    t_indice = time.perf_counter() - t
+    mb = 2 ** 20
+    tamanho = sum(a.nbytes for a in indice.para_arrays().values())
+    print(f"{args.pacientes:,} pacientes, {len(indice.sintomas)} sintomas: índice em {t_indice:.2f}s, "
+          f"{tamanho / mb:.1f} MB (matriz int8 {indice.matriz.nbytes / mb:.1f} MB), "
+          f"{len(indice._celulas)} células não vazias")
+
+    # Matriz na ordem do CSV (a do índice está agrupada por célula)
+    matriz = np.empty_like(indice.matriz)
+    matriz[indice.linhas] = indice.matriz
+    numeros = preparar_sintomas(df.copy())[indice.sintomas]
+
+    print(f"\n{'perfil':<10} {'avulsa p50':>11} {'p99':>8} {f'lote de {args.lote}':>14} {'pandas':>10} {'ganho':>8}")
+    for modo in ('completo', 'parcial', 'sem_chave'):
+        consultas, informados = perfis(indice, matriz, modo, args.consultas, rng)
+        indice.buscar(consultas[:1], informados[:1], k)
+        tempos = []
+        for b in range(args.consultas):
+            t = time.perf_counter()
+            indice.buscar(consultas[b:b + 1], informados[b:b + 1], k)
+            tempos.append(time.perf_counter() - t)
+        tempos = np.array(tempos) * 1000
+
+        lote = min(args.lote, args.consultas)
+        t = time.perf_counter()
+        d2, linhas = indice.buscar(consultas[:lote], informados[:lote], k)
+        por_consulta = (time.perf_counter() - t) / lote * 1000
+
+        # Varredura ingênua: distância de todas as linhas num DataFrame, ordenação estável
+        amostra = min(args.amostra_pandas, lote)
+        t = time.perf_counter()
+        for b in range(amostra):
+            pesos = indice.pesos * informados[b]
+            dist = ((numeros - consultas[b]) ** 2 * pesos).sum(axis=1)
+            melhores = dist.sort_values(kind='stable').head(k)
+            if not (np.array_equal(melhores.index.to_numpy(), linhas[b])
+                    and np.array_equal(melhores.to_numpy().astype(np.int64), d2[b])):
+                raise AssertionError(f"vizinhos diferentes da varredura em pandas ({modo}, consulta {b})")
+        t_pandas = (time.perf_counter() - t) / amostra * 1000
+        print(f"{modo:<10} {np.median(tempos):>8.2f} ms {np.percentile(tempos, 99):>5.2f} ms "
+              f"{por_consulta:>11.2f} ms {t_pandas:>7.0f} ms {t_pandas / np.median(tempos):>7.0f}x")
+
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return
+    consultas, _ = perfis(indice, matriz, 'completo', args.consultas, rng)
+    escala = np.sqrt(indice.pesos)
+    t = time.perf_counter()
+    arvore = cKDTree(matriz * escala)
+    t_arvore = time.perf_counter() - t
+    t = time.perf_counter()
+    dist, _ = arvore.query(consultas * escala, k)
+    t_kd = (time.perf_counter() - t) / len(consultas) * 1000
+    t = time.perf_counter()
+    d2, _ = indice.buscar(consultas, np.ones(consultas.shape, dtype=bool), k)
+    t_idx = (time.perf_counter() - t) / len(consultas) * 1000
+    # Empates podem trocar os pacientes; as distâncias têm de ser as mesmas
+    iguais = np.allclose(np.round(dist ** 2), d2)
+    print(f"\nÁrvore KD (scipy, só perfis completos): construída em {t_arvore:.2f}s, "
+          f"{t_kd:.2f} ms/consulta vs índice {t_idx:.2f} ms/consulta (mesmas distâncias: {iguais})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/dados_sinteticos.py (Geração de dados sintéticos para os benchmarks)
+import numpy as np
+
+CLASSES_CORPUS = ['Normal', 'Depression', 'Suicidal', 'Anxiety', 'Stress',
+                  'Bipolar', 'Personality disorder']
+
+
+def gerar_vocabulario(n_palavras=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    letras = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+    tamanhos = rng.integers(2, 10, n_palavras)
+    palavras = [''.join(rng.choice(letras, t)) for t in tamanhos]
+    # Um pouco de ruído realista: pontuação, contrações e maiúsculas
+    extras = ["I'm", "don't", "(sad)", "happy!", "tired,", "Depressed.", "anxious?", "x2y", "--", "Life"]
+    return palavras + extras
+
+
+def gerar_corpus(n_frases, palavras_por_frase=20, seed=0):
+    # Frequências seguem uma Zipf, como num corpus real
+    rng = np.random.default_rng(seed)
+    vocab = np.array(gerar_vocabulario(seed=seed), dtype=object)
+    pesos = 1.0 / np.arange(1, len(vocab) + 1)
+    pesos /= pesos.sum()
+
+    status = rng.choice(CLASSES_CORPUS, n_frases)
+    tamanhos = rng.integers(0, 2 * palavras_por_frase, n_frases)
+    ids = rng.choice(len(vocab), int(tamanhos.sum()), p=pesos)
+    cortes = np.cumsum(tamanhos)[:-1]
+    frases = [' '.join(vocab[parte]) for parte in np.split(ids, cortes)]
+    return frases, list(status)
+
+
+def gerar_lifestyle(n_linhas, seed=0):
+    # Mesmo esquema de mental_health_dataset.csv
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'age': rng.integers(18, 66, n_linhas),
+        'gender': rng.choice(['Male', 'Female', 'Non-binary', 'Prefer not to say'], n_linhas, p=[.46, .44, .05, .05]),
+        'employment_status': rng.choice(['Employed', 'Student', 'Self-employed', 'Unemployed'], n_linhas, p=[.59, .2, .105, .105]),
+        'work_environment': rng.choice(['On-site', 'Remote', 'Hybrid'], n_linhas, p=[.5, .3, .2]),
+        'mental_health_history': rng.choice(['Yes', 'No'], n_linhas),
+        'seeks_treatment': rng.choice(['Yes', 'No'], n_linhas),
+        'stress_level': rng.integers(1, 11, n_linhas),
+        'sleep_hours': np.round(rng.normal(6.5, 1.5, n_linhas).clip(3, 10), 1),
+        'physical_activity_days': rng.integers(0, 8, n_linhas),
+        'depression_score': rng.integers(0, 31, n_linhas),
+        'anxiety_score': rng.integers(0, 22, n_linhas),
+        'social_support_score': rng.integers(0, 101, n_linhas),
+        'productivity_score': np.round(rng.normal(77, 10, n_linhas).clip(0, 100), 1),
+        'mental_health_risk': rng.choice(['Low', 'Medium', 'High'], n_linhas),
+    })
+
+
+def gerar_sintomas(n_linhas, seed=0, inicio=1):
+    # Mesmo esquema (e mesmas grafias) de Dataset-Mental-Disorders.csv
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    freq = ['Seldom', 'Sometimes', 'Usually', 'Most-Often']
+    sim_nao = ['YES', 'NO', 'YES ']
+    escala = [f"{i} From 10" for i in range(1, 10)]
+    dados = {'Patient Number': [f"Patiant-{i:02d}" for i in range(inicio, inicio + n_linhas)]}
+    for col in ['Sadness', 'Euphoric', 'Exhausted', 'Sleep dissorder']:
+        dados[col] = rng.choice(freq, n_linhas)
+    for col in ['Mood Swing', 'Suicidal thoughts', 'Anorxia', 'Authority Respect', 'Try-Explanation',
+                'Aggressive Response', 'Ignore & Move-On', 'Nervous Break-down', 'Admit Mistakes',
+                'Overthinking']:
+        dados[col] = rng.choice(sim_nao, n_linhas, p=[.48, .48, .04])
+    for col in ['Sexual Activity', 'Concentration', 'Optimisim']:
+        dados[col] = rng.choice(escala, n_linhas)
+    dados['Expert Diagnose'] = rng.choice(['Bipolar Type-1', 'Bipolar Type-2', 'Depression', 'Normal'], n_linhas)
+    return pd.DataFrame(dados)
+
+
+def gerar_linguistica(n_linhas, seed=0, inicio=0):
+    # Mesmo esquema de Combined Data.csv (índice sem nome, statement, status)
+    import pandas as pd
+
+    frases, status = gerar_corpus(n_linhas, seed=seed)
+    return pd.DataFrame({'statement': frases, 'status': status},
+                        index=pd.RangeIndex(inicio, inicio + n_linhas))
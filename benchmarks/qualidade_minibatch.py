@@ -0,0 +1,72 @@
+# benchmarks/qualidade_minibatch.py
+#
+# Compara o modo mini-batch (clusters_incremental.py) com o KMeans completo no
+# dataset do repositório: distância entre centróides pareados, inércia,
+# concordância dos rótulos (ARI) e nomes dos arquétipos.
+#
+#   python benchmarks/qualidade_minibatch.py [--chunk-size 2000] [--epocas 3]
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from sklearn.metrics import adjusted_rand_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import (ARQUIVO_ARQUETIPOS, CLUSTER_PARAMS, calcular_modelo_clusters,  # noqa: E402
+                 montar_dashboard, resumo_de_modelo)
+from clusters_incremental import MINIBATCH_PARAMS, ajustar_minibatch  # noqa: E402
+
+
+def nomes(modelo):
+    dashboard = montar_dashboard(resumo_de_modelo(modelo))
+    return {c["id"]: c["name"] for c in dashboard["clusters"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--arquivo', default=ARQUIVO_ARQUETIPOS)
+    parser.add_argument('--chunk-size', type=int, default=2000,
+                        help="Linhas por bloco (pequeno para exercitar o modo streaming)")
+    parser.add_argument('--batch-size', type=int, default=MINIBATCH_PARAMS["batch_size"])
+    parser.add_argument('--epocas', type=int, default=MINIBATCH_PARAMS["epocas"])
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    completo = calcular_modelo_clusters(args.arquivo, CLUSTER_PARAMS)
+    t_completo = time.perf_counter() - t
+
+    t = time.perf_counter()
+    mini = ajustar_minibatch(args.arquivo, CLUSTER_PARAMS["n_clusters"], CLUSTER_PARAMS["random_state"],
+                             args.batch_size, args.chunk_size, args.epocas)
+    t_mini = time.perf_counter() - t
+
+    # Pareia os clusters pelo centróide mais próximo (espaço padronizado)
+    custo = ((completo["centroids"][:, None, :] - mini["centroids"][None, :, :]) ** 2).sum(axis=2)
+    linhas, colunas = linear_sum_assignment(custo)
+    dist = np.sqrt(custo[linhas, colunas])
+
+    print(f"KMeans completo:  {t_completo:6.2f}s  inércia={float(completo['inertia']):.1f}")
+    print(f"MiniBatchKMeans:  {t_mini:6.2f}s  inércia={float(mini['inertia']):.1f} "
+          f"({float(mini['inertia']) / float(completo['inertia']) - 1:+.2%})")
+    print(f"Distância entre centróides pareados (em desvios-padrão): "
+          f"{', '.join(f'{d:.3f}' for d in dist)}")
+    print(f"ARI entre os rótulos: {adjusted_rand_score(completo['labels'], mini['labels']):.3f}")
+
+    dif = np.abs(completo["summary"][linhas] - mini["summary"][colunas]).max(axis=0)
+    print("Maior diferença nas médias por feature: "
+          + ", ".join(f"{c}={d:.2f}" for c, d in zip(completo["cols"], dif)))
+
+    # Obs.: no dataset do repositório as médias de produtividade dos clusters
+    # diferem por décimos, então a escolha "Produtivo Sedentário" x "Social
+    # Disperso" pode trocar com diferenças de ruído entre os dois métodos
+    nomes_completo, nomes_mini = nomes(completo), nomes(mini)
+    iguais = all(nomes_completo[int(a)] == nomes_mini[int(b)] for a, b in zip(linhas, colunas))
+    print(f"Mesmos nomes de arquétipo para os clusters pareados: {'sim' if iguais else 'NÃO'}")
+
+
+if __name__ == '__main__':
+    main()
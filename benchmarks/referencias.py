@@ -0,0 +1,50 @@
+# benchmarks/referencias.py (Implementações antigas usadas como base de comparação)
+#
+# O caminho de palavras de antes do Tokenizador e do ContadorTermos: tokenização
+# por ocorrência e um Counter de unigramas por classe. Não são usadas pela API.
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from linguistica import IndicePalavras, Tokenizador, ler_corpus_em_chunks
+
+
+def get_vocab_cleaned(texts, final_stops):
+    all_text = ' '.join(texts).lower()
+    raw_words = all_text.split()
+    cleaned_words = []
+    for w in raw_words:
+        clean_w = w.strip(".,!?:;\"'()[]{}*-")
+        if len(clean_w) > 2 and clean_w not in final_stops and clean_w.isalpha():
+            cleaned_words.append(clean_w)
+    return cleaned_words
+
+
+def indice_de_contadores(contadores):
+    # contadores: {classe: Counter(palavra -> contagem)} -> IndicePalavras de unigramas
+    classes = list(contadores.keys())
+    vocab = sorted(set().union(*contadores.values())) if contadores else []
+    posicao = {w: i for i, w in enumerate(vocab)}
+
+    linhas, colunas, valores = [], [], []
+    for i, classe in enumerate(classes):
+        cont = contadores[classe]
+        linhas.extend([i] * len(cont))
+        colunas.extend(posicao[w] for w in cont)
+        valores.extend(cont.values())
+
+    matriz = sparse.csr_matrix(
+        (np.asarray(valores, dtype=np.int64), (linhas, colunas)),
+        shape=(len(classes), len(vocab)),
+    )
+    return IndicePalavras(classes, vocab, matriz)
+
+
+def contar_palavras_por_classe(filename, final_stops):
+    # Índice antigo: um Counter de unigramas por classe, bloco a bloco
+    tokenizador = Tokenizador(final_stops)
+    contadores = {}
+    for status, textos in ler_corpus_em_chunks(filename):
+        contadores.setdefault(status, Counter()).update(tokenizador.contar(textos))
+    return contadores
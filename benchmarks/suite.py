@@ -0,0 +1,299 @@
+# benchmarks/suite.py (Suíte de benchmarks dos caminhos quentes da API)
+#
+# Gera os três datasets sintéticos (mesmos esquemas dos CSVs reais) em cada
+# tamanho pedido e, num processo novo por tamanho (cwd e diretórios de cache
+# isolados), mede:
+#   - funções: process_clusters, processar_sintomas, analyze_distinctive_words_logic,
+#     construir_indice e construir_agregado (recálculo completo a cada repetição)
+#   - endpoints: cliente ASGI em processo (TestClient, sem rede), depois do
+#     aquecimento dos snapshots
+# Para cada caso: p50/p99 da latência, vazão (chamadas/s) e pico de RSS do
+# processo durante o caso. Com --baseline, compara com um JSON gravado antes e
+# sai com código 1 se algo piorou além da tolerância.
+#
+#   python benchmarks/suite.py [--tamanhos 10k,1M,10M] [--baseline benchmarks/baseline.json]
+#   python benchmarks/suite.py --tamanhos 10k --baseline benchmarks/baseline.json --salvar-baseline
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dados_sinteticos import gerar_lifestyle, gerar_linguistica, gerar_sintomas  # noqa: E402
+
+ARQUIVOS = {
+    'lifestyle': 'mental_health_dataset.csv',
+    'sintomas': 'Dataset-Mental-Disorders.csv',
+    'linguistica': 'Combined Data.csv',
+}
+GERADORES = {'lifestyle': gerar_lifestyle, 'sintomas': gerar_sintomas, 'linguistica': gerar_linguistica}
+
+# Linhas geradas por vez (limita a memória da geração de 10M linhas)
+BLOCO_GERACAO = 1_000_000
+
+# Métrica -> piso absoluto abaixo do qual a diferença é tratada como ruído
+METRICAS_COMPARADAS = {'p50_ms': 1.0, 'p99_ms': 2.0, 'pico_rss_mb': 32.0}
+
+REGISTROS_ASSIGN = 1_000
+
+
+def ler_tamanho(texto):
+    texto = texto.strip().lower()
+    multiplicador = {'k': 1_000, 'm': 1_000_000}.get(texto[-1:], 1)
+    return int(float(texto.rstrip('km')) * multiplicador)
+
+
+# --- Dados ---
+def gerar_dados(diretorio, n_linhas):
+    os.makedirs(diretorio, exist_ok=True)
+    for chave, nome in ARQUIVOS.items():
+        caminho = os.path.join(diretorio, nome)
+        if os.path.exists(caminho):
+            continue
+        inicio = time.perf_counter()
+        parcial = caminho + '.parcial'
+        for i, ini in enumerate(range(0, n_linhas, BLOCO_GERACAO)):
+            n = min(BLOCO_GERACAO, n_linhas - ini)
+            if chave == 'lifestyle':
+                df = gerar_lifestyle(n, seed=i)
+            else:
+                df = GERADORES[chave](n, seed=i, inicio=ini + (chave == 'sintomas'))
+            df.to_csv(parcial, index=chave == 'linguistica', header=i == 0, mode='w' if i == 0 else 'a')
+        os.replace(parcial, caminho)
+        print(f"[Benchmark] {nome}: {n_linhas:,} linhas geradas em {time.perf_counter() - inicio:.1f}s")
+
+
+# --- Memória ---
+def zerar_pico_rss():
+    # Linux: '5' em clear_refs zera o VmHWM do processo
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def rss_mb(campo='VmRSS'):
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith(campo + ':'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    # Sem /proc: só o pico desde o início do processo (kB no Linux, bytes no macOS)
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (2 ** 20 if sys.platform == 'darwin' else 1024)
+
+
+def estatisticas(latencias, pico_rss, rss_inicial):
+    lat = np.asarray(latencias) * 1000
+    return {
+        'n': int(len(lat)),
+        'p50_ms': round(float(np.percentile(lat, 50)), 3),
+        'p99_ms': round(float(np.percentile(lat, 99)), 3),
+        'vazao_por_s': round(len(lat) / (lat.sum() / 1000), 2) if lat.sum() > 0 else None,
+        'pico_rss_mb': round(pico_rss, 1),
+        'rss_inicial_mb': round(rss_inicial, 1),
+    }
+
+
+def medir_caso(executar, repeticoes, aquecer=True):
+    # -> (estatísticas, resultado da última chamada); a chamada de aquecimento fica de fora
+    zerar_pico_rss()
+    rss_inicial = rss_mb()
+    resultado = executar() if aquecer else None
+    latencias = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = executar()
+        latencias.append(time.perf_counter() - inicio)
+    return estatisticas(latencias, rss_mb('VmHWM'), rss_inicial), resultado
+
+
+# --- Casos (rodam no processo filho, já dentro do diretório dos dados) ---
+def casos_funcoes():
+    import pandas as pd
+
+    import api
+    from agregacao_sintomas import construir_agregado
+    from linguistica import construir_indice, normalizar_colunas_corpus
+
+    corpus = normalizar_colunas_corpus(pd.read_csv(api.ARQUIVO_LINGUISTICA))
+    return {
+        'process_clusters': lambda: api.process_clusters(api.ARQUIVO_ARQUETIPOS),
+        'processar_sintomas': lambda: api.processar_sintomas(api.ARQUIVO_SINTOMAS),
+        'analyze_distinctive_words_logic': lambda: api.analyze_distinctive_words_logic(corpus, 'Depression', 'Normal'),
+        'construir_indice': lambda: construir_indice(api.ARQUIVO_LINGUISTICA, api.FINAL_STOPS),
+        'construir_agregado': lambda: construir_agregado(api.ARQUIVO_SINTOMAS),
+    }
+
+
+def casos_endpoints(cliente, etags):
+    from benchmarks.dados_sinteticos import gerar_lifestyle
+
+    registros = gerar_lifestyle(REGISTROS_ASSIGN, seed=99).to_json(orient='records').encode()
+
+    def get(url, **kwargs):
+        def executar():
+            r = cliente.get(url, **kwargs)
+            assert r.status_code in (200, 304), f"{url}: {r.status_code} {r.text[:200]}"
+            return r
+        return executar
+
+    def post_assign():
+        r = cliente.post('/api/arquetipos/assign', content=registros,
+                         headers={'Content-Type': 'application/json'})
+        assert r.status_code == 200, r.text[:200]
+        return r
+
+    return {
+        'GET /api/dashboard-data': get('/api/dashboard-data'),
+        'GET /api/dashboard-data (304)': get('/api/dashboard-data',
+                                             headers={'If-None-Match': etags.get('/api/dashboard-data', '')}),
+        'GET /api/dashboard-data?gender=Female&age=25-34': get('/api/dashboard-data',
+                                                               params={'gender': 'Female', 'age': '25-34'}),
+        'GET /api/dashboard-data/segmentos': get('/api/dashboard-data/segmentos'),
+        'GET /api/sintomas-heatmap': get('/api/sintomas-heatmap'),
+        'GET /api/sintomas-heatmap/agregado?por=Sadness&estatistica=quantil':
+            get('/api/sintomas-heatmap/agregado', params={'por': 'Sadness', 'estatistica': 'quantil', 'q': 0.9}),
+        'GET /api/sintomas-heatmap/opcoes': get('/api/sintomas-heatmap/opcoes'),
+        'GET /api/linguistica-data': get('/api/linguistica-data'),
+        'GET /api/linguistica-data/comparar?classe_a=Anxiety&classe_b=Stress':
+            get('/api/linguistica-data/comparar', params={'classe_a': 'Anxiety', 'classe_b': 'Stress'}),
+        f'POST /api/arquetipos/assign ({REGISTROS_ASSIGN} registros)': post_assign,
+    }
+
+
+def medir_tamanho(diretorio, repeticoes, requisicoes):
+    # Processo novo: caches colunar/artefatos dentro do diretório dos dados
+    os.chdir(diretorio)
+    os.environ['ARTEFATOS_DIR'] = os.path.join(diretorio, '.artefatos')
+    os.environ['COLUNAR_DIR'] = os.path.join(diretorio, '.colunar')
+
+    inicio = time.perf_counter()
+    import api
+    from fastapi.testclient import TestClient
+    resultado = {'import_api_s': round(time.perf_counter() - inicio, 3), 'funcoes': {}, 'endpoints': {}}
+
+    for nome, executar in casos_funcoes().items():
+        stats, _ = medir_caso(executar, repeticoes)
+        resultado['funcoes'][nome] = stats
+        print(f"[Benchmark] {nome}: p50 {stats['p50_ms']:.1f}ms, pico RSS {stats['pico_rss_mb']:.0f}MB")
+
+    inicio = time.perf_counter()
+    with TestClient(api.app) as cliente:
+        # Espera o primeiro cálculo de cada análise (os endpoints só leem snapshots)
+        for nome in api.CACHES_POR_ANALISE:
+            api.atualizador.obter(nome)
+        resultado['aquecimento_s'] = round(time.perf_counter() - inicio, 3)
+        etags = {'/api/dashboard-data': cliente.get('/api/dashboard-data').headers.get('etag', '')}
+
+        for nome, executar in casos_endpoints(cliente, etags).items():
+            stats, _ = medir_caso(executar, requisicoes)
+            resultado['endpoints'][nome] = stats
+            print(f"[Benchmark] {nome}: p50 {stats['p50_ms']:.2f}ms, p99 {stats['p99_ms']:.2f}ms, "
+                  f"{stats['vazao_por_s']:,.0f} req/s")
+    return resultado
+
+
+# --- Baseline ---
+def comparar(atual, baseline, tolerancia):
+    # -> lista de (tamanho, grupo, caso, métrica, base, atual)
+    regressoes = []
+    for tamanho, grupos in atual['resultados'].items():
+        base_tamanho = baseline.get('resultados', {}).get(tamanho)
+        if base_tamanho is None:
+            continue
+        for grupo in ('funcoes', 'endpoints'):
+            for caso, stats in grupos[grupo].items():
+                base = base_tamanho.get(grupo, {}).get(caso)
+                if base is None:
+                    continue
+                for metrica, piso in METRICAS_COMPARADAS.items():
+                    antes, depois = base.get(metrica), stats.get(metrica)
+                    if antes is None or depois is None:
+                        continue
+                    if depois > antes * (1 + tolerancia) and depois - antes > piso:
+                        regressoes.append((tamanho, grupo, caso, metrica, antes, depois))
+    return regressoes
+
+
+def ambiente():
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--tamanhos', default='10k', help="ex.: 10k,1M,10M")
+    parser.add_argument('--repeticoes', type=int, default=3, help="repetições de cada função")
+    parser.add_argument('--requisicoes', type=int, default=200, help="requisições por endpoint")
+    parser.add_argument('--dados', help="diretório onde os CSVs gerados ficam (reaproveitados entre execuções)")
+    parser.add_argument('--saida', help="grava o resultado em JSON")
+    parser.add_argument('--baseline', help="JSON de referência para comparação")
+    parser.add_argument('--salvar-baseline', action='store_true', help="grava o resultado como nova baseline")
+    parser.add_argument('--tolerancia', type=float, default=0.25, help="piora relativa aceita (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    tamanhos = [t.strip() for t in args.tamanhos.split(',') if t.strip()]
+    atual = {'ambiente': ambiente(), 'resultados': {}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        raiz = os.path.abspath(args.dados or tmp)
+        for tamanho in tamanhos:
+            diretorio = os.path.join(raiz, tamanho)
+            gerar_dados(diretorio, ler_tamanho(tamanho))
+            print(f"[Benchmark] Medindo {tamanho} linhas...")
+            # Um processo por tamanho: RSS, imports e caches em memória não vazam entre tamanhos
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+                atual['resultados'][tamanho] = executor.submit(
+                    medir_tamanho, diretorio, args.repeticoes, args.requisicoes).result()
+
+    if args.saida:
+        with open(args.saida, 'w') as f:
+            json.dump(atual, f, indent=2, ensure_ascii=False)
+
+    codigo = 0
+    if args.baseline and args.salvar_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(atual, f, indent=2, ensure_ascii=False)
+        print(f"[Benchmark] Baseline gravada em {args.baseline}")
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressoes = comparar(atual, baseline, args.tolerancia)
+        for tamanho, grupo, caso, metrica, antes, depois in regressoes:
+            print(f"[Benchmark] REGRESSÃO {tamanho} {caso} {metrica}: {antes} -> {depois} "
+                  f"(+{(depois / antes - 1) * 100:.0f}%)")
+        if regressoes:
+            codigo = 1
+        else:
+            print(f"[Benchmark] Nenhuma regressão acima de {args.tolerancia:.0%} em relação a {args.baseline}.")
+
+    print(f"\n{'tamanho':>8}  {'caso':<70} {'p50 ms':>10} {'p99 ms':>10} {'vazão/s':>10} {'pico MB':>8}")
+    for tamanho, grupos in atual['resultados'].items():
+        for grupo in ('funcoes', 'endpoints'):
+            for caso, s in grupos[grupo].items():
+                print(f"{tamanho:>8}  {caso:<70} {s['p50_ms']:>10.2f} {s['p99_ms']:>10.2f} "
+                      f"{s['vazao_por_s'] or 0:>10.1f} {s['pico_rss_mb']:>8.0f}")
+    sys.exit(codigo)
+
+
+if __name__ == '__main__':
+    main()
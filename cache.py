@@ -0,0 +1,161 @@
+# cache.py (Cache em memória para os resultados das análises)
+import hashlib
+import io
+import os
+import threading
+
+
+def assinatura_arquivo(filename):
+    # Identifica a versão do arquivo sem lê-lo: caminho absoluto + mtime + tamanho.
+    # Um os.stat custa microssegundos, então pode ser feito a cada requisição.
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (os.path.abspath(filename), st.st_mtime_ns, st.st_size)
+
+
+class LeituraLimitada(io.RawIOBase):
+    # Lê um arquivo só até `limite` bytes (linhas anexadas durante a leitura ficam para depois)
+
+    def __init__(self, arquivo, limite):
+        self.arquivo = arquivo
+        self.restante = limite
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.restante)
+        lidos = self.arquivo.readinto(memoryview(buffer)[:n]) if n else 0
+        self.restante -= lidos
+        return lidos
+
+
+def impressao_final(arquivo, fim, n=1024):
+    # Hash do último KiB já lido: detecta reescritas do arquivo sem relê-lo inteiro
+    inicio = max(0, fim - n)
+    arquivo.seek(inicio)
+    return hashlib.sha1(arquivo.read(fim - inicio)).hexdigest()
+
+
+def origem_arquivo(arquivo, tamanho):
+    # Até onde um CSV foi lido (arquivo aberto em 'rb'); base para ler_anexo()
+    arquivo.seek(0)
+    cabecalho = arquivo.readline()
+    impressao = impressao_final(arquivo, tamanho)
+    arquivo.seek(max(0, tamanho - 1))
+    return {
+        "bytes": tamanho,
+        "cabecalho": cabecalho.decode('utf-8'),
+        "impressao": impressao,
+        "quebra_final": arquivo.read(1) == b'\n',
+    }
+
+
+def ler_anexo(filename, origem):
+    # Linhas anexadas ao CSV desde `origem`: (cabeçalho + linhas novas, origem nova).
+    # (None, origem) se nada mudou; None se o arquivo não é só uma extensão do que já foi lido
+    cabecalho = origem["cabecalho"].encode('utf-8')
+    with open(filename, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho < origem["bytes"] or f.read(len(cabecalho)) != cabecalho \
+                or impressao_final(f, origem["bytes"]) != origem["impressao"]:
+            return None
+        if tamanho == origem["bytes"]:
+            return None, origem
+        f.seek(origem["bytes"])
+        novos = f.read(tamanho - origem["bytes"])
+        impressao = impressao_final(f, tamanho)
+    if not origem["quebra_final"] and novos[:1] not in (b'\n', b'\r'):
+        # A última linha lida foi continuada: não dá para só somar
+        return None
+    return cabecalho + novos, {**origem, "bytes": tamanho, "impressao": impressao,
+                               "quebra_final": novos.endswith(b'\n')}
+
+
+def chave_parametros(params):
+    # Dicionário de parâmetros -> tupla ordenada (hashable e estável)
+    return tuple(sorted((params or {}).items()))
+
+
+class CacheResultados:
+    # Guarda um resultado por nome de análise. A chave inclui a assinatura do
+    # arquivo de origem e os parâmetros; se qualquer um mudar, recalcula.
+
+    def __init__(self):
+        self._entradas = {}
+        self._locks = {}
+        self._lock_global = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refits = 0
+        # nome -> {"hits", "misses", "refits"}
+        self.por_nome = {}
+
+    def _lock_para(self, nome):
+        with self._lock_global:
+            if nome not in self._locks:
+                self._locks[nome] = threading.Lock()
+            return self._locks[nome]
+
+    def _contar(self, nome, tipo):
+        setattr(self, tipo, getattr(self, tipo) + 1)
+        contagem = self.por_nome.get(nome)
+        if contagem is None:
+            contagem = self.por_nome.setdefault(nome, {"hits": 0, "misses": 0, "refits": 0})
+        contagem[tipo] += 1
+
+    def obter(self, nome, filename, params, calcular):
+        chave = (assinatura_arquivo(filename), chave_parametros(params))
+
+        entrada = self._entradas.get(nome)
+        if entrada is not None and entrada[0] == chave:
+            self._contar(nome, "hits")
+            return entrada[1]
+
+        # Um lock por análise: requisições simultâneas esperam um único cálculo
+        with self._lock_para(nome):
+            entrada = self._entradas.get(nome)
+            if entrada is not None and entrada[0] == chave:
+                self._contar(nome, "hits")
+                return entrada[1]
+
+            if entrada is None:
+                self._contar(nome, "misses")
+            else:
+                # Já havia resultado, mas o CSV (ou os parâmetros) mudou
+                self._contar(nome, "refits")
+                print(f"[Cache] '{nome}' invalidado: arquivo ou parâmetros alterados.")
+
+            valor = calcular()
+            # Não guarda falhas; a próxima requisição tenta de novo
+            if valor is not None:
+                self._entradas[nome] = (chave, valor)
+            return valor
+
+    def invalidar(self, nome=None):
+        if nome is None:
+            self._entradas.clear()
+        else:
+            self._entradas.pop(nome, None)
+
+    def entradas(self):
+        # {nome: (chave, valor)}; cópia rasa, para medir ou levar ao disco
+        return dict(self._entradas)
+
+    def restaurar(self, entradas):
+        # Entradas recalculadas enquanto estas estavam fora têm prioridade
+        for nome, entrada in entradas.items():
+            self._entradas.setdefault(nome, entrada)
+
+    def stats(self):
+        total = self.hits + self.misses + self.refits
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refits": self.refits,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "entradas": sorted(self._entradas.keys()),
+            "por_nome": {nome: dict(c) for nome, c in sorted(self.por_nome.items())},
+        }
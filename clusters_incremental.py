@@ -0,0 +1,232 @@
+# clusters_incremental.py (K-Means em mini-lotes para datasets que não cabem na memória)
+#
+# Alternativa ao KMeans(n_init=10) de process_clusters: o CSV é lido em blocos e
+# o modelo é atualizado com partial_fit. O resultado tem o mesmo formato de
+# calcular_modelo_clusters (api.py), então a nomeação dos arquétipos não muda.
+#
+# Passadas sobre o arquivo:
+#   1. StandardScaler.partial_fit (média/desvio globais) + amostra aleatória uniforme
+#      das linhas; os centróides iniciais saem de um KMeans(n_init=10) nessa amostra
+#   2. MiniBatchKMeans.partial_fit em mini-lotes (repetida `epocas` vezes)
+#   3. predict + somas/contagens por cluster (médias do resumo e inércia)
+#
+# AjusteIncremental guarda o último ajuste de um CSV; se o arquivo só cresceu,
+# as linhas novas passam por atualizar() em vez de um novo ajuste completo
+# (mesma detecção de anexo de agregacao_sintomas.py).
+import copy
+import io
+import os
+import threading
+import time
+
+import numpy as np
+
+from cache import LeituraLimitada, ler_anexo, origem_arquivo
+from importacao import modulo_tardio
+from preprocessamento import FEATURES_ARQUETIPOS, preparar_lifestyle
+
+pd = modulo_tardio('pandas')
+
+# Parâmetros padrão do modo mini-batch (fazem parte da chave do cache/artefatos)
+MINIBATCH_PARAMS = {
+    "batch_size": int(os.environ.get('CLUSTER_BATCH_SIZE', 4096)),
+    "chunk_size": int(os.environ.get('CLUSTER_CHUNK_SIZE', 200_000)),
+    "epocas": int(os.environ.get('CLUSTER_EPOCAS', 3)),
+    "amostra_init": int(os.environ.get('CLUSTER_AMOSTRA_INIT', 50_000)),
+}
+
+
+def _features(df):
+    # Mesma limpeza de process_clusters (dropna na linha inteira)
+    df = preparar_lifestyle(df, codificar=False)
+    cols = [c for c in FEATURES_ARQUETIPOS if c in df.columns]
+    return cols, df[cols].to_numpy(dtype=np.float64)
+
+
+def ler_features_em_chunks(filename, chunk_size, limite=None):
+    # Bloco a bloco; com `limite`, só os primeiros bytes (todas as passadas veem as mesmas linhas)
+    with open(filename, 'rb') as f:
+        if limite is None:
+            limite = os.fstat(f.fileno()).st_size
+        with pd.read_csv(io.BufferedReader(LeituraLimitada(f, limite)), chunksize=chunk_size) as leitor:
+            for chunk in leitor:
+                cols, X = _features(chunk)
+                if len(X):
+                    yield cols, X
+
+
+class ClusterIncremental:
+
+    def __init__(self, cols, n_clusters=3, random_state=42, batch_size=4096, amostra_init=50_000):
+        from sklearn.preprocessing import StandardScaler
+
+        self.cols = list(cols)
+        self.n_clusters = n_clusters
+        self.random_state = random_state
+        self.batch_size = batch_size
+        self.scaler = StandardScaler()
+        self.kmeans = None
+        # Amostragem "bottom-k": cada linha recebe uma chave aleatória e ficam as menores
+        self.amostra_init = amostra_init
+        self._rng = np.random.default_rng(random_state)
+        self._amostra = np.empty((0, len(self.cols)))
+        self._chaves = np.empty(0)
+        self.somas = np.zeros((n_clusters, len(self.cols)))
+        self.contagens = np.zeros(n_clusters, dtype=np.int64)
+        self.inercia = 0.0
+
+    def ajustar_escala(self, X):
+        self.scaler.partial_fit(X)
+
+        chaves = np.concatenate([self._chaves, self._rng.random(len(X))])
+        amostra = np.concatenate([self._amostra, X])
+        if len(chaves) > self.amostra_init:
+            manter = np.argpartition(chaves, self.amostra_init - 1)[:self.amostra_init]
+            chaves, amostra = chaves[manter], amostra[manter]
+        self._chaves, self._amostra = chaves, amostra
+
+    def inicializar(self):
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+
+        # Inicialização robusta (várias sementes) sobre a amostra; o streaming só refina
+        amostra = self.scaler.transform(self._amostra)
+        inicial = KMeans(n_clusters=self.n_clusters, random_state=self.random_state, n_init=10).fit(amostra)
+        self.kmeans = MiniBatchKMeans(n_clusters=self.n_clusters, random_state=self.random_state,
+                                      batch_size=self.batch_size, init=inicial.cluster_centers_, n_init=1)
+        self.kmeans.partial_fit(amostra[:self.batch_size])
+        self._amostra = self._chaves = None
+
+    def treinar(self, X):
+        if self.kmeans is None:
+            self.inicializar()
+        X_scaled = self.scaler.transform(X)
+        for ini in range(0, len(X_scaled), self.batch_size):
+            self.kmeans.partial_fit(X_scaled[ini:ini + self.batch_size])
+
+    def acumular(self, X):
+        X_scaled = self.scaler.transform(X)
+        labels = self.kmeans.predict(X_scaled)
+        dist = ((X_scaled - self.kmeans.cluster_centers_[labels]) ** 2).sum(axis=1)
+        self.inercia += float(dist.sum())
+        np.add.at(self.somas, labels, X)
+        self.contagens += np.bincount(labels, minlength=self.n_clusters)
+        return labels.astype(np.int32)
+
+    def atualizar(self, X):
+        # Novas linhas chegando: atualiza centróides e o resumo em O(linhas novas).
+        # A escala fica congelada e as linhas antigas não são reatribuídas.
+        self.treinar(X)
+        return self.acumular(X)
+
+    def modelo(self, labels=None):
+        presentes = np.flatnonzero(self.contagens)
+        return {
+            "cols": np.array(self.cols),
+            "cluster_ids": presentes.astype(np.int64),
+            "summary": self.somas[presentes] / self.contagens[presentes, None],
+            "scaler_mean": self.scaler.mean_,
+            "scaler_scale": self.scaler.scale_,
+            "centroids": self.kmeans.cluster_centers_,
+            "labels": labels if labels is not None else np.zeros(0, dtype=np.int32),
+            "inertia": np.float64(self.inercia),
+        }
+
+
+def ajustar_incremental(filename, n_clusters=3, random_state=42, batch_size=4096,
+                        chunk_size=200_000, epocas=3, amostra_init=50_000):
+    # (ClusterIncremental, rótulos por linha, origem do arquivo lido) ou None
+    try:
+        with open(filename, 'rb') as f:
+            tamanho = os.fstat(f.fileno()).st_size
+            origem = origem_arquivo(f, tamanho)
+
+        modelo = None
+        for cols, X in ler_features_em_chunks(filename, chunk_size, tamanho):
+            if modelo is None:
+                if len(cols) < len(FEATURES_ARQUETIPOS):
+                    print(f"[Arquétipos] AVISO: Colunas insuficientes. Usando: {cols}")
+                modelo = ClusterIncremental(cols, n_clusters, random_state, batch_size, amostra_init)
+            modelo.ajustar_escala(X)
+
+        if modelo is None or len(modelo._amostra) < n_clusters:
+            print(f"[Arquétipos] AVISO: '{filename}' sem linhas válidas suficientes.")
+            return None
+        modelo.inicializar()
+
+        for _ in range(max(1, epocas)):
+            for _, X in ler_features_em_chunks(filename, chunk_size, tamanho):
+                modelo.treinar(X)
+
+        labels = [modelo.acumular(X) for _, X in ler_features_em_chunks(filename, chunk_size, tamanho)]
+        print(f"[Arquétipos] MiniBatchKMeans ajustado em blocos de {chunk_size} linhas.")
+        return modelo, np.concatenate(labels), origem
+
+    except FileNotFoundError:
+        print(f"[Arquétipos] ERRO: '{filename}' não encontrado.")
+        return None
+    except Exception as e:
+        print(f"[Arquétipos] Erro no processamento (mini-batch): {e}")
+        return None
+
+
+def ajustar_minibatch(filename, *args, **kwargs):
+    ajuste = ajustar_incremental(filename, *args, **kwargs)
+    return ajuste[0].modelo(ajuste[1]) if ajuste else None
+
+
+class AjusteIncremental:
+    # Último ajuste mini-batch de um CSV: modelo, rótulos e até onde o arquivo foi lido
+
+    def __init__(self, filename, params):
+        self.filename = filename
+        self.params = dict(params)
+        self.cluster = None
+        self.labels = None
+        self.origem = None
+        self._lock = threading.Lock()
+
+    # Serializável (ex.: dataset despejado para o disco, ver datasets.py); o lock não vai junto
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k != '_lock'}
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def _com_anexo(self):
+        # Modelo com as linhas anexadas ao CSV; None se o arquivo não é só uma extensão
+        anexo = ler_anexo(self.filename, self.origem)
+        if anexo is None:
+            return None
+        csv, origem = anexo
+        if csv is not None:
+            inicio = time.perf_counter()
+            cols, X = _features(pd.read_csv(io.BytesIO(csv)))
+            if cols != self.cluster.cols:
+                return None
+            if len(X):
+                # Numa cópia: quem estiver lendo o modelo anterior não é afetado
+                cluster = copy.deepcopy(self.cluster)
+                labels = np.concatenate([self.labels, cluster.atualizar(X)])
+                self.cluster, self.labels = cluster, labels
+                print(f"[Arquétipos] +{len(X)} linhas somadas ao modelo "
+                      f"em {(time.perf_counter() - inicio) * 1000:.1f}ms (incremental).")
+            self.origem = origem
+        return self.cluster.modelo(self.labels)
+
+    def sincronizar(self):
+        # Modelo do CSV atual: incremental quando possível, senão um ajuste completo
+        with self._lock:
+            if self.cluster is not None:
+                try:
+                    modelo = self._com_anexo()
+                except Exception as e:
+                    print(f"[Arquétipos] Anexo não aplicado, reajustando: {e}")
+                    modelo = None
+                if modelo is not None:
+                    return modelo
+            ajuste = ajustar_incremental(self.filename, **self.params)
+            if ajuste is None:
+                return None
+            self.cluster, self.labels, self.origem = ajuste
+            return self.cluster.modelo(self.labels)
@@ -0,0 +1,53 @@
+# coalescencia.py (Cálculos das requisições num pool limitado, com single-flight)
+#
+# Os handlers são async: o que é só leitura de snapshot roda direto no event
+# loop e o que custa CPU vai para um ThreadPoolExecutor de tamanho fixo. Se
+# várias requisições pedem o mesmo cálculo (mesma chave) ao mesmo tempo, só a
+# primeira o dispara; as outras aguardam o mesmo Future e recebem o mesmo
+# resultado (ou a mesma exceção). Quem espera não ocupa thread nenhuma.
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Mesmo padrão do ThreadPoolExecutor: numpy/pandas soltam o GIL, e um cálculo
+# longo (ex.: varredura de k) não pode ocupar o pool inteiro
+CALCULO_WORKERS = int(os.environ.get('CALCULO_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+
+
+class ExecutorCoalescente:
+
+    def __init__(self, max_workers=CALCULO_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='calculo')
+        # chave -> asyncio.Future em andamento (só acessado de dentro do event loop)
+        self._em_voo = {}
+        self.executados = 0
+        self.coalescidos = 0
+
+    async def executar(self, chave, funcao, *args, **kwargs):
+        # chave None = sem coalescência (ex.: corpo de requisição diferente a cada chamada)
+        loop = asyncio.get_running_loop()
+        chamada = functools.partial(funcao, *args, **kwargs)
+        if chave is None:
+            self.executados += 1
+            return await loop.run_in_executor(self._executor, chamada)
+
+        futuro = self._em_voo.get(chave)
+        if futuro is None:
+            futuro = loop.run_in_executor(self._executor, chamada)
+            self._em_voo[chave] = futuro
+            futuro.add_done_callback(lambda _: self._em_voo.pop(chave, None))
+            self.executados += 1
+        else:
+            self.coalescidos += 1
+        # shield: se um cliente desiste, o cálculo continua para os outros
+        return await asyncio.shield(futuro)
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "em_andamento": len(self._em_voo),
+            "executados": self.executados,
+            "coalescidos": self.coalescidos,
+        }
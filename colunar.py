@@ -0,0 +1,213 @@
+# colunar.py (Cache colunar binário dos CSVs)
+#
+# Cada CSV é convertido uma vez para um diretório com um .npy por coluna:
+#   - numéricas inteiras -> menor int que comporta os valores (int8/16/32/64)
+#   - demais numéricas   -> float32
+#   - texto              -> códigos inteiros pequenos + lista de categorias em
+#                           ordem alfabética (mesmos códigos do LabelEncoder;
+#                           -1 = valor ausente)
+# Os .npy são abertos com mmap, então ler só as colunas necessárias custa
+# poucos open()/mmap() e nada de parse. A conversão é feita em blocos e o
+# cache é refeito sozinho quando a assinatura (mtime/tamanho) do CSV muda.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from cache import assinatura_arquivo
+from importacao import modulo_tardio
+
+pd = modulo_tardio('pandas')
+
+VERSAO_COLUNAR = 1
+DIRETORIO_COLUNAR = os.environ.get('COLUNAR_DIR', '.colunar')
+TAMANHO_CHUNK = int(os.environ.get('COLUNAR_CHUNK_SIZE', 500_000))
+
+
+def _diretorio_cache(filename, diretorio=None):
+    base = os.path.splitext(os.path.basename(filename))[0].replace(' ', '_')
+    origem = hashlib.sha1(os.path.abspath(filename).encode()).hexdigest()[:8]
+    return os.path.join(diretorio or DIRETORIO_COLUNAR, f"{base}-{origem}")
+
+
+def _menor_int(minimo, maximo):
+    for tipo in (np.int8, np.int16, np.int32):
+        info = np.iinfo(tipo)
+        if info.min <= minimo and maximo <= info.max:
+            return tipo
+    return np.int64
+
+
+class _Coluna:
+    # Acumula uma coluna bloco a bloco num arquivo bruto temporário
+
+    def __init__(self, nome, caminho_bruto):
+        self.nome = nome
+        self.caminho_bruto = caminho_bruto
+        self.arquivo = open(self.caminho_bruto, 'wb')
+        self.numerica = None
+        self.inteira = True
+        self.tem_nulo = False
+        self.minimo, self.maximo = np.inf, -np.inf
+        self.categorias = {}
+        self.n = 0
+
+    def adicionar(self, serie):
+        numerica = pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype)
+        if self.numerica is None:
+            self.numerica = numerica
+        elif self.numerica != numerica:
+            raise TypeError(self.nome)
+
+        if self.numerica:
+            valores = serie.to_numpy(dtype=np.float64)
+            validos = valores[~np.isnan(valores)]
+            self.tem_nulo |= len(validos) < len(valores)
+            if len(validos):
+                self.inteira &= bool(np.all(validos == np.floor(validos)))
+                self.minimo = min(self.minimo, validos.min())
+                self.maximo = max(self.maximo, validos.max())
+            self.arquivo.write(valores.tobytes())
+        else:
+            # Códigos provisórios na ordem de aparição; reordenados no final
+            codigos, uniques = pd.factorize(serie)
+            remap = np.array([self.categorias.setdefault(str(u), len(self.categorias)) for u in uniques],
+                             dtype=np.int64)
+            codigos = np.where(codigos >= 0, remap[codigos] if len(remap) else -1, -1)
+            self.arquivo.write(codigos.astype(np.int64).tobytes())
+        self.n += len(serie)
+
+    def finalizar(self, destino, bloco=TAMANHO_CHUNK):
+        self.arquivo.close()
+        bruto = np.memmap(self.caminho_bruto, dtype=np.float64 if self.numerica else np.int64,
+                          mode='r', shape=(self.n,)) if self.n else np.zeros(0)
+
+        if self.numerica:
+            if self.inteira and not self.tem_nulo and self.n:
+                dtype, categorias = _menor_int(self.minimo, self.maximo), None
+            else:
+                dtype, categorias = np.float32, None
+            converter = lambda parte: parte.astype(dtype)
+        else:
+            nomes = sorted(self.categorias)
+            ordem = np.empty(len(nomes), dtype=np.int64)
+            for novo, nome in enumerate(nomes):
+                ordem[self.categorias[nome]] = novo
+            dtype, categorias = _menor_int(-1, max(len(nomes) - 1, 0)), nomes
+            converter = lambda parte: np.where(parte >= 0, ordem[np.maximum(parte, 0)] if len(ordem) else -1,
+                                               -1).astype(dtype)
+
+        saida = np.lib.format.open_memmap(destino, mode='w+', dtype=dtype, shape=(self.n,))
+        for ini in range(0, self.n, bloco):
+            saida[ini:ini + bloco] = converter(np.asarray(bruto[ini:ini + bloco]))
+        saida.flush()
+        del saida, bruto
+        os.remove(self.caminho_bruto)
+        return {"dtype": np.dtype(dtype).name, "categorias": categorias}
+
+
+def converter_csv(filename, diretorio=None, chunk_size=None, _forcar_texto=()):
+    destino = _diretorio_cache(filename, diretorio)
+    pai = os.path.dirname(destino) or '.'
+    os.makedirs(pai, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=pai, prefix='.conv-')
+    assinatura = assinatura_arquivo(filename)
+
+    try:
+        colunas = {}
+        dtype_texto = {c: str for c in _forcar_texto}
+        with pd.read_csv(filename, chunksize=chunk_size or TAMANHO_CHUNK, dtype=dtype_texto) as leitor:
+            for chunk in leitor:
+                for nome in chunk.columns:
+                    if nome not in colunas:
+                        colunas[nome] = _Coluna(nome, os.path.join(tmp, f"{len(colunas)}.raw"))
+                    colunas[nome].adicionar(chunk[nome])
+    except TypeError as e:
+        # Coluna numérica num bloco e texto em outro: refaz tratando-a como texto
+        for coluna in colunas.values():
+            coluna.arquivo.close()
+        shutil.rmtree(tmp, ignore_errors=True)
+        return converter_csv(filename, diretorio, chunk_size, tuple(_forcar_texto) + (e.args[0],))
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    manifesto = {"versao": VERSAO_COLUNAR, "assinatura": list(assinatura[1:]),
+                 "linhas": 0, "colunas": {}}
+    for i, (nome, coluna) in enumerate(colunas.items()):
+        arquivo = f"c{i}.npy"
+        info = coluna.finalizar(os.path.join(tmp, arquivo))
+        manifesto["colunas"][nome] = {"arquivo": arquivo, **info}
+        manifesto["linhas"] = coluna.n
+    with open(os.path.join(tmp, 'manifesto.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifesto, f, ensure_ascii=False)
+
+    # Troca o diretório inteiro de uma vez (leitores antigos mantêm seus mmaps)
+    antigo = None
+    if os.path.exists(destino):
+        antigo = tempfile.mkdtemp(dir=pai, prefix='.old-')
+        os.replace(destino, os.path.join(antigo, 'x'))
+    os.replace(tmp, destino)
+    if antigo:
+        shutil.rmtree(antigo, ignore_errors=True)
+    print(f"[Colunar] '{filename}' convertido: {manifesto['linhas']} linhas, {len(colunas)} colunas.")
+    return manifesto
+
+
+def _manifesto_valido(filename, destino):
+    try:
+        with open(os.path.join(destino, 'manifesto.json'), encoding='utf-8') as f:
+            manifesto = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    assinatura = assinatura_arquivo(filename)
+    if manifesto.get("versao") != VERSAO_COLUNAR or assinatura is None \
+            or manifesto.get("assinatura") != list(assinatura[1:]):
+        return None
+    return manifesto
+
+
+class TabelaColunar:
+    # Colunas em mmap (somente leitura) + categorias das colunas de texto
+
+    def __init__(self, diretorio, manifesto, colunas=None):
+        self.linhas = manifesto["linhas"]
+        self.info = manifesto["colunas"]
+        nomes = list(self.info) if colunas is None else [c for c in colunas if c in self.info]
+        self.colunas = {
+            nome: np.load(os.path.join(diretorio, self.info[nome]["arquivo"]), mmap_mode='r')
+            for nome in nomes
+        }
+
+    def categorias(self, nome):
+        return self.info[nome]["categorias"]
+
+    def para_dataframe(self):
+        # Texto vira pd.Categorical sobre os próprios códigos (sem decodificar strings)
+        dados = {}
+        for nome, valores in self.colunas.items():
+            categorias = self.categorias(nome)
+            if categorias is None:
+                dados[nome] = valores
+            else:
+                dados[nome] = pd.Categorical.from_codes(valores, categories=categorias)
+        return pd.DataFrame(dados, copy=False)
+
+
+def carregar_colunas(filename, colunas=None, diretorio=None):
+    if not os.path.exists(filename):
+        raise FileNotFoundError(filename)
+    destino = _diretorio_cache(filename, diretorio)
+    manifesto = _manifesto_valido(filename, destino)
+    if manifesto is None:
+        manifesto = converter_csv(filename, diretorio)
+    return TabelaColunar(destino, manifesto, colunas)
+
+
+def ler_tabela(filename, colunas=None, diretorio=None):
+    # Substituto de pd.read_csv(filename) usando o cache colunar
+    return carregar_colunas(filename, colunas, diretorio).para_dataframe()
+
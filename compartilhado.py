@@ -0,0 +1,220 @@
+# compartilhado.py (Arrays publicados uma vez e mapeados por todos os workers)
+#
+# Com vários workers do uvicorn/gunicorn, cada processo carregava sua própria
+# cópia dos rótulos dos clusters, do cubo e das contagens de termos por classe
+# (o vocabulário do corpus sozinho passa de dezenas de MB). Aqui cada artefato
+# numpy vira um diretório <tipo>-v<versão>-<chave>/ com um .npy por array (sem
+# compressão): o primeiro processo que precisa dele calcula ou lê o .npz e
+# publica; os demais só fazem np.load(mmap_mode='r'). As páginas mapeadas vêm do
+# page cache do kernel e são as mesmas em todos os processos (zero cópia,
+# somente leitura), então a memória dos dados não cresce com o número de workers.
+#
+# A publicação é serializada por um flock por artefato: na subida com 16
+# workers, um calcula e os outros esperam e anexam. COMPARTILHADO_DIR num tmpfs
+# (ex.: /dev/shm/mindscape) mantém os arrays fora do disco.
+#
+# Cada publicação guarda a origem (CSV + parâmetros) no manifesto; publicada
+# uma versão nova de uma origem, os diretórios das versões anteriores dela são
+# apagados. Processos que ainda mapeiam os arrays antigos seguem lendo (no
+# POSIX o arquivo só some de fato quando o último mapeamento é desfeito), e num
+# tmpfs a memória volta ao sistema nesse momento.
+import ctypes
+import ctypes.util
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava; publicações simultâneas ficam com a primeira
+    fcntl = None
+
+VERSAO_COMPARTILHADO = 1
+DIRETORIO_COMPARTILHADO = os.environ.get('COMPARTILHADO_DIR', '.compartilhado')
+MEMORIA_COMPARTILHADA = os.environ.get('MEMORIA_COMPARTILHADA', '1') == '1'
+# Arenas do malloc da glibc por processo (0 = padrão da glibc, 8 por núcleo)
+MALLOC_ARENAS = int(os.environ.get('MALLOC_ARENAS', 1))
+M_ARENA_MAX = -8
+# Início dos processos filhos (seleção de k, aquecimento): 'forkserver' ou 'spawn'
+INICIO_PROCESSOS = os.environ.get('PROCESSOS_INICIO', 'forkserver')
+
+
+def limitar_arenas(arenas=MALLOC_ARENAS):
+    # Cada thread de refresh ganhava uma arena própria, e os temporários dos cálculos
+    # (matrizes densas do keyness, DataFrames) deixavam ~13 MB presos nelas em cada
+    # worker, mesmo depois de liberados. Chamar antes de criar as threads
+    if _libc is not None and arenas > 0:
+        _libc.mallopt(M_ARENA_MAX, arenas)
+
+
+def contexto_processos(metodo=INICIO_PROCESSOS):
+    # Nunca 'fork': os pools são criados com as threads do refresh e das requisições vivas,
+    # e um filho que herda um lock preso (logging, BLAS, malloc) trava para sempre
+    if metodo not in multiprocessing.get_all_start_methods():
+        metodo = 'spawn'
+    return multiprocessing.get_context(metodo)
+
+
+def devolver_memoria():
+    # Páginas livres do heap de volta ao sistema depois de um cálculo
+    if _libc is not None:
+        _libc.malloc_trim(0)
+
+
+def _carregar_libc():
+    nome = ctypes.util.find_library('c')
+    try:
+        libc = ctypes.CDLL(nome) if nome else None
+    except OSError:
+        return None
+    # Só na glibc (musl/macOS/Windows não têm malloc_trim)
+    return libc if libc is not None and hasattr(libc, 'malloc_trim') else None
+
+
+_libc = _carregar_libc()
+
+
+class ArmazemCompartilhado:
+
+    def __init__(self, diretorio=DIRETORIO_COMPARTILHADO):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        # Contadores deste processo
+        self.publicados = 0
+        self.anexados = 0
+        self.esperas = 0
+        self.removidos = 0
+
+    def caminho(self, tipo, chave):
+        return os.path.join(self.diretorio, f"{tipo}-v{VERSAO_COMPARTILHADO}-{chave}")
+
+    def anexar(self, tipo, chave):
+        # {nome: memmap somente leitura} ou None se ainda não foi publicado
+        destino = self.caminho(tipo, chave)
+        try:
+            with open(os.path.join(destino, 'manifesto.json'), encoding='utf-8') as f:
+                manifesto = json.load(f)
+            arrays = {nome: np.load(os.path.join(destino, f"{nome}.npy"), mmap_mode='r')
+                      for nome in manifesto["arrays"]}
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, OSError) as e:
+            print(f"[Compartilhado] Ignorando '{destino}' corrompido: {e}")
+            return None
+        with self._lock:
+            self.anexados += 1
+        return arrays
+
+    def publicar(self, tipo, chave, arrays, origem=None):
+        # origem: identifica o que o artefato representa (ex.: CSV + parâmetros); None = não varre
+        destino = self.caminho(tipo, chave)
+        os.makedirs(self.diretorio, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=self.diretorio, prefix='.pub-')
+        try:
+            for nome, valor in arrays.items():
+                np.save(os.path.join(tmp, f"{nome}.npy"), np.asarray(valor), allow_pickle=False)
+            manifesto = {"arrays": list(arrays), "bytes": int(sum(np.asarray(v).nbytes for v in arrays.values())),
+                         "publicado_em": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                         "pid": os.getpid(), "origem": origem}
+            with open(os.path.join(tmp, 'manifesto.json'), 'w', encoding='utf-8') as f:
+                json.dump(manifesto, f)
+            # Troca atômica do diretório inteiro; se outro processo chegou antes, vale o dele
+            os.replace(tmp, destino)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if not os.path.exists(destino):
+                raise
+            return
+        with self._lock:
+            self.publicados += 1
+        print(f"[Compartilhado] '{tipo}' publicado ({chave}, {manifesto['bytes'] / 2 ** 20:.1f} MB).")
+        if origem is not None:
+            self.varrer(tipo, chave, origem)
+
+    def varrer(self, tipo, chave, origem):
+        # Apaga as versões de `tipo` com a mesma origem e outra chave (substituídas pela atual)
+        prefixo = f"{tipo}-v{VERSAO_COMPARTILHADO}-"
+        manter = os.path.basename(self.caminho(tipo, chave))
+        removidos = 0
+        for nome in os.listdir(self.diretorio):
+            if not nome.startswith(prefixo) or nome == manter or nome.endswith('.lock'):
+                continue
+            caminho = os.path.join(self.diretorio, nome)
+            try:
+                with open(os.path.join(caminho, 'manifesto.json'), encoding='utf-8') as f:
+                    if json.load(f).get("origem") != origem:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(caminho, ignore_errors=True)
+            try:
+                os.remove(caminho + '.lock')
+            except OSError:
+                pass
+            removidos += 1
+        if removidos:
+            with self._lock:
+                self.removidos += removidos
+            print(f"[Compartilhado] {removidos} versão(ões) antiga(s) de '{tipo}' removida(s).")
+        return removidos
+
+    @contextmanager
+    def _trava(self, tipo, chave):
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        with open(self.caminho(tipo, chave) + '.lock', 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def obter(self, tipo, chave, carregar, origem=None):
+        # carregar() devolve o dict de arrays (lido do .npz ou calculado) ou None
+        arrays = self.anexar(tipo, chave)
+        if arrays is not None:
+            return arrays
+        with self._trava(tipo, chave):
+            arrays = self.anexar(tipo, chave)
+            if arrays is not None:
+                # Outro processo publicou enquanto este esperava a trava
+                with self._lock:
+                    self.esperas += 1
+                return arrays
+            dados = carregar()
+            if dados is None:
+                return None
+            try:
+                self.publicar(tipo, chave, dados, origem)
+            except OSError as e:
+                # Sem onde gravar, o processo segue com a própria cópia
+                print(f"[Compartilhado] Não foi possível publicar '{tipo}': {e}")
+                return dados
+        # Quem publicou também passa a usar o mapeamento; a cópia privada é liberada
+        return self.anexar(tipo, chave) or dados
+
+    def stats(self):
+        publicados = {}
+        if os.path.isdir(self.diretorio):
+            for nome in sorted(os.listdir(self.diretorio)):
+                try:
+                    with open(os.path.join(self.diretorio, nome, 'manifesto.json'), encoding='utf-8') as f:
+                        publicados[nome] = json.load(f)["bytes"]
+                except (OSError, ValueError, KeyError):
+                    continue
+        return {
+            "diretorio": self.diretorio,
+            "artefatos": len(publicados),
+            "bytes": sum(publicados.values()),
+            "processo": {"pid": os.getpid(), "publicados": self.publicados,
+                         "anexados": self.anexados, "esperas": self.esperas, "removidos": self.removidos},
+        }
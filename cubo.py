@@ -0,0 +1,123 @@
+# cubo.py (Cubo pré-agregado de arquétipos por segmento)
+#
+# Para cada combinação (cluster, gender, employment_status, work_environment,
+# faixa etária) guarda a soma de cada feature e a contagem de linhas. Qualquer
+# filtro vira uma seleção de fatias + soma sobre poucas centenas de células,
+# independente do tamanho do dataset; o ajuste do K-Means não é refeito.
+import numpy as np
+
+from importacao import modulo_tardio
+
+pd = modulo_tardio('pandas')
+
+DIMENSOES_CUBO = ['gender', 'employment_status', 'work_environment', 'age']
+
+# Limites inferiores das faixas etárias (a última é aberta)
+FAIXAS_ETARIAS = [0, 18, 25, 35, 45, 55, 65]
+
+
+def rotulos_faixas(limites=FAIXAS_ETARIAS):
+    rotulos = []
+    for ini, fim in zip(limites, limites[1:]):
+        rotulos.append(f"<{fim}" if ini == 0 else f"{ini}-{fim - 1}")
+    return rotulos + [f"{limites[-1]}+"]
+
+
+def _codificar(df, dim):
+    # -> (códigos por linha, categorias)
+    if dim == 'age':
+        idade = pd.to_numeric(df['age'], errors='coerce').to_numpy(dtype=np.float64)
+        codigos = np.digitize(idade, FAIXAS_ETARIAS[1:])
+        return codigos, rotulos_faixas()
+    serie = df[dim]
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        serie = serie.astype(str).astype('category')
+    serie = serie.cat.remove_unused_categories()
+    return serie.cat.codes.to_numpy(dtype=np.int64), [str(c) for c in serie.cat.categories]
+
+
+class CuboSegmentos:
+
+    def __init__(self, dimensoes, categorias, cols, cluster_ids, somas, contagens):
+        self.dimensoes = list(dimensoes)
+        self.categorias = [list(c) for c in categorias]
+        self.cols = list(cols)
+        self.cluster_ids = [int(c) for c in cluster_ids]
+        # somas: (clusters, *dims, features); contagens: (clusters, *dims)
+        self.somas = somas
+        self.contagens = contagens
+
+    @classmethod
+    def construir(cls, df, labels, cols, cluster_ids):
+        # df já limpo (mesmas linhas, na mesma ordem, usadas no ajuste) e labels por linha
+        dimensoes = [d for d in DIMENSOES_CUBO if d in df.columns]
+        codigos, categorias = zip(*(_codificar(df, d) for d in dimensoes)) if dimensoes else ((), ())
+
+        cluster_ids = list(cluster_ids)
+        posicao_cluster = np.full(max(cluster_ids) + 1, -1, dtype=np.int64)
+        posicao_cluster[cluster_ids] = np.arange(len(cluster_ids))
+        eixos = [posicao_cluster[np.asarray(labels)]] + list(codigos)
+        forma = (len(cluster_ids),) + tuple(len(c) for c in categorias)
+
+        celula = np.ravel_multi_index(eixos, forma)
+        n_celulas = int(np.prod(forma))
+        contagens = np.bincount(celula, minlength=n_celulas).reshape(forma)
+        valores = df[cols].to_numpy(dtype=np.float64)
+        somas = np.stack([np.bincount(celula, weights=valores[:, j], minlength=n_celulas)
+                          for j in range(len(cols))], axis=-1).reshape(forma + (len(cols),))
+        return cls(dimensoes, categorias, cols, cluster_ids, somas, contagens)
+
+    # --- Serialização (formato do armazém de artefatos) ---
+    def para_arrays(self):
+        arrays = {
+            "dimensoes": np.array(self.dimensoes, dtype=str),
+            "cols": np.array(self.cols, dtype=str),
+            "cluster_ids": np.array(self.cluster_ids, dtype=np.int64),
+            "somas": self.somas,
+            "contagens": self.contagens,
+        }
+        for i, cats in enumerate(self.categorias):
+            arrays[f"categorias_{i}"] = np.array(cats, dtype=str)
+        return arrays
+
+    @classmethod
+    def de_arrays(cls, arrays):
+        dimensoes = [str(d) for d in arrays["dimensoes"]]
+        categorias = [[str(c) for c in arrays[f"categorias_{i}"]] for i in range(len(dimensoes))]
+        return cls(dimensoes, categorias, [str(c) for c in arrays["cols"]],
+                   arrays["cluster_ids"], arrays["somas"], arrays["contagens"])
+
+    # --- Consultas ---
+    def selecionar(self, filtros):
+        # filtros: {dimensão: [valores]}; dimensão ausente = todos os valores.
+        # Comparação sem diferenciar maiúsculas. Dimensão/valor desconhecido -> ValueError.
+        somas, contagens = self.somas, self.contagens
+        for eixo, (dim, cats) in enumerate(zip(self.dimensoes, self.categorias), start=1):
+            valores = filtros.get(dim)
+            if not valores:
+                continue
+            minusculas = {c.lower(): i for i, c in enumerate(cats)}
+            desconhecidos = [v for v in valores if str(v).lower() not in minusculas]
+            if desconhecidos:
+                raise ValueError(f"Valor(es) {desconhecidos} não existem em '{dim}'. Opções: {cats}")
+            idx = sorted({minusculas[str(v).lower()] for v in valores})
+            somas = np.take(somas, idx, axis=eixo)
+            contagens = np.take(contagens, idx, axis=eixo)
+        desconhecidas = set(filtros) - set(self.dimensoes)
+        if desconhecidas:
+            raise ValueError(f"Dimensão(ões) {sorted(desconhecidas)} não existem. Opções: {self.dimensoes}")
+
+        eixos = tuple(range(1, contagens.ndim))
+        return somas.sum(axis=eixos), contagens.sum(axis=eixos)
+
+    def consultar(self, filtros=None):
+        # -> ({cluster: {coluna: média}}, linhas no segmento); clusters vazios ficam de fora
+        somas, contagens = self.selecionar(filtros or {})
+        resumo = {}
+        for pos, cluster in enumerate(self.cluster_ids):
+            if contagens[pos] > 0:
+                resumo[cluster] = dict(zip(self.cols, (float(v) for v in somas[pos] / contagens[pos])))
+        return resumo, int(contagens.sum())
+
+    def opcoes(self):
+        return dict(zip(self.dimensoes, self.categorias))
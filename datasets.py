@@ -0,0 +1,403 @@
+# datasets.py (Vários datasets no mesmo serviço, com orçamento de memória)
+#
+# Cada clínica tem os mesmos três CSVs num diretório próprio, DATASETS_DIR/<id>/
+# (os da raiz continuam sendo o dataset padrão). Cada dataset tem seu cache de
+# resultados, suas respostas prontas e suas análises no AtualizadorBackground
+# (o padrão com os nomes de sempre, os demais como "<id>:<análise>"); as análises
+# de um dataset novo só são registradas no primeiro acesso.
+#
+# O que cada dataset ocupa é medido percorrendo snapshots e caches: heap e, à
+# parte, os arrays mapeados do armazém compartilhado (page cache, mas também no
+# RSS do processo); o orçamento, DATASETS_ORCAMENTO_MB, vale para a soma. Passando
+# dele, os datasets menos usados recentemente são despejados inteiros num pickle
+# em DATASETS_SPILL_DIR, com os memmaps (e views deles) gravados só como
+# referência ao arquivo; o próximo acesso os restaura sem recalcular nada. O
+# dataset acessado e os que têm cálculo em andamento nunca são despejados. O
+# orçamento vale por processo.
+import mmap
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from artefatos import gravar_atomico
+from cache import CacheResultados
+
+DATASET_PADRAO = os.environ.get('DATASET_PADRAO', 'padrao')
+DIRETORIO_DATASETS = os.environ.get('DATASETS_DIR', 'datasets')
+DIRETORIO_SPILL = os.environ.get('DATASETS_SPILL_DIR', '.datasets_spill')
+# 0 = sem limite (só mede)
+ORCAMENTO_BYTES = int(float(os.environ.get('DATASETS_ORCAMENTO_MB', 2048)) * 2 ** 20)
+
+_ID_VALIDO = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.-]*$')
+_NAO_PERCORRER = (type, types.ModuleType, types.FunctionType, types.MethodType,
+                  types.BuiltinFunctionType, types.CodeType)
+
+
+def medir_objetos(raizes):
+    # (bytes no heap, bytes mapeados de arquivo) de tudo que é alcançável a partir
+    # das raízes; cada objeto (e cada buffer de array) conta uma vez
+    vistos = set()
+    proprio = mapeado = 0
+    pilha = list(raizes)
+    while pilha:
+        obj = pilha.pop()
+        if obj is None or id(obj) in vistos or isinstance(obj, _NAO_PERCORRER):
+            continue
+        vistos.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            # Views contam pelo array dono do buffer
+            dono = obj
+            while isinstance(dono.base, np.ndarray):
+                dono = dono.base
+            if dono is not obj:
+                if id(dono) in vistos:
+                    continue
+                vistos.add(id(dono))
+            if isinstance(dono.base, mmap.mmap):
+                mapeado += dono.nbytes
+            else:
+                proprio += dono.nbytes
+                if dono.dtype.hasobject:
+                    pilha.extend(dono.ravel().tolist())
+            continue
+        if type(obj).__module__.startswith('pandas') and hasattr(obj, 'memory_usage'):
+            uso = obj.memory_usage(deep=True)
+            proprio += int(uso.sum() if hasattr(uso, 'sum') else uso)
+            continue
+        proprio += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            pilha.extend(obj.keys())
+            pilha.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            pilha.extend(obj)
+        elif not isinstance(obj, (str, bytes, bytearray, int, float, complex)):
+            if hasattr(obj, '__dict__'):
+                pilha.append(obj.__dict__)
+            for classe in type(obj).__mro__:
+                for slot in getattr(classe, '__slots__', ()):
+                    pilha.append(getattr(obj, slot, None))
+    return proprio, mapeado
+
+
+def _dono_mapeado(arr):
+    # Memmap de arquivo que é dono do buffer de arr (arr ou um array do qual arr é view), ou None
+    dono = arr
+    while isinstance(dono.base, np.ndarray):
+        dono = dono.base
+    if isinstance(dono, np.memmap) and isinstance(dono.base, mmap.mmap) and dono.filename:
+        return dono
+    return None
+
+
+class _Despejo(pickle.Pickler):
+    # Arrays sobre memmaps de arquivo (e views deles) viram referência: arquivo + posição
+    # no mapeamento; o resto é serializado normalmente
+    def persistent_id(self, obj):
+        if not isinstance(obj, np.ndarray):
+            return None
+        dono = _dono_mapeado(obj)
+        if dono is None:
+            return None
+        deslocamento = obj.__array_interface__['data'][0] - dono.__array_interface__['data'][0]
+        return ("memmap", dono.filename, dono.offset, dono.nbytes, dono.mode,
+                obj.dtype, obj.shape, obj.strides, deslocamento)
+
+
+class _Restauracao(pickle.Unpickler):
+    def __init__(self, arquivo):
+        super().__init__(arquivo)
+        # Um mapeamento por arquivo, compartilhado pelas views
+        self._mapas = {}
+
+    def persistent_load(self, pid):
+        _, filename, offset, nbytes, modo, dtype, forma, passos, deslocamento = pid
+        chave = (filename, offset, nbytes)
+        if chave not in self._mapas:
+            self._mapas[chave] = np.memmap(filename, dtype=np.uint8, mode=modo, offset=offset, shape=(nbytes,))
+        return np.ndarray(forma, dtype=dtype, buffer=self._mapas[chave], offset=deslocamento, strides=passos)
+
+
+def _iso(momento):
+    return datetime.fromtimestamp(momento, timezone.utc).isoformat(timespec='seconds') if momento else None
+
+
+class Dataset:
+
+    def __init__(self, id_dataset, arquivos, padrao=False):
+        self.id = id_dataset
+        self.arquivos = dict(arquivos)
+        self.padrao = padrao
+        self.cache = CacheResultados()
+        # análise -> (geração, RespostaPronta)
+        self.respostas = {}
+        # Estado de longa duração das análises (ex.: agregador incremental dos sintomas)
+        self.objetos = {}
+        self.analises = []
+        # 'inativo' (nunca carregado), 'residente' ou 'em_disco'
+        self.estado = 'inativo'
+        self.hits = 0
+        self.misses = 0
+        self.despejos = 0
+        self.restauracoes = 0
+        self.ultimo_acesso = None
+        self.bytes = 0
+        self.mapeado = 0
+        self.spill_bytes = 0
+        self.marca_medida = None
+
+    def analise(self, nome):
+        # Nome no AtualizadorBackground; o padrão mantém os nomes de antes
+        return nome if self.padrao else f"{self.id}:{nome}"
+
+
+class RegistroDatasets:
+
+    def __init__(self, atualizador, arquivos, analises, diretorio=DIRETORIO_DATASETS,
+                 orcamento=ORCAMENTO_BYTES, diretorio_spill=DIRETORIO_SPILL):
+        # arquivos: {papel: nome do CSV}; analises(ds) -> {análise: (arquivos, calcular)}
+        self.atualizador = atualizador
+        self.nomes_arquivos = dict(arquivos)
+        self._analises = analises
+        self.diretorio = diretorio
+        self.orcamento = orcamento
+        self.diretorio_spill = diretorio_spill
+        # Ordem de uso: o primeiro é o menos usado recentemente
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._lock_lru = threading.Lock()
+        self._acima_avisado = None
+        # Heap + mapeado de todos os residentes na última medição
+        self.total_bytes = 0
+
+        self.padrao = Dataset(DATASET_PADRAO, arquivos, padrao=True)
+        self._lru[self.padrao.id] = self.padrao
+        # O padrão é registrado já na importação, para o aquecimento do arranque
+        self._ativar(self.padrao)
+
+    # --- Descoberta ---
+    def _descobrir(self, id_dataset):
+        if id_dataset == DATASET_PADRAO or not _ID_VALIDO.match(id_dataset):
+            return None
+        pasta = os.path.join(self.diretorio, id_dataset)
+        arquivos = {papel: os.path.join(pasta, nome) for papel, nome in self.nomes_arquivos.items()}
+        if not any(os.path.exists(f) for f in arquivos.values()):
+            return None
+        return Dataset(id_dataset, arquivos)
+
+    def ids(self):
+        # Os já conhecidos + os diretórios que têm ao menos um dos CSVs
+        ids = list(self._lru)
+        if os.path.isdir(self.diretorio):
+            for nome in sorted(os.listdir(self.diretorio)):
+                if nome not in self._lru and self._descobrir(nome) is not None:
+                    ids.append(nome)
+        return ids
+
+    def conhecidos(self):
+        return list(self._lru.values())
+
+    def da_analise(self, nome):
+        # (dataset, análise) a partir do nome no AtualizadorBackground ('<id>:<análise>' ou só a análise)
+        id_dataset, separador, analise = nome.rpartition(':')
+        return (self._lru[id_dataset] if separador else self.padrao), analise
+
+    def obter(self, id_dataset=None):
+        # None = padrão; diretório criado depois da subida é encontrado na hora
+        if not id_dataset:
+            return self.padrao
+        ds = self._lru.get(id_dataset)
+        if ds is not None:
+            return ds
+        novo = self._descobrir(id_dataset)
+        if novo is None:
+            return None
+        with self._lock_lru:
+            return self._lru.setdefault(id_dataset, novo)
+
+    # --- Acesso ---
+    def _raizes(self, ds):
+        raizes = [self.atualizador.snapshot(ds.analise(a)) for a in ds.analises]
+        raizes += [valor for _, valor in ds.cache.entradas().values()]
+        raizes += list(ds.respostas.values()) + list(ds.objetos.values())
+        return raizes
+
+    def _marca(self, ds):
+        return tuple(id(r) for r in self._raizes(ds))
+
+    def tocar(self, ds):
+        # Caminho rápido das requisições: dataset em memória e nenhum tamanho a remedir.
+        # False = é preciso chamar acessar() (fora do event loop)
+        if ds.estado != 'residente':
+            return False
+        residentes = [outro for outro in list(self._lru.values()) if outro.estado == 'residente']
+        if any(self._marca(outro) != outro.marca_medida for outro in residentes):
+            return False
+        if self.orcamento and self.total_bytes > self.orcamento and len(residentes) > 1:
+            # Acima do orçamento (ex.: orçamento reduzido) com outro dataset para despejar
+            return False
+        with self._lock_lru:
+            ds.hits += 1
+            ds.ultimo_acesso = time.time()
+            self._lru.move_to_end(ds.id)
+        return True
+
+    def acessar(self, ds):
+        # Carrega (primeiro acesso) ou restaura do disco, marca o uso e aplica o orçamento
+        with self._lock:
+            if ds.estado == 'residente':
+                ds.hits += 1
+            else:
+                ds.misses += 1
+                if ds.estado == 'em_disco':
+                    self._restaurar(ds)
+                else:
+                    self._ativar(ds)
+                    print(f"[Datasets] '{ds.id}' ativado ({', '.join(ds.arquivos.values())}).")
+            with self._lock_lru:
+                ds.ultimo_acesso = time.time()
+                self._lru[ds.id] = ds
+                self._lru.move_to_end(ds.id)
+            self._aplicar_orcamento(ds)
+        return ds
+
+    def _ativar(self, ds):
+        analises = self._analises(ds)
+        for nome, (arquivos, calcular) in analises.items():
+            if not self.atualizador.registrada(ds.analise(nome)):
+                self.atualizador.registrar(ds.analise(nome), arquivos, calcular)
+        ds.analises = list(analises)
+        ds.estado = 'residente'
+
+    # --- Orçamento ---
+    def _medir(self, ds):
+        marca = self._marca(ds)
+        if marca != ds.marca_medida:
+            ds.bytes, ds.mapeado = medir_objetos(self._raizes(ds))
+            ds.marca_medida = marca
+        return ds.bytes + ds.mapeado
+
+    def _ocupado(self, ds):
+        return any(self.atualizador.ocupada(ds.analise(a)) for a in ds.analises)
+
+    def _aplicar_orcamento(self, atual):
+        residentes = [ds for ds in self._lru.values() if ds.estado == 'residente']
+        total = self.total_bytes = sum(self._medir(ds) for ds in residentes)
+        if not self.orcamento:
+            return
+        for ds in residentes:
+            if total <= self.orcamento:
+                break
+            if ds is atual or self._ocupado(ds):
+                continue
+            total -= ds.bytes + ds.mapeado
+            self._despejar(ds)
+        self.total_bytes = total
+        if total > self.orcamento and self._acima_avisado != total:
+            self._acima_avisado = total
+            print(f"[Datasets] AVISO: {total / 2 ** 20:.1f} MB em memória acima do orçamento de "
+                  f"{self.orcamento / 2 ** 20:.0f} MB (só restam o dataset em uso ou os em cálculo).")
+
+    # --- Disco ---
+    def _caminho_spill(self, ds):
+        # Um arquivo por processo: cada worker tem seu próprio registro
+        return os.path.join(self.diretorio_spill, f"{ds.id}-{os.getpid()}.pkl")
+
+    def _despejar(self, ds):
+        inicio = time.perf_counter()
+        snapshots = {a: self.atualizador.descartar(ds.analise(a)) for a in ds.analises}
+        estado = {
+            "snapshots": {a: s for a, s in snapshots.items() if s is not None},
+            "cache": ds.cache.entradas(),
+            "objetos": dict(ds.objetos),
+        }
+        destino = self._caminho_spill(ds)
+        try:
+            gravar_atomico(self.diretorio_spill, destino,
+                           lambda f: _Despejo(f, protocol=pickle.HIGHEST_PROTOCOL).dump(estado))
+            ds.spill_bytes = os.path.getsize(destino)
+        except (OSError, pickle.PicklingError, TypeError) as e:
+            # Sem como gravar: o dataset é descartado e recalculado (do armazém) no próximo acesso
+            print(f"[Datasets] Não foi possível gravar '{ds.id}' no disco, descartando: {e}")
+            ds.spill_bytes = 0
+        ds.cache.invalidar()
+        ds.respostas.clear()
+        ds.objetos.clear()
+        ds.estado = 'em_disco' if ds.spill_bytes else 'inativo'
+        ds.despejos += 1
+        print(f"[Datasets] '{ds.id}' despejado ({ds.bytes / 2 ** 20:.1f} MB no heap + "
+              f"{ds.mapeado / 2 ** 20:.1f} MB mapeados -> {ds.spill_bytes / 2 ** 20:.1f} MB no disco) "
+              f"em {time.perf_counter() - inicio:.2f}s.")
+        ds.bytes = ds.mapeado = 0
+        ds.marca_medida = None
+
+    def _restaurar(self, ds):
+        inicio = time.perf_counter()
+        origem = self._caminho_spill(ds)
+        try:
+            with open(origem, 'rb') as f:
+                estado = _Restauracao(f).load()
+        except Exception as e:
+            # Arquivo sumiu ou um memmap referenciado não existe mais: recalcula
+            print(f"[Datasets] Não foi possível restaurar '{ds.id}', recalculando: {e}")
+            estado = {"snapshots": {}, "cache": {}, "objetos": {}}
+        self._ativar(ds)
+        for analise, snapshot in estado["snapshots"].items():
+            self.atualizador.restaurar(ds.analise(analise), snapshot)
+        ds.cache.restaurar(estado["cache"])
+        for nome, objeto in estado["objetos"].items():
+            ds.objetos.setdefault(nome, objeto)
+        if os.path.exists(origem):
+            os.remove(origem)
+        ds.spill_bytes = 0
+        ds.restauracoes += 1
+        print(f"[Datasets] '{ds.id}' restaurado do disco em {time.perf_counter() - inicio:.2f}s.")
+
+    def encerrar(self):
+        # Os pickles deste processo não servem para nenhum outro
+        for ds in list(self._lru.values()):
+            caminho = self._caminho_spill(ds)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    # --- Relatório ---
+    def stats(self):
+        with self._lock:
+            datasets = {}
+            agora = time.time()
+            for id_dataset in self.ids():
+                ds = self._lru.get(id_dataset) or self._descobrir(id_dataset)
+                if ds.estado == 'residente':
+                    self._medir(ds)
+                acessos = ds.hits + ds.misses
+                cache = ds.cache.stats()
+                datasets[id_dataset] = {
+                    "estado": ds.estado,
+                    "arquivos": ds.arquivos,
+                    "bytes": ds.bytes,
+                    "mapeado_bytes": ds.mapeado,
+                    "spill_bytes": ds.spill_bytes,
+                    "acessos": acessos,
+                    "hits": ds.hits,
+                    "misses": ds.misses,
+                    "hit_ratio": round(ds.hits / acessos, 4) if acessos else 0.0,
+                    "ultimo_acesso": _iso(ds.ultimo_acesso),
+                    "segundos_desde_acesso": round(agora - ds.ultimo_acesso, 1) if ds.ultimo_acesso else None,
+                    "despejos": ds.despejos,
+                    "restauracoes": ds.restauracoes,
+                    "cache": {k: cache[k] for k in ("hits", "misses", "refits", "hit_ratio")},
+                }
+            return {
+                "padrao": self.padrao.id,
+                "orcamento_bytes": self.orcamento,
+                "bytes": sum(d["bytes"] for d in datasets.values()),
+                "mapeado_bytes": sum(d["mapeado_bytes"] for d in datasets.values()),
+                "datasets": datasets,
+            }
@@ -0,0 +1,238 @@
+# fluxo_linguistica.py (Palavras distintivas sobre um fluxo contínuo de frases)
+#
+# Em vez de um Counter exato por classe (que cresce sem limite com o corpus),
+# cada classe guarda dois resumos de tamanho fixo:
+#   - Count-Min (profundidade d x largura w contadores): estima a contagem de
+#     qualquer palavra. A estimativa nunca fica abaixo da real e, com
+#     probabilidade >= 1 - δ, passa dela no máximo ε·N (N = palavras da classe),
+#     com ε = e/w e δ = e^-d
+#   - Space-Saving (k palavras monitoradas): as mais frequentes da classe. Toda
+#     palavra com frequência > N/k está garantidamente no resumo, e a contagem
+#     de cada uma superestima a real em no máximo N/k
+# A consulta toma as palavras do Space-Saving da classe A como candidatas, estima
+# a contagem delas em A e em B pelo Count-Min (em A, o menor dos dois resumos) e
+# aplica o score original (freq_a - freq_b) * 1000. Erro de cada score: no máximo
+# 1000·ε para mais ou para menos, com probabilidade >= 1 - 2δ; palavras fora das
+# candidatas têm score real < 1000/k.
+# É o método 'frequencia' de linguistica.py, não o log-odds do índice exato: os
+# escores das duas rotas estão em escalas diferentes (METODO_FLUXO vai na resposta).
+#
+# A memória depende só de (d, w, k) e do número de classes (limitado), não de
+# quantas frases entraram. O estado vive no processo (cada worker do uvicorn tem
+# o seu fluxo).
+import hashlib
+import heapq
+import math
+import os
+import threading
+
+import numpy as np
+
+from linguistica import Tokenizador
+
+CMS_LARGURA = int(os.environ.get('FLUXO_CMS_LARGURA', 2 ** 16))
+CMS_PROFUNDIDADE = int(os.environ.get('FLUXO_CMS_PROFUNDIDADE', 5))
+TOPK_CAPACIDADE = int(os.environ.get('FLUXO_TOPK_CAPACIDADE', 2000))
+MAX_CLASSES = int(os.environ.get('FLUXO_MAX_CLASSES', 32))
+# Tokens crus distintos lembrados pelo tokenizador antes de esvaziar o cache de limpeza
+MAX_CACHE_TOKENS = int(os.environ.get('FLUXO_MAX_CACHE_TOKENS', 200_000))
+# Score das consultas (ver linguistica.METODOS_KEYNESS)
+METODO_FLUXO = 'frequencia'
+
+
+def potencia_de_2(largura):
+    return 2 ** max(1, math.ceil(math.log2(largura)))
+
+
+def hash_palavras(palavras):
+    # Hash estável de 64 bits (igual em todos os processos, ao contrário de hash())
+    return np.fromiter((int.from_bytes(hashlib.blake2b(p.encode('utf-8'), digest_size=8).digest(), 'little')
+                        for p in palavras), dtype=np.uint64, count=len(palavras))
+
+
+class CountMin:
+
+    def __init__(self, largura=CMS_LARGURA, profundidade=CMS_PROFUNDIDADE, seed=0):
+        # Largura arredondada para potência de 2: hash multiplicativo (a·h + b) >> (64 - bits)
+        self.largura = potencia_de_2(largura)
+        self.bits = self.largura.bit_length() - 1
+        self.profundidade = profundidade
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 63, profundidade, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, profundidade, dtype=np.uint64)
+        self.tabela = np.zeros((profundidade, self.largura), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self):
+        return math.e / self.largura
+
+    @property
+    def delta(self):
+        return math.exp(-self.profundidade)
+
+    def _posicoes(self, hashes):
+        # (profundidade x n); a multiplicação em uint64 dá a volta em 2^64 de propósito
+        with np.errstate(over='ignore'):
+            return (self._a[:, None] * hashes[None, :] + self._b[:, None]) >> np.uint64(64 - self.bits)
+
+    def adicionar(self, hashes, contagens):
+        contagens = np.asarray(contagens, dtype=np.int64)
+        # Todas as linhas de uma vez, pela tabela achatada
+        posicoes = self._posicoes(hashes).astype(np.intp) + (np.arange(self.profundidade) * self.largura)[:, None]
+        np.add.at(self.tabela.reshape(-1), posicoes.ravel(), np.tile(contagens, self.profundidade))
+        self.total += int(contagens.sum())
+
+    def estimar(self, hashes):
+        posicoes = self._posicoes(hashes).astype(np.intp)
+        return self.tabela[np.arange(self.profundidade)[:, None], posicoes].min(axis=0)
+
+
+class SpaceSaving:
+
+    def __init__(self, capacidade=TOPK_CAPACIDADE):
+        self.capacidade = capacidade
+        self.contagens = {}
+        self.erros = {}
+        self.total = 0
+
+    def adicionar(self, contador):
+        # contador: {palavra: ocorrências no lote} (Space-Saving ponderado). Dentro do
+        # lote as palavras já monitoradas vêm primeiro (as garantias valem em qualquer
+        # ordem), então o heap das substituições é montado uma vez por lote
+        contagens, erros = self.contagens, self.erros
+        novas = []
+        for palavra, n in contador.items():
+            if palavra in contagens:
+                contagens[palavra] += n
+            else:
+                novas.append((palavra, n))
+        self.total += sum(contador.values())
+
+        livres = self.capacidade - len(contagens)
+        for palavra, n in novas[:livres]:
+            contagens[palavra] = n
+            erros[palavra] = 0
+        novas = novas[max(livres, 0):]
+        if not novas:
+            return
+        heap = [(c, p) for p, c in contagens.items()]
+        heapq.heapify(heap)
+        for palavra, n in novas:
+            # Substitui a menos contada; a nova herda a contagem dela como erro máximo
+            minimo, removida = heap[0]
+            del contagens[removida], erros[removida]
+            contagens[palavra] = minimo + n
+            erros[palavra] = minimo
+            heapq.heapreplace(heap, (minimo + n, palavra))
+
+
+class EsbocoClasse:
+
+    def __init__(self, largura=CMS_LARGURA, profundidade=CMS_PROFUNDIDADE, capacidade=TOPK_CAPACIDADE):
+        # Mesmo seed em todas as classes: as tabelas são comparáveis (e somáveis)
+        self.count_min = CountMin(largura, profundidade)
+        self.frequentes = SpaceSaving(capacidade)
+        self.documentos = 0
+
+    def adicionar(self, contador, hashes, documentos):
+        if contador:
+            self.count_min.adicionar(hashes, list(contador.values()))
+            self.frequentes.adicionar(contador)
+        self.documentos += documentos
+
+
+class FluxoPalavras:
+
+    def __init__(self, final_stops, largura=CMS_LARGURA, profundidade=CMS_PROFUNDIDADE,
+                 capacidade=TOPK_CAPACIDADE, max_classes=MAX_CLASSES):
+        self.final_stops = final_stops
+        self.largura = potencia_de_2(largura)
+        self.profundidade = profundidade
+        self.capacidade = capacidade
+        self.max_classes = max_classes
+        self.tokenizador = Tokenizador(final_stops)
+        # palavra -> hash; esvaziado junto com o cache do tokenizador
+        self._hashes = {}
+        self.classes = {}
+        self._lock = threading.Lock()
+
+    def ingerir(self, status, textos):
+        # status/textos: sequências alinhadas (um rótulo por frase)
+        grupos = {}
+        for s, t in zip(status, textos):
+            grupos.setdefault(str(s), []).append(str(t))
+        with self._lock:
+            novas = [s for s in grupos if s not in self.classes]
+            if len(self.classes) + len(novas) > self.max_classes:
+                raise ValueError(f"Limite de {self.max_classes} classes no fluxo atingido.")
+            if len(self.tokenizador._limpos) > MAX_CACHE_TOKENS:
+                self.tokenizador = Tokenizador(self.final_stops)
+                self._hashes = {}
+            for classe, textos_classe in grupos.items():
+                esboco = self.classes.get(classe)
+                if esboco is None:
+                    esboco = self.classes[classe] = EsbocoClasse(self.largura, self.profundidade, self.capacidade)
+                contador = self.tokenizador.contar(textos_classe)
+                esboco.adicionar(contador, self._hash(contador), len(textos_classe))
+        return sum(len(t) for t in grupos.values())
+
+    def _hash(self, palavras):
+        hashes = self._hashes
+        faltando = [p for p in palavras if p not in hashes]
+        if faltando:
+            hashes.update(zip(faltando, hash_palavras(faltando).tolist()))
+        return np.fromiter((hashes[p] for p in palavras), dtype=np.uint64, count=len(palavras))
+
+    def resolver_classe(self, nome):
+        return next((c for c in self.classes if c.lower() == str(nome).lower()), None)
+
+    def limites(self):
+        epsilon, delta = math.e / self.largura, math.exp(-self.profundidade)
+        return {
+            "epsilon": epsilon,
+            "delta": delta,
+            "erro_maximo_score": round(1000 * epsilon, 4),
+            "confianca": round(1 - 2 * delta, 4),
+            "score_maximo_fora_do_topk": round(1000 / self.capacidade, 4),
+        }
+
+    def palavras_distintivas(self, classe_a, classe_b, top=15):
+        with self._lock:
+            a, b = self.classes.get(self.resolver_classe(classe_a)), self.classes.get(self.resolver_classe(classe_b))
+            if a is None or b is None or not a.count_min.total or not b.count_min.total:
+                return []
+            palavras = list(a.frequentes.contagens)
+            if not palavras:
+                return []
+            hashes = self._hash(palavras)
+            em_a = np.minimum(a.count_min.estimar(hashes),
+                              np.fromiter(a.frequentes.contagens.values(), dtype=np.int64, count=len(palavras)))
+            em_b = b.count_min.estimar(hashes)
+            escores = (em_a / a.count_min.total - em_b / b.count_min.total) * 1000
+
+        palavras = np.array(palavras)
+        positivos = np.flatnonzero(escores > 0)
+        ordem = positivos[np.lexsort((palavras[positivos], -escores[positivos]))][:top]
+        return [{"word": str(palavras[j]), "score": round(float(escores[j]), 1)} for j in ordem]
+
+    def palavras_chave(self, classes, referencia, top=15):
+        return {c: self.palavras_distintivas(c, referencia, top) for c in classes}
+
+    def stats(self):
+        with self._lock:
+            por_classe = {
+                c: {"documentos": e.documentos, "palavras": e.count_min.total,
+                    "monitoradas": len(e.frequentes.contagens)}
+                for c, e in self.classes.items()
+            }
+        bytes_cms = self.profundidade * self.largura * 8
+        return {
+            "classes": por_classe,
+            "documentos": sum(c["documentos"] for c in por_classe.values()),
+            "parametros": {"cms_largura": self.largura,
+                           "cms_profundidade": self.profundidade,
+                           "topk_capacidade": self.capacidade, "max_classes": self.max_classes},
+            "memoria_count_min_bytes": bytes_cms * len(por_classe),
+            "limites": self.limites(),
+        }
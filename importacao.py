@@ -0,0 +1,81 @@
+# importacao.py (Import tardio das bibliotecas pesadas e relatório de arranque)
+#
+# pandas, scipy e sklearn somam ~2,5s no import do api.py, e o caminho quente do
+# dashboard (snapshot em cache + artefato .npz) não usa nenhum deles. Os módulos
+# do projeto pegam pandas/scipy por modulo_tardio(): um objeto no lugar do
+# módulo que só faz o import de verdade no primeiro acesso a um atributo
+# (pd.DataFrame, sparse.csr_matrix...). O sklearn, que só aparece dentro dos
+# ajustes, é importado na própria função. IMPORTACAO_TARDIA=0 volta ao import
+# imediato (para comparar o arranque, ver benchmarks/bench_inicio.py).
+import importlib
+import os
+import sys
+import threading
+import time
+
+IMPORTACAO_TARDIA = os.environ.get('IMPORTACAO_TARDIA', '1') == '1'
+
+# Bibliotecas acompanhadas no relatório de arranque
+MODULOS_PESADOS = ('pandas', 'scipy', 'sklearn')
+
+# nome -> quando e em que thread o import tardio aconteceu
+_carregamentos = {}
+
+
+class ModuloTardio:
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def _carregar(self):
+        with self._lock:
+            if self._modulo is None:
+                novo = self._nome not in sys.modules
+                inicio = time.perf_counter()
+                modulo = importlib.import_module(self._nome)
+                if novo:
+                    _carregamentos[self._nome] = {
+                        "segundos": round(time.perf_counter() - inicio, 4),
+                        "em": time.time(),
+                        "thread": threading.current_thread().name,
+                    }
+                self._modulo = modulo
+        return self._modulo
+
+    def __getattr__(self, atributo):
+        # Só chega aqui o que não é atributo do próprio objeto: depois do primeiro
+        # acesso, custa uma chamada a mais por atributo
+        return getattr(self._modulo or self._carregar(), atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self._modulo is not None else "pendente"
+        return f"<módulo tardio '{self._nome}' ({estado})>"
+
+
+def modulo_tardio(nome):
+    if not IMPORTACAO_TARDIA:
+        return importlib.import_module(nome)
+    return ModuloTardio(nome)
+
+
+def inicio_processo():
+    # Hora (epoch) em que o processo começou, pela idade dele no /proc (resolução de
+    # um tick, ~10ms); None fora do Linux
+    try:
+        with open('/proc/self/stat') as f:
+            # O nome do executável vem entre parênteses e pode ter espaços
+            campos = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            ligado = float(f.read().split()[0])
+        return time.time() - (ligado - int(campos[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def modulos_carregados():
+    return {
+        nome: {"carregado": nome in sys.modules, **_carregamentos.get(nome, {})}
+        for nome in MODULOS_PESADOS
+    }
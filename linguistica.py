@@ -0,0 +1,399 @@
+# linguistica.py (Índice de frequência de termos por classe)
+#
+# O corpus é tokenizado uma única vez: cada classe vira uma linha esparsa de
+# contagens sobre um vocabulário comum. Comparar duas classes quaisquer passa a
+# ser uma subtração de vetores + seleção dos maiores, sem reler o CSV.
+#
+# Termos: unigramas e bigramas (bigramas formados depois de tirar stopwords e
+# tokens inválidos, como no CountVectorizer). Cada bloco de textos vira uma
+# matriz documento-termo esparsa, que dá a contagem por classe e a frequência
+# em documentos (para o min_df). O ranqueamento ("keyness") compara todas as
+# classes com a de referência numa única conta vetorizada:
+#   - log_odds:   log-odds com prior de Dirichlet informativo (Monroe et al.,
+#                 "Fightin' Words"), prior = frequências do corpus inteiro;
+#                 score = z-score, que derruba palavras raras de classes pequenas
+#   - chi2:       qui-quadrado 2x2 (classe vs referência), com sinal
+#   - frequencia: (freq_a - freq_b) * 1000, o cálculo original
+import os
+from collections import Counter
+from itertools import chain
+
+import numpy as np
+
+from importacao import modulo_tardio
+
+pd = modulo_tardio('pandas')
+sparse = modulo_tardio('scipy.sparse')
+
+
+# Linhas lidas por vez do CSV; limita o pico de memória da construção do índice
+TAMANHO_CHUNK = int(os.environ.get('LINGUISTICA_CHUNK_SIZE', 50_000))
+
+# Tamanhos de n-grama (1 e/ou 2) e frequência mínima em documentos (>= 1: contagem;
+# < 1: fração dos documentos). Entram na chave do índice persistido
+NGRAMAS = tuple(sorted(int(n) for n in os.environ.get('LINGUISTICA_NGRAMAS', '1,2').split(',')))
+MIN_DF = float(os.environ.get('LINGUISTICA_MIN_DF', 5))
+
+METODOS_KEYNESS = ('log_odds', 'chi2', 'frequencia')
+METODO_KEYNESS = os.environ.get('LINGUISTICA_METODO', 'log_odds')
+# Soma do prior de Dirichlet (0 = o tamanho do corpus, isto é, prior = contagens do corpus)
+ALFA0 = float(os.environ.get('LINGUISTICA_ALFA0', 0))
+
+# Marca o fim de cada documento no texto corrido (não é espaço, então split() o preserva)
+SEPARADOR = '\x00'
+
+
+PONTUACAO = ".,!?:;\"'()[]{}*-"
+
+
+class Tokenizador:
+    # Conta tokens crus com Counter (laço em C) e só depois limpa cada token
+    # *distinto* uma única vez. O resultado é idêntico ao da tokenização por ocorrência
+    # de antes (benchmarks/referencias.py), mas o
+    # strip/isalpha/stopwords roda por palavra do vocabulário, não por ocorrência.
+
+    def __init__(self, final_stops):
+        self.final_stops = final_stops
+        self._limpos = {}
+
+    def limpar(self, w):
+        clean_w = w.strip(PONTUACAO)
+        if len(clean_w) > 2 and clean_w not in self.final_stops and clean_w.isalpha():
+            return clean_w
+        return None
+
+    def contar(self, texts):
+        # ' '.join(...).split() e split() por frase produzem exatamente os mesmos tokens
+        brutos = Counter(chain.from_iterable(map(str.split, map(str.lower, texts))))
+        limpos = self._limpos
+        contagem = Counter()
+        for w, n in brutos.items():
+            if w in limpos:
+                clean_w = limpos[w]
+            else:
+                clean_w = limpos[w] = self.limpar(w)
+            if clean_w is not None:
+                contagem[clean_w] += n
+        return contagem
+
+
+def normalizar_colunas_corpus(df):
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+
+    if 'statement' in df.columns and 'clean_statement' not in df.columns:
+        df['clean_statement'] = df['statement']
+
+    if 'status' not in df.columns:
+        raise ValueError("Coluna 'status' não encontrada no CSV.")
+
+    df['clean_statement'] = df['clean_statement'].fillna('')
+    return df
+
+
+def ler_corpus_em_chunks(filename, chunk_size=None, shard=0, n_shards=1):
+    # Gera (status, textos) por classe dentro de cada bloco de linhas.
+    # Com n_shards > 1, só os blocos i com i % n_shards == shard são tokenizados
+    # (o parse do CSV é repetido em cada shard, mas é barato perto da tokenização)
+    chunk_size = chunk_size or TAMANHO_CHUNK
+    with pd.read_csv(filename, chunksize=chunk_size) as leitor:
+        for i, chunk in enumerate(leitor):
+            if i % n_shards != shard:
+                continue
+            chunk = normalizar_colunas_corpus(chunk)
+            for status, grupo in chunk.groupby('status', sort=False):
+                yield str(status), grupo['clean_statement'].astype(str)
+
+
+class IndicePalavras:
+
+    def __init__(self, classes, vocab, contagens):
+        self.classes = list(classes)
+        self.vocab = np.asarray(vocab)
+        # csr_matrix (n_classes x n_vocab) com as contagens absolutas
+        self.contagens = contagens.tocsr()
+        self.totais = np.asarray(self.contagens.sum(axis=1)).ravel()
+
+    # --- Serialização (formato do armazém de artefatos: só arrays numpy) ---
+    def para_arrays(self):
+        return {
+            "classes": np.array(self.classes, dtype=str),
+            "vocab": np.array(self.vocab, dtype=str),
+            "data": self.contagens.data,
+            "indices": self.contagens.indices,
+            "indptr": self.contagens.indptr,
+        }
+
+    @classmethod
+    def de_arrays(cls, arrays):
+        classes = [str(c) for c in arrays["classes"]]
+        vocab = arrays["vocab"]
+        matriz = sparse.csr_matrix(
+            (arrays["data"], arrays["indices"], arrays["indptr"]),
+            shape=(len(classes), len(vocab)),
+        )
+        return cls(classes, vocab, matriz)
+
+    # --- Uma linha por classe (partições independentes, ver versoes.py) ---
+    def linha(self, i):
+        # Termos presentes na classe i + contagens, em ordem de termo
+        linha = self.contagens[i]
+        ordem = np.argsort(self.vocab[linha.indices], kind='stable')
+        return {"termos": np.array(self.vocab[linha.indices][ordem], dtype=str),
+                "contagens": linha.data[ordem].astype(np.int64)}
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        # linhas: {classe: {"termos", "contagens"}}; vocabulário = união dos termos
+        classes = list(linhas)
+        if not classes:
+            return cls([], [], sparse.csr_matrix((0, 0), dtype=np.int64))
+        colunas, vocab = pd.factorize(np.concatenate([np.asarray(linhas[c]["termos"], dtype=object)
+                                                      for c in classes]))
+        indices = np.repeat(np.arange(len(classes)), [len(linhas[c]["termos"]) for c in classes])
+        matriz = sparse.csr_matrix(
+            (np.concatenate([linhas[c]["contagens"] for c in classes]).astype(np.int64), (indices, colunas)),
+            shape=(len(classes), len(vocab)),
+        )
+        return cls(classes, np.asarray(vocab, dtype=str), matriz)
+
+    # --- Consultas ---
+    def resolver_classe(self, nome):
+        # Mesmo critério do endpoint original: comparação sem diferenciar maiúsculas
+        return next((i for i, c in enumerate(self.classes) if c.lower() == str(nome).lower()), None)
+
+    def pontuar(self, linhas, referencia, metodo=None, alfa0=None):
+        # Escores (len(linhas) x termos) de cada classe das linhas contra a referência, numa conta só
+        metodo = metodo or METODO_KEYNESS
+        if metodo not in METODOS_KEYNESS:
+            raise ValueError(f"Método '{metodo}' desconhecido. Opções: {list(METODOS_KEYNESS)}")
+        y = self.contagens[linhas].toarray().astype(np.float64)
+        yj = self.contagens[referencia].toarray().ravel().astype(np.float64)
+        n = self.totais[linhas].astype(np.float64)[:, None]
+        nj = float(self.totais[referencia])
+
+        if metodo == 'frequencia':
+            return (y / n - yj / nj) * 1000
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metodo == 'log_odds':
+                fundo = np.asarray(self.contagens.sum(axis=0), dtype=np.float64).ravel()
+                alfa0 = alfa0 or ALFA0 or fundo.sum()
+                alfa = fundo * (alfa0 / fundo.sum())
+                delta = (np.log(y + alfa) - np.log(n + alfa0 - y - alfa)) \
+                    - (np.log(yj + alfa) - np.log(nj + alfa0 - yj - alfa))
+                escores = delta / np.sqrt(1 / (y + alfa) + 1 / (yj + alfa))
+            else:
+                c, d = n - y, nj - yj
+                num = (n + nj) * (y * d - yj * c) ** 2
+                den = (y + yj) * (c + d) * (y + c) * (yj + d)
+                escores = np.sign(y / n - yj / nj) * num / den
+        return np.nan_to_num(escores, nan=0.0, posinf=0.0, neginf=0.0)
+
+    def _top(self, idx, escores, top):
+        positivos = escores > 0
+        idx, escores = idx[positivos], escores[positivos]
+        if len(escores) > top:
+            corte = np.argpartition(-escores, top - 1)[:top]
+            # Mantém empates na fronteira do corte, para o desempate por palavra ser estável
+            limite = escores[corte].min()
+            corte = np.flatnonzero(escores >= limite)
+            idx, escores = idx[corte], escores[corte]
+
+        palavras = self.vocab[idx]
+        ordem = np.lexsort((palavras, -escores))[:top]
+        return [{"word": str(palavras[j]), "score": round(float(escores[j]), 1)} for j in ordem]
+
+    def palavras_chave(self, classes, referencia, top=15, metodo=None):
+        # {classe: top termos de cada classe contra a referência}; todas as classes na mesma passada
+        i_ref = self.resolver_classe(referencia)
+        linhas = {c: self.resolver_classe(c) for c in classes}
+        validas = [i for i in linhas.values() if i is not None and self.totais[i] > 0]
+        if i_ref is None or self.totais[i_ref] == 0 or not validas:
+            return {c: [] for c in classes}
+
+        escores = self.pontuar(validas, i_ref, metodo)
+        resultado = {}
+        for classe, i in linhas.items():
+            if i not in validas:
+                resultado[classe] = []
+                continue
+            # Só termos presentes na classe: as colunas não-nulas da linha
+            idx = self.contagens[i].indices
+            resultado[classe] = self._top(idx, escores[validas.index(i)][idx], top)
+        return resultado
+
+    def palavras_distintivas(self, classe_a, classe_b, top=15, metodo=None):
+        return self.palavras_chave([classe_a], classe_b, top, metodo)[classe_a]
+
+
+class ContadorTermos:
+    # Contagem e frequência em documentos de cada termo (unigrama/bigrama), por classe.
+    # Os termos são chaves int64: (id1 + 1) << 32 | (id2 + 1), com id2 = -1 no unigrama
+
+    def __init__(self, final_stops, ngramas=NGRAMAS):
+        self.tokenizador = Tokenizador(final_stops)
+        self.ngramas = tuple(ngramas)
+        self.vocab = []
+        self._posicao = {}
+        # token cru -> id da palavra limpa (-1 = descartado, -2 = separador de documentos)
+        self._ids = {SEPARADOR: -2}
+        # classe -> [(chaves, contagens, frequência em documentos)] ainda não consolidados
+        self.blocos = {}
+        self.documentos = Counter()
+
+    def _id_palavra(self, palavra):
+        i = self._posicao.get(palavra)
+        if i is None:
+            i = self._posicao[palavra] = len(self.vocab)
+            self.vocab.append(palavra)
+        return i
+
+    def _id_token(self, token):
+        limpo = self.tokenizador.limpar(token)
+        i = -1 if limpo is None else self._id_palavra(limpo)
+        self._ids[token] = i
+        return i
+
+    def adicionar(self, classe, textos):
+        textos = list(textos)
+        if not textos:
+            return
+        # Texto corrido com um separador entre documentos: lower/split/factorize rodam em C
+        codigos, unicos = pd.factorize(np.array(f" {SEPARADOR} ".join(textos).lower().split(), dtype=object))
+        ids = self._ids
+        tabela = np.fromiter((ids[u] if u in ids else self._id_token(u) for u in unicos),
+                             dtype=np.int64, count=len(unicos))
+        ids = tabela[codigos]
+        docs = np.cumsum(ids == -2)
+        validos = ids >= 0
+        ids, docs = ids[validos], docs[validos]
+
+        chaves, linhas = [], []
+        if 1 in self.ngramas:
+            chaves.append((ids + 1) << 32)
+            linhas.append(docs)
+        if 2 in self.ngramas and len(ids) > 1:
+            mesmo_doc = docs[1:] == docs[:-1]
+            chaves.append(((ids[:-1][mesmo_doc] + 1) << 32) | (ids[1:][mesmo_doc] + 1))
+            linhas.append(docs[:-1][mesmo_doc])
+        chaves = np.concatenate(chaves) if chaves else np.empty(0, dtype=np.int64)
+        linhas = np.concatenate(linhas) if linhas else np.empty(0, dtype=np.int64)
+
+        # Matriz documento-termo do bloco (duplicatas somadas)
+        colunas, unicas = pd.factorize(chaves)
+        dtm = sparse.csr_matrix((np.ones(len(colunas), dtype=np.int32), (linhas, colunas)),
+                                shape=(len(textos), len(unicas)))
+        dtm.sum_duplicates()
+        contagens = np.asarray(dtm.sum(axis=0), dtype=np.int64).ravel()
+        frequencia_docs = dtm.getnnz(axis=0).astype(np.int64)
+
+        blocos = self.blocos.setdefault(classe, [])
+        blocos.append((np.asarray(unicas, dtype=np.int64), contagens, frequencia_docs))
+        self.documentos[classe] += len(textos)
+        if len(blocos) >= 16:
+            self._consolidar(classe)
+
+    def _consolidar(self, classe):
+        blocos = self.blocos[classe]
+        if len(blocos) > 1:
+            colunas, unicas = pd.factorize(np.concatenate([b[0] for b in blocos]))
+
+            def somar(k):
+                return np.bincount(colunas, weights=np.concatenate([b[k] for b in blocos]),
+                                   minlength=len(unicas)).astype(np.int64)
+            self.blocos[classe] = [(np.asarray(unicas, dtype=np.int64), somar(1), somar(2))]
+        return self.blocos[classe][0]
+
+    def mesclar(self, outro):
+        # Junta a contagem de outro processo (shard): ids de palavra são remapeados para os deste
+        mapa = np.array([self._id_palavra(w) for w in outro.vocab] + [-1], dtype=np.int64)
+        for classe, blocos in outro.blocos.items():
+            for chaves, contagens, frequencia_docs in blocos:
+                a, b = (chaves >> 32) - 1, (chaves & 0xFFFFFFFF) - 1
+                chaves = ((mapa[a] + 1) << 32) | (mapa[b] + 1)
+                self.blocos.setdefault(classe, []).append((chaves, contagens, frequencia_docs))
+            self.documentos[classe] += outro.documentos[classe]
+            self._consolidar(classe)
+        return self
+
+    def indice(self, min_df=MIN_DF):
+        classes = list(self.blocos)
+        blocos = [self._consolidar(c) for c in classes]
+        if not blocos:
+            return IndicePalavras([], [], sparse.csr_matrix((0, 0), dtype=np.int64))
+        colunas, unicas = pd.factorize(np.concatenate([b[0] for b in blocos]))
+        linhas = np.repeat(np.arange(len(classes)), [len(b[0]) for b in blocos])
+        contagens = sparse.csr_matrix((np.concatenate([b[1] for b in blocos]), (linhas, colunas)),
+                                      shape=(len(classes), len(unicas)))
+        frequencia_docs = np.bincount(colunas, weights=np.concatenate([b[2] for b in blocos]),
+                                      minlength=len(unicas))
+
+        corte = min_df if min_df >= 1 else np.ceil(min_df * sum(self.documentos.values()))
+        manter = np.flatnonzero(frequencia_docs >= corte)
+        termos = self._termos(np.asarray(unicas, dtype=np.int64)[manter])
+        return IndicePalavras(classes, termos, contagens[:, manter])
+
+    def _termos(self, chaves):
+        vocab = np.array(self.vocab + [''], dtype=object)
+        a, b = (chaves >> 32) - 1, (chaves & 0xFFFFFFFF) - 1
+        termos = vocab[a]
+        bigrama = b >= 0
+        termos[bigrama] = termos[bigrama] + ' ' + vocab[b[bigrama]]
+        return termos.astype(str)
+
+    def para_arrays(self):
+        # Contagens ainda sem o corte de min_df, com os termos em texto (independem dos ids
+        # deste contador); parciais assim são somados por indice_de_parciais
+        classes = list(self.blocos)
+        blocos = [self._consolidar(c) for c in classes]
+        chaves = np.concatenate([b[0] for b in blocos]) if blocos else np.empty(0, dtype=np.int64)
+        colunas, unicas = pd.factorize(chaves)
+        return {
+            "classes": np.array(classes, dtype=str),
+            "documentos": np.array([self.documentos[c] for c in classes], dtype=np.int64),
+            "termos": self._termos(np.asarray(unicas, dtype=np.int64)),
+            "linhas": np.repeat(np.arange(len(classes)), [len(b[0]) for b in blocos]).astype(np.int32),
+            "colunas": colunas.astype(np.int32),
+            "contagens": np.concatenate([b[1] for b in blocos]) if blocos else np.empty(0, dtype=np.int64),
+            "frequencia_docs": np.concatenate([b[2] for b in blocos]) if blocos else np.empty(0, dtype=np.int64),
+        }
+
+
+def indice_de_parciais(parciais, min_df=MIN_DF):
+    # Soma contagens exportadas por ContadorTermos.para_arrays (ex.: blocos de linhas de um
+    # CSV) e só então aplica o min_df: o resultado é o mesmo de contar tudo de uma vez
+    parciais = list(parciais)
+    classes = list(dict.fromkeys(str(c) for p in parciais for c in p["classes"]))
+    if not parciais or not classes:
+        return IndicePalavras([], [], sparse.csr_matrix((0, 0), dtype=np.int64))
+    posicao = {c: i for i, c in enumerate(classes)}
+    colunas_termos, termos = pd.factorize(np.concatenate([np.asarray(p["termos"], dtype=object) for p in parciais]))
+    linhas, colunas, inicio = [], [], 0
+    for p in parciais:
+        mapa_classes = np.array([posicao[str(c)] for c in p["classes"]], dtype=np.int64)
+        linhas.append(mapa_classes[p["linhas"]])
+        colunas.append(colunas_termos[inicio:inicio + len(p["termos"])][p["colunas"]])
+        inicio += len(p["termos"])
+    linhas, colunas = np.concatenate(linhas), np.concatenate(colunas)
+    contagens = sparse.csr_matrix((np.concatenate([p["contagens"] for p in parciais]), (linhas, colunas)),
+                                  shape=(len(classes), len(termos)))
+    frequencia_docs = np.bincount(colunas, weights=np.concatenate([p["frequencia_docs"] for p in parciais]),
+                                  minlength=len(termos))
+
+    documentos = sum(int(p["documentos"].sum()) for p in parciais)
+    corte = min_df if min_df >= 1 else np.ceil(min_df * documentos)
+    manter = np.flatnonzero(frequencia_docs >= corte)
+    return IndicePalavras(classes, np.asarray(termos, dtype=str)[manter], contagens[:, manter])
+
+
+def contar_termos_por_classe(filename, final_stops, chunk_size=None, shard=0, n_shards=1, ngramas=NGRAMAS):
+    contador = ContadorTermos(final_stops, ngramas)
+    for status, textos in ler_corpus_em_chunks(filename, chunk_size, shard, n_shards):
+        contador.adicionar(status, textos)
+    return contador
+
+
+def construir_indice(filename, final_stops, chunk_size=None, ngramas=NGRAMAS, min_df=MIN_DF):
+    # Uma passada de tokenização por classe (antes: a classe Normal era
+    # tokenizada uma vez para cada diagnóstico comparado)
+    return contar_termos_por_classe(filename, final_stops, chunk_size, ngramas=ngramas).indice(min_df)
@@ -0,0 +1,213 @@
+# metricas.py (Etapas cronometradas e métricas no formato do Prometheus)
+#
+# MetricasEtapas marca as etapas de um pipeline (leitura, codificação, K-Means,
+# agregação, serialização...). Cada etapa concluída vai para um histograma
+# por (pipeline, etapa); a última execução de cada pipeline fica também em
+# ULTIMAS_METRICAS (detalhe legível, com pico de memória opcional).
+#
+# O registro global guarda histogramas (etapas e requisições HTTP, estas vindas
+# do MiddlewareMetricas) e gauges (linhas por dataset) e exporta tudo em texto
+# do Prometheus (/metrics).
+import asyncio
+import bisect
+import hmac
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from perfil import AmostradorPilhas
+
+# Limites (segundos) dos baldes dos histogramas; o último é +Inf implícito
+BALDES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+MEDIR_MEMORIA = os.environ.get('PREPROCESSAMENTO_MEMORIA', '0') == '1'
+
+# nome do pipeline -> métricas da última execução
+ULTIMAS_METRICAS = {}
+
+
+class Histograma:
+
+    def __init__(self, baldes=BALDES_SEGUNDOS):
+        self.baldes = tuple(baldes)
+        self.contagens = [0] * (len(self.baldes) + 1)
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect.bisect_left(self.baldes, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+def _limites(baldes):
+    return [repr(float(b)) for b in baldes] + ['+Inf']
+
+
+def _rotulos(nomes, valores):
+    def escapar(v):
+        return str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{n}="{escapar(v)}"' for n, v in zip(nomes, valores))
+
+
+class RegistroMetricas:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # nome -> (ajuda, nomes dos rótulos, {valores dos rótulos: Histograma})
+        self._histogramas = {}
+        # nome -> (ajuda, nomes dos rótulos, {valores dos rótulos: valor})
+        self._gauges = {}
+
+    def observar(self, nome, ajuda, rotulos, valores, segundos):
+        with self._lock:
+            serie = self._histogramas.setdefault(nome, (ajuda, tuple(rotulos), {}))[2]
+            hist = serie.get(valores)
+            if hist is None:
+                hist = serie[valores] = Histograma()
+            hist.observar(segundos)
+
+    def definir(self, nome, ajuda, rotulos, valores, valor):
+        with self._lock:
+            self._gauges.setdefault(nome, (ajuda, tuple(rotulos), {}))[2][valores] = valor
+
+    def observar_etapa(self, pipeline, etapa, segundos):
+        self.observar("mindscape_etapa_segundos", "Duração de cada etapa dos pipelines de análise.",
+                      ("pipeline", "etapa"), (pipeline, etapa), segundos)
+
+    def observar_requisicao(self, rota, metodo, status, segundos):
+        self.observar("mindscape_http_requisicao_segundos", "Duração das requisições HTTP.",
+                      ("rota", "metodo", "status"), (rota, metodo, str(status)), segundos)
+
+    def definir_linhas(self, dataset, fase, linhas):
+        self.definir("mindscape_dataset_linhas", "Linhas do dataset na última execução do pipeline.",
+                     ("dataset", "fase"), (dataset, fase), linhas)
+
+    def exportar(self, extras=()):
+        # extras: [(nome, tipo, ajuda, [(dict de rótulos, valor)])] calculados na hora (ex.: caches)
+        linhas = []
+        with self._lock:
+            for nome, (ajuda, rotulos, serie) in sorted(self._histogramas.items()):
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} histogram"]
+                for valores, hist in sorted(serie.items()):
+                    base = _rotulos(rotulos, valores)
+                    acumulado = 0
+                    for limite, n in zip(_limites(hist.baldes), hist.contagens):
+                        acumulado += n
+                        linhas.append(f'{nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+                    linhas.append(f"{nome}_sum{{{base}}} {hist.soma:.6f}")
+                    linhas.append(f"{nome}_count{{{base}}} {hist.total}")
+            for nome, (ajuda, rotulos, serie) in sorted(self._gauges.items()):
+                linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} gauge"]
+                linhas += [f"{nome}{{{_rotulos(rotulos, valores)}}} {valor}"
+                           for valores, valor in sorted(serie.items())]
+        for nome, tipo, ajuda, amostras in extras:
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+            for rotulos, valor in amostras:
+                base = _rotulos(rotulos.keys(), rotulos.values())
+                linhas.append(f"{nome}{{{base}}} {valor}" if base else f"{nome} {valor}")
+        return '\n'.join(linhas) + '\n'
+
+
+registro = RegistroMetricas()
+
+
+class MetricasEtapas:
+
+    def __init__(self, nome, medir_memoria=None):
+        self.nome = nome
+        self.medir_memoria = MEDIR_MEMORIA if medir_memoria is None else medir_memoria
+        self.etapas = []
+
+    @contextmanager
+    def etapa(self, nome):
+        iniciou_trace = False
+        if self.medir_memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                iniciou_trace = True
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            registro.observar_etapa(self.nome, nome, segundos)
+            entrada = {"etapa": nome, "segundos": round(segundos, 4)}
+            if self.medir_memoria:
+                entrada["pico_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 2)
+                if iniciou_trace:
+                    tracemalloc.stop()
+            self.etapas.append(entrada)
+
+    def publicar(self):
+        ULTIMAS_METRICAS[self.nome] = {"etapas": list(self.etapas),
+                                       "total_segundos": round(sum(e["segundos"] for e in self.etapas), 4)}
+        partes = ", ".join(f"{e['etapa']} {e['segundos'] * 1000:.1f}ms"
+                           + (f"/{e['pico_mb']}MB" if "pico_mb" in e else "") for e in self.etapas)
+        print(f"[Métricas] {self.nome}: {partes}")
+
+
+class MiddlewareMetricas:
+    # Middleware ASGI puro (sem o custo do BaseHTTPMiddleware): duração de cada
+    # requisição por molde de rota e, com o cabeçalho X-Profile, troca a resposta
+    # pela pilha colapsada da requisição (ver perfil.py). Com perfil_token, só vale
+    # X-Profile: <token> (a pilha inclui as requisições dos outros clientes)
+
+    def __init__(self, app, perfil_habilitado=False, perfil_token=None):
+        self.app = app
+        self.perfil_habilitado = perfil_habilitado
+        self.perfil_token = perfil_token.encode() if perfil_token else None
+
+    def _perfilar(self, cabecalhos):
+        if not self.perfil_habilitado or b"x-profile" not in cabecalhos:
+            return False
+        return self.perfil_token is None or hmac.compare_digest(cabecalhos[b"x-profile"], self.perfil_token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        cabecalhos = dict(scope.get("headers") or ())
+        perfilar = self._perfilar(cabecalhos)
+        status = [500]
+        amostrador = None
+        if perfilar:
+            try:
+                intervalo = float(cabecalhos.get(b"x-profile-interval-ms", b"")) / 1000
+            except ValueError:
+                intervalo = None
+            amostrador = AmostradorPilhas(intervalo).iniciar()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            # Com o perfil ligado a resposta original é descartada
+            if not perfilar:
+                await send(mensagem)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # Rótulo pelo molde da rota (não pela URL), para não multiplicar séries
+            rota = getattr(scope.get("route"), "path", "<sem rota>")
+            registro.observar_requisicao(rota, scope["method"], status[0], time.perf_counter() - inicio)
+            if amostrador is not None:
+                # parar() espera a thread do amostrador: fora do loop
+                await asyncio.get_running_loop().run_in_executor(None, amostrador.parar)
+
+        if perfilar:
+            corpo = amostrador.colapsado().encode("utf-8")
+            await send({"type": "http.response.start", "status": 200, "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(corpo)).encode()),
+                (b"x-profile-samples", str(amostrador.amostras).encode()),
+                (b"x-profile-seconds", f"{amostrador.segundos:.4f}".encode()),
+                (b"x-profile-status", str(status[0]).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": corpo})
@@ -0,0 +1,92 @@
+# perfil.py (Profiler por amostragem para uma requisição)
+#
+# Uma thread lê sys._current_frames() a cada intervalo e conta as pilhas de
+# todas as outras threads. Threads paradas (esperando numa fila, lock ou
+# select) são descartadas, então sobra só quem está trabalhando: o handler da
+# requisição, o threadpool que roda os endpoints síncronos e os recálculos em
+# segundo plano. O resultado sai no formato "colapsado" (uma pilha por linha,
+# quadros separados por ';' + contagem), aceito por flamegraph.pl, speedscope
+# e inferno. Na API é opt-in (PERFIL_HABILITADO=1, de preferência com
+# PERFIL_TOKEN), já que a pilha inclui as requisições dos outros clientes.
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+INTERVALO_PADRAO = float(os.environ.get('PERFIL_INTERVALO_MS', 2)) / 1000
+# Uma requisição perfilada nunca amostra por mais que isso
+DURACAO_MAXIMA = float(os.environ.get('PERFIL_DURACAO_MAXIMA', 60))
+
+# (arquivo, função) do quadro do topo de uma thread ociosa
+_OCIOSAS = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'), ('queue.py', 'get'),
+    ('thread.py', '_worker'), ('base_events.py', '_run_once'),
+}
+
+
+def _quadro(frame):
+    codigo = frame.f_code
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class AmostradorPilhas:
+
+    def __init__(self, intervalo=None):
+        self.intervalo = max(0.0005, intervalo or INTERVALO_PADRAO)
+        self.pilhas = Counter()
+        self.amostras = 0
+        self.segundos = 0.0
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._thread = threading.Thread(target=self._amostrar, name='perfil-amostrador', daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.segundos = time.perf_counter() - self._inicio
+        return self
+
+    def _amostrar(self):
+        proprio = threading.get_ident()
+        limite = time.perf_counter() + DURACAO_MAXIMA
+        # Uma amostra logo no início e outra ao parar: requisições mais curtas que o
+        # intervalo também aparecem. O sleep(0) devolve o GIL a quem iniciou o
+        # amostrador, para a primeira amostra já pegá-lo trabalhando
+        time.sleep(0)
+        self._coletar(proprio)
+        while not self._parar.wait(self.intervalo) and time.perf_counter() < limite:
+            self._coletar(proprio)
+        if self._parar.is_set():
+            self._coletar(proprio)
+
+    def _coletar(self, proprio):
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio:
+                continue
+            codigo = frame.f_code
+            if (os.path.basename(codigo.co_filename), codigo.co_name) in _OCIOSAS:
+                continue
+            quadros = []
+            while frame is not None:
+                quadros.append(_quadro(frame))
+                frame = frame.f_back
+            quadros.append(nomes.get(ident, f"thread-{ident}"))
+            self.pilhas[';'.join(reversed(quadros))] += 1
+        self.amostras += 1
+
+    def colapsado(self):
+        if not self.pilhas:
+            # Nenhuma thread trabalhando em nenhuma amostra: um aviso em vez de um corpo vazio
+            return (f"# nenhuma pilha ativa em {self.amostras} amostra(s) ({self.segundos * 1000:.1f} ms); "
+                    f"a requisição terminou entre as amostras\n")
+        return ''.join(f"{pilha} {n}\n" for pilha, n in self.pilhas.most_common())
@@ -0,0 +1,224 @@
+# preprocessamento.py (Limpeza e codificação compartilhadas pelos dois datasets)
+#
+# Antes cada script (api.py, arquetipos.py, sintomas.py, sintomas_api.py)
+# repetia o mesmo laço: olhar df[col].iloc[0], escolher um mapa ou um
+# LabelEncoder novo, depois dropna()/fillna(0) gerando cópias do DataFrame.
+# Aqui o esquema é inferido uma vez (pelos valores distintos de cada coluna) e
+# cada coluna é convertida com uma tabela por valor distinto indexada pelos
+# códigos, substituindo a coluna no próprio DataFrame.
+#
+# Tipos de coluna:
+#   - numerica   -> como está
+#   - frequencia -> Seldom..Most-Often = 1..4
+#   - sim_nao    -> YES/NO = 1/0
+#   - escala     -> "3 From 10" = 3
+#   - categorica -> códigos em ordem alfabética (os mesmos do LabelEncoder)
+#
+# Cada etapa é cronometrada (ver metricas.py; com PREPROCESSAMENTO_MEMORIA=1
+# também tem o pico de memória medido com tracemalloc).
+import re
+
+import numpy as np
+
+from importacao import modulo_tardio
+from metricas import MetricasEtapas
+
+pd = modulo_tardio('pandas')
+
+FEATURES_ARQUETIPOS = ['sleep_hours', 'productivity_score', 'social_support',
+                       'physical_activity_hours', 'stress_level']
+CATEGORICAS_LIFESTYLE = ['gender', 'employment_status', 'work_environment',
+                         'mental_health_history', 'seeks_treatment', 'mental_health_risk']
+
+MAPA_FREQUENCIA = {'Seldom': 1, 'Sometimes': 2, 'Usually': 3, 'Most-Often': 4}
+MAPA_SIM_NAO = {'YES': 1, 'NO': 0}  # comparado sem espaços ('YES ' aparece no CSV)
+
+# Mesmos nomes do heatmap original (Colab)
+RENOMEAR_SINTOMAS = {
+    'Euphoric': 'Euphoria',
+    'Sleep dissorder': 'Sleep_dissorder',
+    'Mood Swing': 'Mood_Swing',
+    'Suicidal thoughts': 'Suicidal_thoughts',
+    'Anorxia': 'Anorexia',
+    'Sexual Activity': 'Sexual_Activity',
+}
+COLUNAS_ID = {'Patient Number'}
+ALVO_SINTOMAS = 'Expert Diagnose'
+
+_ESCALA = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*from\s*(\d+(?:\.\d+)?)\s*$', re.IGNORECASE)
+
+# Muda quando a codificação muda (entra na chave dos artefatos que dependem dela)
+VERSAO_PREPROCESSAMENTO = 2
+
+# --- Esquema ---
+def fatorar(serie):
+    # (códigos, valores distintos); -1 = ausente. Categóricas já vêm fatoradas
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    return pd.factorize(serie)
+
+
+def detectar_tipo(serie, distintos=None):
+    # -> (tipo, máximo da escala); colunas de texto que não são sintoma ficam 'categorica'
+    if pd.api.types.is_numeric_dtype(serie.dtype) and not pd.api.types.is_bool_dtype(serie.dtype):
+        return 'numerica', None
+    if distintos is None:
+        distintos = fatorar(serie)[1]
+    valores = [str(v) for v in distintos]
+    if not valores:
+        return 'categorica', None
+    if all(v.strip() in MAPA_FREQUENCIA for v in valores):
+        return 'frequencia', None
+    if all(v.strip().upper() in MAPA_SIM_NAO for v in valores):
+        return 'sim_nao', None
+    escalas = [_ESCALA.match(v) for v in valores]
+    if all(escalas):
+        return 'escala', max(float(m.group(2)) for m in escalas)
+    return 'categorica', None
+
+
+def inferir_esquema(df, ignorar=()):
+    # {coluna: (tipo, máximo da escala)}, olhando só os valores distintos de cada coluna
+    return {col: detectar_tipo(df[col]) for col in df.columns if col not in ignorar}
+
+
+# --- Conversão ---
+def _converter(valor, tipo):
+    valor = str(valor).strip()
+    if tipo == 'frequencia':
+        return MAPA_FREQUENCIA.get(valor, np.nan)
+    if tipo == 'sim_nao':
+        return MAPA_SIM_NAO.get(valor.upper(), np.nan)
+    m = _ESCALA.match(valor)
+    return float(m.group(1)) if m else np.nan
+
+
+def interpretar_valor(valor, tipo):
+    # Um valor avulso (ex.: perfil enviado à API); números já codificados passam direto
+    if valor is None or isinstance(valor, bool):
+        return np.nan
+    if isinstance(valor, (int, float, np.number)):
+        return float(valor)
+    convertido = np.nan if tipo == 'numerica' else _converter(valor, tipo)
+    if np.isnan(convertido):
+        try:
+            return float(str(valor).strip())
+        except ValueError:
+            return np.nan
+    return convertido
+
+
+def interpretar(serie, tipo, fatorada=None):
+    # Valores numéricos (float64, NaN = ausente/inválido); conversão uma vez por valor distinto
+    if tipo == 'numerica':
+        return pd.to_numeric(serie, errors='coerce').to_numpy(dtype=np.float64)
+    codigos, distintos = fatorada if fatorada is not None else fatorar(serie)
+    # O NaN extra no fim atende o código -1 (valor ausente)
+    tabela = np.array([_converter(v, tipo) for v in distintos] + [np.nan], dtype=np.float64)
+    return tabela[codigos]
+
+
+def codigos_categoria(serie, fatorada=None):
+    # Códigos em ordem alfabética dos valores presentes (= LabelEncoder().fit_transform(serie.astype(str)))
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.remove_unused_categories().cat.codes.to_numpy()
+    codigos, distintos = fatorada if fatorada is not None else fatorar(serie)
+    ordem = np.argsort(np.array([str(v) for v in distintos], dtype=object), kind='stable')
+    posto = np.empty(len(ordem) + 1, dtype=np.int64)
+    posto[ordem] = np.arange(len(ordem))
+    posto[-1] = -1
+    return posto[codigos]
+
+
+def linhas_completas(df):
+    # Máscara do dropna() sem montar o DataFrame booleano inteiro
+    mascara = np.ones(len(df), dtype=bool)
+    for col in df.columns:
+        mascara &= df[col].notna().to_numpy()
+    return mascara
+
+
+# --- Dataset 1: mental_health_dataset.csv ---
+def normalizar_colunas_lifestyle(df):
+    df.columns = [c.strip().lower().replace(' ', '_').replace('-', '_') for c in df.columns]
+
+    rename_map = {
+        'social_support_score': 'social_support',
+        'physical_activity_days': 'physical_activity_hours',
+    }
+    return df.rename(columns=rename_map, copy=False)
+
+
+def preparar_lifestyle(df, codificar=True, metricas=None):
+    # Colunas normalizadas, linhas com ausentes removidas, categóricas -> códigos e
+    # features em float64. Cada coluna é copiada no máximo uma vez (nenhuma, se não
+    # houver ausentes nem conversão) e o DataFrame é montado uma única vez no fim
+    metricas = metricas or MetricasEtapas("lifestyle", medir_memoria=False)
+    with metricas.etapa("colunas"):
+        df = normalizar_colunas_lifestyle(df)
+
+    with metricas.etapa("ausentes"):
+        mascara = linhas_completas(df)
+        manter = None if mascara.all() else np.flatnonzero(mascara)
+
+    with metricas.etapa("codificacao"):
+        saida = {}
+        for col in df.columns:
+            valores = df[col].array if manter is None else df[col].array.take(manter)
+            if codificar and col in CATEGORICAS_LIFESTYLE:
+                valores = codigos_categoria(pd.Series(valores, copy=False))
+            elif col in FEATURES_ARQUETIPOS:
+                # O cache colunar guarda float32; as contas continuam em float64
+                valores = np.asarray(valores, dtype=np.float64)
+            saida[col] = valores
+        indice = df.index if manter is None else df.index[manter]
+        df = pd.DataFrame(saida, index=indice, copy=False)
+    return df
+
+
+# --- Dataset 2: Dataset-Mental-Disorders.csv ---
+def normalizar_colunas_sintomas(df):
+    df.columns = [str(c).lstrip('\ufeff').strip() for c in df.columns]
+    return df.rename(columns=RENOMEAR_SINTOMAS, copy=False)
+
+
+def preparar_sintomas(df, alvo=ALVO_SINTOMAS, codificar_alvo=False, preencher=0, esquema=None, metricas=None):
+    # Todas as colunas numéricas; o alvo fica com os rótulos (ou códigos, se codificar_alvo).
+    # Cada coluna de texto é fatorada uma vez: os valores distintos decidem o tipo e
+    # viram a tabela de conversão, indexada pelos códigos
+    metricas = metricas or MetricasEtapas("sintomas", medir_memoria=False)
+    with metricas.etapa("colunas"):
+        df = normalizar_colunas_sintomas(df)
+    esquema = dict(esquema or {})
+
+    with metricas.etapa("codificacao"):
+        saida = {}
+        for col in df.columns:
+            if col in COLUNAS_ID:
+                continue
+            serie = df[col]
+            if col == alvo:
+                saida[col] = codigos_categoria(serie) if codificar_alvo else serie.astype(object).to_numpy()
+                continue
+            fatorada = None
+            if col not in esquema:
+                if not pd.api.types.is_numeric_dtype(serie.dtype):
+                    fatorada = fatorar(serie)
+                esquema[col] = detectar_tipo(serie, fatorada[1] if fatorada else None)
+            tipo = esquema[col][0]
+
+            if tipo == 'numerica':
+                valores = serie.to_numpy()
+                if preencher is not None and serie.isna().any():
+                    valores = serie.fillna(preencher).to_numpy()
+            else:
+                if tipo == 'categorica':
+                    valores = codigos_categoria(serie, fatorada).astype(np.float64)
+                    valores[valores < 0] = np.nan
+                else:
+                    valores = interpretar(serie, tipo, fatorada)
+                if preencher is not None:
+                    valores[np.isnan(valores)] = preencher
+            saida[col] = valores
+        df = pd.DataFrame(saida, index=df.index, copy=False)
+    return df
@@ -0,0 +1,100 @@
+# respostas.py (Respostas JSON pré-serializadas com ETag / 304)
+#
+# O payload de cada snapshot é serializado uma única vez; as versões gzip/brotli
+# são geradas na primeira requisição que as aceita. O ETag é o hash do corpo,
+# então é o mesmo em todos os workers e entre reinícios enquanto os dados não mudam;
+# cada codificação tem o seu (sufixo -gz/-br), já que os bytes enviados são outros.
+import gzip
+import hashlib
+import json
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+
+# Sufixo do ETag de cada codificação (ETag forte muda quando os bytes mudam)
+SUFIXO_ETAG = {'gzip': '-gz', 'br': '-br'}
+
+
+class RespostaPronta:
+
+    def __init__(self, valor):
+        self.corpo = json.dumps(valor, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.etag = '"' + hashlib.sha256(self.corpo).hexdigest()[:32] + '"'
+        self._comprimidos = {}
+
+    def etag_para(self, codificacao):
+        if codificacao is None:
+            return self.etag
+        return self.etag[:-1] + SUFIXO_ETAG[codificacao] + '"'
+
+    def comprimido(self, codificacao):
+        if codificacao not in self._comprimidos:
+            if codificacao == 'br':
+                self._comprimidos[codificacao] = brotli.compress(self.corpo)
+            else:
+                self._comprimidos[codificacao] = gzip.compress(self.corpo, compresslevel=6)
+        return self._comprimidos[codificacao]
+
+
+def _etag_confere(if_none_match, etags):
+    # ETag de `etags` citado no If-None-Match (o cliente tem aquela representação), ou None
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == '*':
+        return etags[0]
+    # Aceita lista e ETags fracos (W/"...")
+    candidatos = {t.strip().removeprefix('W/') for t in if_none_match.split(',')}
+    return next((etag for etag in etags if etag in candidatos), None)
+
+
+def _escolher_codificacao(accept_encoding):
+    # Maior q entre as suportadas (empate: br antes de gzip); q=0 recusa e '*' vale para as não listadas
+    pesos = {}
+    for parte in (accept_encoding or '').split(','):
+        nome, *params = [p.strip() for p in parte.split(';')]
+        q = 1.0
+        for param in params:
+            if param.lower().startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if nome:
+            pesos[nome.lower()] = q
+    suportadas = ['br', 'gzip'] if brotli is not None else ['gzip']
+    q = {c: pesos.get(c, pesos.get('*', 0.0)) for c in suportadas}
+    melhor = max(suportadas, key=lambda c: q[c])
+    return melhor if q[melhor] > 0 else None
+
+
+def responder(request, pronta, max_age=60, headers=None):
+    # Corpos minúsculos não compensam a compressão
+    codificacao = _escolher_codificacao(request.headers.get('accept-encoding'))
+    if len(pronta.corpo) <= 512:
+        codificacao = None
+    cabecalhos = {
+        "ETag": pronta.etag_para(codificacao),
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate",
+        "Vary": "Accept-Encoding",
+        **(headers or {}),
+    }
+
+    # Qualquer representação do corpo atual que o cliente já tenha continua valendo
+    variantes = [cabecalhos["ETag"]] + [pronta.etag_para(c) for c in (None, *SUFIXO_ETAG) if c != codificacao]
+    confere = _etag_confere(request.headers.get('if-none-match'), variantes)
+    if confere is not None:
+        cabecalhos["ETag"] = confere
+        return Response(status_code=304, headers=cabecalhos)
+
+    if codificacao:
+        cabecalhos["Content-Encoding"] = codificacao
+        conteudo = pronta.comprimido(codificacao)
+    else:
+        conteudo = pronta.corpo
+
+    return Response(content=conteudo, media_type='application/json', headers=cabecalhos)
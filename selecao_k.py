@@ -0,0 +1,119 @@
+# selecao_k.py (Escolha automática do número de clusters)
+#
+# Ajusta um modelo para cada k do intervalo, um processo por k, usando a mesma
+# função de ajuste/persistência do dashboard (cada ajuste fica no armazém de
+# artefatos e é reaproveitado depois). Para cada k guarda:
+#   - inércia (curva do cotovelo; o k do cotovelo é o ponto mais distante da
+#     reta entre o primeiro e o último ponto da curva normalizada)
+#   - silhouette numa amostra fixa de linhas (o custo é O(amostra²), não O(linhas²))
+# O melhor k é o de maior silhouette (empate -> menor k).
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from atribuicao import AtribuidorArquetipos
+from colunar import ler_tabela
+from compartilhado import contexto_processos
+from preprocessamento import FEATURES_ARQUETIPOS, preparar_lifestyle
+
+# Intervalo de k e tamanho da amostra do silhouette (fazem parte da chave dos artefatos)
+SELECAO_K_PARAMS = {
+    "k_min": int(os.environ.get('SELECAO_K_MIN', 2)),
+    "k_max": int(os.environ.get('SELECAO_K_MAX', 8)),
+    "amostra_silhueta": int(os.environ.get('SELECAO_K_AMOSTRA', 10_000)),
+}
+SELECAO_K_WORKERS = int(os.environ.get('SELECAO_K_WORKERS', os.cpu_count() or 1))
+
+
+def amostra_features(filename, tamanho, random_state=42):
+    # Mesma limpeza de process_clusters (dropna na linha inteira); só as features
+    df = preparar_lifestyle(ler_tabela(filename), codificar=False)
+    cols = [c for c in FEATURES_ARQUETIPOS if c in df.columns]
+    rng = np.random.default_rng(random_state)
+    idx = np.sort(rng.choice(len(df), size=min(tamanho, len(df)), replace=False))
+    return df[cols].iloc[idx].to_numpy(dtype=np.float64)
+
+
+def avaliar_k(obter_modelo, filename, params, amostra, limitar_threads=False):
+    from sklearn.metrics import silhouette_score
+    from threadpoolctl import threadpool_limits
+
+    inicio = time.perf_counter()
+    # Vários processos em paralelo: cada um com uma thread só (sem disputa de núcleos)
+    with threadpool_limits(1 if limitar_threads else None):
+        modelo = obter_modelo(filename, params)
+        if modelo is None:
+            return None
+        atribuidor = AtribuidorArquetipos(modelo, {})
+        clusters, _ = atribuidor.atribuir_matriz(amostra)
+        validos = clusters >= 0
+        X = (amostra[validos] - atribuidor.media) / atribuidor.escala
+        clusters = clusters[validos]
+        n_rotulos = len(np.unique(clusters))
+        silhueta = float(silhouette_score(X, clusters)) if 1 < n_rotulos < len(clusters) else None
+
+    return {
+        "k": int(params["n_clusters"]),
+        "inertia": float(modelo["inertia"]),
+        "silhouette": silhueta,
+        "segundos": round(time.perf_counter() - inicio, 3),
+    }
+
+
+def k_cotovelo(ks, inercias):
+    if len(ks) < 3:
+        return int(ks[0]) if ks else None
+    x = np.asarray(ks, dtype=np.float64)
+    y = np.asarray(inercias, dtype=np.float64)
+    x = (x - x[0]) / (x[-1] - x[0])
+    amplitude = y[0] - y[-1]
+    y = (y[0] - y) / amplitude if amplitude > 0 else np.zeros_like(y)
+    # Curva crescente de 0 a 1: o cotovelo é onde ela mais se afasta da diagonal
+    return int(ks[int(np.argmax(y - x))])
+
+
+def varrer_k(obter_modelo, filename, params_base, k_min=2, k_max=8, amostra_silhueta=10_000, workers=None):
+    # obter_modelo(filename, params) -> arrays do modelo (ex.: api.obter_modelo_clusters)
+    if not os.path.exists(filename):
+        print(f"[Seleção k] ERRO: '{filename}' não encontrado.")
+        return None
+    inicio = time.perf_counter()
+    amostra = amostra_features(filename, amostra_silhueta, params_base.get("random_state", 42))
+    ks = list(range(max(2, k_min), max(2, k_max) + 1))
+    if len(amostra) <= ks[0]:
+        print(f"[Seleção k] AVISO: '{filename}' sem linhas válidas suficientes.")
+        return None
+    ks = [k for k in ks if k < len(amostra)]
+    tarefas = [(obter_modelo, filename, {**params_base, "n_clusters": k}, amostra) for k in ks]
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(ks)))
+    if workers == 1:
+        avaliacoes = [avaliar_k(*tarefa) for tarefa in tarefas]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=contexto_processos()) as executor:
+            futuros = [executor.submit(avaliar_k, *tarefa, True) for tarefa in tarefas]
+            avaliacoes = [f.result() for f in futuros]
+    avaliacoes = [a for a in avaliacoes if a is not None]
+    if not avaliacoes:
+        return None
+
+    com_silhueta = [a for a in avaliacoes if a["silhouette"] is not None]
+    melhor = max(com_silhueta, key=lambda a: (a["silhouette"], -a["k"]))["k"] if com_silhueta else None
+    cotovelo = k_cotovelo([a["k"] for a in avaliacoes], [a["inertia"] for a in avaliacoes])
+    total = time.perf_counter() - inicio
+    for a in avaliacoes:
+        silhueta = "-" if a["silhouette"] is None else f"{a['silhouette']:.4f}"
+        print(f"[Seleção k] k={a['k']}: inércia {a['inertia']:.1f}, silhouette {silhueta} ({a['segundos']:.2f}s)")
+    print(f"[Seleção k] Melhor k (silhouette): {melhor} | cotovelo: {cotovelo} | "
+          f"{len(avaliacoes)} ajustes em {total:.2f}s com {workers} processo(s)")
+
+    return {
+        "k_avaliados": avaliacoes,
+        "melhor_k": melhor if melhor is not None else cotovelo,
+        "k_cotovelo": cotovelo,
+        "criterio": "silhouette" if melhor is not None else "cotovelo",
+        "amostra_silhueta": int(len(amostra)),
+        "segundos": round(total, 3),
+    }
@@ -1,29 +1,12 @@
+import pandas as pd
+
+from preprocessamento import preparar_sintomas
+
 # --- DATASET 2: Dataset-Mental-Disorders.csv (Sintomas Clínicos) ---
 try:
-    df_clinical = pd.read_csv('Dataset-Mental-Disorders.csv')
-
-    # Remover coluna de ID se existir
-    if 'Patient Number' in df_clinical.columns:
-        df_clinical = df_clinical.drop('Patient Number', axis=1)
-
-    # Mapeamento manual para transformar texto em números (Ordem importa aqui)
-    freq_map = {'Seldom': 1, 'Sometimes': 2, 'Usually': 3, 'Most-Often': 4}
-    yes_no_map = {'YES': 1, 'NO': 0, 'YES ': 1} # Tratando espaços extras
-
-    # Aplicando mapeamentos
-    for col in df_clinical.columns:
-        if df_clinical[col].dtype == 'object':
-            # Tenta mapear frequência, se não der, tenta sim/não, se não, usa LabelEncoder
-            if df_clinical[col].iloc[0] in freq_map:
-                df_clinical[col] = df_clinical[col].map(freq_map)
-            elif df_clinical[col].iloc[0] in yes_no_map:
-                df_clinical[col] = df_clinical[col].map(yes_no_map)
-            else:
-                # Para a coluna alvo (Expert Diagnose) e outras mistas
-                le = LabelEncoder()
-                df_clinical[col] = le.fit_transform(df_clinical[col].astype(str))
-
-    df_clinical = df_clinical.fillna(0) # Tratar nulos residuais
+    # Remove o ID, converte frequência / sim-não / "X From 10" em números e codifica o
+    # diagnóstico (mesmos códigos do LabelEncoder), ver preprocessamento.py
+    df_clinical = preparar_sintomas(pd.read_csv('Dataset-Mental-Disorders.csv'), codificar_alvo=True)
     print("Dataset 2 (Clinical) Pré-processado. Shape:", df_clinical.shape)
 
 except Exception as e:
@@ -53,6 +53,9 @@ def plot_symptom_overlap_with_labels(df):
     print(f"- Observe a linha 'Normal': Ela deve ser a mais clara (valores baixos), indicando ausência de sintomas graves.")
     print(f"- Compare 'Normal' com 'Depression': A diferença na coluna 'Sadness' deve ser gritante.")
 
-# Executar
-if 'df_clinical' in globals():
-    plot_symptom_overlap_with_labels(df_clinical)
\ No newline at end of file
+# Executar (fora do notebook, carrega com o mesmo pré-processamento da API)
+if 'df_clinical' not in globals():
+    import pandas as pd
+    from preprocessamento import preparar_sintomas
+    df_clinical = preparar_sintomas(pd.read_csv('Dataset-Mental-Disorders.csv'), codificar_alvo=True)
+plot_symptom_overlap_with_labels(df_clinical)
\ No newline at end of file
@@ -0,0 +1,382 @@
+# versoes.py (Versões das análises, guardadas por conteúdo)
+#
+# Cada versão registrada (ex.: a exportação diária das clínicas) guarda o que
+# já foi calculado em partições independentes:
+#   - clusters:  resumo do K-Means (médias e tamanho de cada arquétipo, por nome)
+#   - sintomas:  uma linha da matriz do heatmap por diagnóstico
+#   - palavras:  contagens de termos de cada bloco de LINHAS_POR_BLOCO linhas do
+#                corpus, ainda sem o min_df (somadas na leitura da versão)
+# Cada partição é um objeto endereçado por conteúdo (objetos/<ab>/<hash>.npz|
+# .json.gz, comprimido) e o manifesto da versão (versoes/<id>.json) só lista os
+# hashes. Os blocos do corpus são endereçados pelo hash das próprias linhas: numa
+# exportação que só acrescenta frases, os blocos antigos já existem e só os do
+# fim são tokenizados e gravados. Um CSV que não mudou nem é relido: o manifesto
+# guarda o hash de origem de cada análise e reaproveita as partições da versão
+# anterior com a mesma origem. Ler uma versão ou comparar duas só lê objetos.
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from artefatos import gravar_atomico
+from importacao import modulo_tardio
+from linguistica import (MIN_DF, NGRAMAS, ContadorTermos, IndicePalavras, indice_de_parciais,
+                         normalizar_colunas_corpus)
+
+pd = modulo_tardio('pandas')
+
+DIRETORIO_VERSOES = os.environ.get('VERSOES_DIR', '.versoes')
+# Objetos lidos mantidos em memória (são imutáveis, então nunca ficam velhos)
+MAX_OBJETOS_EM_MEMORIA = int(os.environ.get('VERSOES_CACHE_OBJETOS', 512))
+# Linhas do corpus por partição; fixo para que os blocos antigos de um CSV que cresce se repitam
+LINHAS_POR_BLOCO = int(os.environ.get('VERSOES_LINHAS_POR_BLOCO', 50_000))
+
+ID_VALIDO = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+
+
+def hash_arrays(arrays):
+    h = hashlib.sha256()
+    for nome in sorted(arrays):
+        a = np.ascontiguousarray(arrays[nome])
+        h.update(f"{nome}|{a.dtype.str}|{a.shape}|".encode())
+        h.update(a.tobytes())
+    return h.hexdigest()[:32]
+
+
+def _json_canonico(dados):
+    return json.dumps(dados, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def hash_json(dados):
+    return hashlib.sha256(_json_canonico(dados)).hexdigest()[:32]
+
+
+class ArmazemVersoes:
+
+    def __init__(self, diretorio=DIRETORIO_VERSOES):
+        self.diretorio = diretorio
+        self._lock = threading.Lock()
+        self._objetos = OrderedDict()
+        self.gravados = 0
+        self.deduplicados = 0
+
+    # --- Objetos ---
+    def caminho_objeto(self, chave, ext):
+        return os.path.join(self.diretorio, 'objetos', chave[:2], f"{chave}.{ext}")
+
+    def existe(self, chave, ext):
+        return os.path.exists(self.caminho_objeto(chave, ext))
+
+    def _gravar_objeto(self, chave, ext, escrever):
+        destino = self.caminho_objeto(chave, ext)
+        if os.path.exists(destino):
+            self.deduplicados += 1
+            return chave
+        gravar_atomico(os.path.dirname(destino), destino, escrever)
+        self.gravados += 1
+        return chave
+
+    def salvar_arrays(self, arrays, chave=None):
+        # chave: endereço já conhecido (ex.: hash das linhas de origem); padrão = hash dos arrays
+        return self._gravar_objeto(chave or hash_arrays(arrays), 'npz', lambda f: np.savez_compressed(f, **arrays))
+
+    def salvar_json(self, dados):
+        corpo = gzip.compress(_json_canonico(dados), mtime=0)
+        return self._gravar_objeto(hash_json(dados), 'json.gz', lambda f: f.write(corpo))
+
+    def memorizar(self, chave, calcular):
+        # LRU dos objetos lidos e do que é derivado só deles (ex.: o índice somado de uma versão)
+        with self._lock:
+            if chave in self._objetos:
+                self._objetos.move_to_end(chave)
+                return self._objetos[chave]
+        dados = calcular()
+        with self._lock:
+            self._objetos[chave] = dados
+            while len(self._objetos) > MAX_OBJETOS_EM_MEMORIA:
+                self._objetos.popitem(last=False)
+        return dados
+
+    def _ler(self, chave, ext, carregar):
+        return self.memorizar((chave, ext), lambda: carregar(self.caminho_objeto(chave, ext)))
+
+    def ler_arrays(self, chave):
+        def carregar(caminho):
+            with np.load(caminho, allow_pickle=False) as dados:
+                return {k: dados[k] for k in dados.files}
+        return self._ler(chave, 'npz', carregar)
+
+    def ler_json(self, chave):
+        def carregar(caminho):
+            with gzip.open(caminho, 'rb') as f:
+                return json.loads(f.read())
+        return self._ler(chave, 'json.gz', carregar)
+
+    # --- Manifestos ---
+    def caminho_manifesto(self, id_versao):
+        return os.path.join(self.diretorio, 'versoes', f"{id_versao}.json")
+
+    def manifesto(self, id_versao):
+        if not ID_VALIDO.match(str(id_versao)):
+            return None
+        try:
+            with open(self.caminho_manifesto(id_versao), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def registrar(self, manifesto):
+        id_versao = manifesto["id"]
+        if not ID_VALIDO.match(id_versao):
+            raise ValueError(f"Id de versão inválido: '{id_versao}' (letras, números, '.', '_' e '-').")
+        destino = self.caminho_manifesto(id_versao)
+        if os.path.exists(destino):
+            raise FileExistsError(f"Versão '{id_versao}' já existe.")
+        corpo = json.dumps(manifesto, ensure_ascii=False, indent=1).encode('utf-8')
+        gravar_atomico(os.path.dirname(destino), destino, lambda f: f.write(corpo))
+        return manifesto
+
+    def listar(self, desde=None, ate=None):
+        # Manifestos em ordem de criação; desde/ate: prefixos ISO (ex.: '2026-01' ou '2026-01-31')
+        pasta = os.path.join(self.diretorio, 'versoes')
+        if not os.path.isdir(pasta):
+            return []
+        manifestos = []
+        for nome in os.listdir(pasta):
+            if nome.endswith('.json'):
+                m = self.manifesto(nome[:-5])
+                if m is not None:
+                    manifestos.append(m)
+        manifestos.sort(key=lambda m: m["criado_em"])
+        if desde:
+            manifestos = [m for m in manifestos if m["criado_em"][:len(desde)] >= desde]
+        if ate:
+            manifestos = [m for m in manifestos if m["criado_em"][:len(ate)] <= ate]
+        return manifestos
+
+    def partes_de_origem(self, analise, origem):
+        # Partições de uma versão anterior calculada a partir do mesmo CSV + parâmetros
+        for m in reversed(self.listar()):
+            if m["origens"].get(analise) == origem and m["partes"].get(analise) is not None:
+                return m["partes"][analise]
+        return None
+
+    def stats(self):
+        objetos, tamanho = 0, 0
+        tamanhos = {}
+        for raiz, _, arquivos in os.walk(os.path.join(self.diretorio, 'objetos')):
+            for nome in arquivos:
+                if nome.endswith('.tmp'):
+                    continue
+                n = os.path.getsize(os.path.join(raiz, nome))
+                tamanhos[nome.split('.')[0]] = n
+                objetos += 1
+                tamanho += n
+        versoes = self.listar()
+        referencias = [h for m in versoes for h in hashes_das_partes(m["partes"])]
+        return {
+            "versoes": len(versoes),
+            "objetos": objetos,
+            "bytes": tamanho,
+            # Quanto ocuparia guardar cada versão inteira, sem deduplicar partições
+            "bytes_sem_deduplicacao": sum(tamanhos.get(h, 0) for h in referencias),
+            "referencias": len(referencias),
+            "gravados": self.gravados,
+            "deduplicados": self.deduplicados,
+        }
+
+
+def hashes_das_partes(partes):
+    for valor in partes.values():
+        if isinstance(valor, dict):
+            yield from valor.values()
+        elif isinstance(valor, list):
+            yield from valor
+        elif valor is not None:
+            yield valor
+
+
+def agora_iso():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def id_automatico():
+    return datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+
+
+# --- Partições de cada análise ---
+def partes_clusters(nomes, cols, summary, tamanhos):
+    # Uma partição: linhas na ordem dos nomes de arquétipo (os ids do K-Means mudam entre ajustes)
+    return {"nomes": np.array(nomes, dtype=str), "cols": np.array(cols, dtype=str),
+            "summary": np.asarray(summary, dtype=np.float64), "tamanhos": np.asarray(tamanhos, dtype=np.int64)}
+
+
+def salvar_clusters(armazem, clusters):
+    return None if clusters is None else armazem.salvar_arrays(clusters)
+
+
+def salvar_sintomas(armazem, sintomas):
+    # Uma partição por diagnóstico (as já existentes só são referenciadas)
+    if sintomas is None:
+        return None
+    return {
+        diag: armazem.salvar_json({"diagnosis": diag, "symptoms": sintomas["symptoms"], "valores": linha})
+        for diag, linha in zip(sintomas["diagnoses"], sintomas["matrix"])
+    }
+
+
+def salvar_blocos_corpus(armazem, filename, final_stops, ngramas=NGRAMAS, linhas_por_bloco=None):
+    # Hash das linhas de cada bloco -> contagens de termos do bloco; só os blocos
+    # que ainda não existem no armazém são tokenizados
+    linhas_por_bloco = linhas_por_bloco or LINHAS_POR_BLOCO
+    params = _json_canonico({"stops": sorted(final_stops), "ngramas": list(ngramas)})
+    blocos, tokenizados = [], 0
+    with pd.read_csv(filename, chunksize=linhas_por_bloco) as leitor:
+        for chunk in leitor:
+            chunk = normalizar_colunas_corpus(chunk)
+            h = hashlib.sha256(params)
+            h.update(pd.util.hash_pandas_object(chunk[['status', 'clean_statement']], index=False).to_numpy().tobytes())
+            chave = h.hexdigest()[:32]
+            if not armazem.existe(chave, 'npz'):
+                contador = ContadorTermos(final_stops, ngramas)
+                for status, grupo in chunk.groupby('status', sort=False):
+                    contador.adicionar(str(status), grupo['clean_statement'].astype(str))
+                armazem.salvar_arrays(contador.para_arrays(), chave)
+                tokenizados += 1
+            else:
+                armazem.deduplicados += 1
+            blocos.append(chave)
+    return blocos, tokenizados
+
+
+def ler_clusters(armazem, chave):
+    if chave is None:
+        return None
+    arrays = armazem.ler_arrays(chave)
+    cols = [str(c) for c in arrays["cols"]]
+    return {
+        str(nome): {"tamanho": int(n), "metricas": dict(zip(cols, (float(v) for v in linha)))}
+        for nome, linha, n in zip(arrays["nomes"], arrays["summary"], arrays["tamanhos"])
+    }
+
+
+def ler_sintomas(armazem, partes):
+    # Mesmo formato do /api/sintomas-heatmap
+    if partes is None:
+        return None
+    linhas = [armazem.ler_json(h) for h in partes.values()]
+    matriz = [linha["valores"] for linha in linhas]
+    return {
+        "symptoms": linhas[0]["symptoms"] if linhas else [],
+        "diagnoses": [linha["diagnosis"] for linha in linhas],
+        "matrix": matriz,
+        "min_val": 0,
+        "max_val": float(max((max(l) for l in matriz if l), default=0.0)),
+    }
+
+
+def ler_indice(armazem, blocos, min_df=MIN_DF):
+    if blocos is None:
+        return None
+    return armazem.memorizar(("indice", tuple(blocos), min_df),
+                             lambda: indice_de_parciais((armazem.ler_arrays(h) for h in blocos), min_df))
+
+
+# --- Diferença entre versões (só a partir das partições gravadas) ---
+def _diferenca_clusters(a, b):
+    if a is None or b is None:
+        return None
+    comuns = [n for n in a if n in b]
+    return {
+        "arquetipos": {
+            nome: {
+                "tamanho": b[nome]["tamanho"] - a[nome]["tamanho"],
+                "metricas": {col: round(b[nome]["metricas"][col] - v, 4)
+                             for col, v in a[nome]["metricas"].items() if col in b[nome]["metricas"]},
+            }
+            for nome in comuns
+        },
+        "novos": [n for n in b if n not in a],
+        "removidos": [n for n in a if n not in b],
+    }
+
+
+def _diferenca_sintomas(armazem, partes_a, partes_b):
+    if partes_a is None or partes_b is None:
+        return None
+    alteradas = [d for d in partes_b if d in partes_a and partes_a[d] != partes_b[d]]
+    pares = {d: (armazem.ler_json(partes_a[d]), armazem.ler_json(partes_b[d])) for d in alteradas}
+    # Uma lista só para todas as linhas: os sintomas presentes nas duas versões, na ordem de b
+    # (as partições de uma versão têm as mesmas colunas; sem alteradas, vale a primeira de cada)
+    if pares:
+        listas = [p["symptoms"] for par in pares.values() for p in par]
+    else:
+        listas = [armazem.ler_json(next(iter(partes.values())))["symptoms"]
+                  for partes in (partes_a, partes_b) if partes]
+    comuns = set.intersection(*map(set, listas)) if listas else set()
+    sintomas = [s for s in listas[-1] if s in comuns] if listas else []
+    linhas = {}
+    for diag, (la, lb) in pares.items():
+        pos_a = {s: i for i, s in enumerate(la["symptoms"])}
+        pos_b = {s: i for i, s in enumerate(lb["symptoms"])}
+        linhas[diag] = [round(lb["valores"][pos_b[s]] - la["valores"][pos_a[s]], 4) for s in sintomas]
+    return {
+        "symptoms": sintomas,
+        "alteradas": linhas,
+        "inalteradas": [d for d in partes_b if d in partes_a and partes_a[d] == partes_b[d]],
+        "novos": [d for d in partes_b if d not in partes_a],
+        "removidos": [d for d in partes_a if d not in partes_b],
+    }
+
+
+def _diferenca_termos(linha_a, linha_b, top):
+    # Variação da frequência relativa (por mil termos) de cada termo da classe
+    indice = IndicePalavras.de_linhas({"a": linha_a, "b": linha_b})
+    freq = indice.contagens.toarray() / np.maximum(indice.totais, 1)[:, None] * 1000
+    delta = freq[1] - freq[0]
+
+    def escolher(ordem):
+        return [{"word": str(indice.vocab[j]), "delta": round(float(delta[j]), 3)}
+                for j in ordem[:top] if delta[j] != 0]
+    ordem = np.lexsort((indice.vocab, -delta))
+    return {"sobe": escolher(ordem), "desce": escolher(np.lexsort((indice.vocab, delta)))}
+
+
+def _diferenca_palavras(armazem, blocos_a, blocos_b, min_df_a, min_df_b, top):
+    if blocos_a is None or blocos_b is None:
+        return None
+    a, b = ler_indice(armazem, blocos_a, min_df_a), ler_indice(armazem, blocos_b, min_df_b)
+    alteradas, inalteradas = {}, []
+    for classe in b.classes:
+        i = a.resolver_classe(classe)
+        if i is None:
+            continue
+        linha_a, linha_b = a.linha(i), b.linha(b.classes.index(classe))
+        if all(np.array_equal(linha_a[k], linha_b[k]) for k in linha_a):
+            inalteradas.append(classe)
+        else:
+            alteradas[classe] = _diferenca_termos(linha_a, linha_b, top)
+    return {
+        "alteradas": alteradas,
+        "inalteradas": inalteradas,
+        "novas": [c for c in b.classes if c not in a.classes],
+        "removidas": [c for c in a.classes if c not in b.classes],
+    }
+
+
+def diferenca_versoes(armazem, manifesto_a, manifesto_b, top=15):
+    pa, pb = manifesto_a["partes"], manifesto_b["partes"]
+    return {
+        "de": manifesto_a["id"],
+        "para": manifesto_b["id"],
+        "clusters": _diferenca_clusters(ler_clusters(armazem, pa["clusters"]), ler_clusters(armazem, pb["clusters"])),
+        "sintomas": _diferenca_sintomas(armazem, pa["sintomas"], pb["sintomas"]),
+        "palavras": _diferenca_palavras(armazem, pa["palavras"], pb["palavras"],
+                                        manifesto_a["min_df"], manifesto_b["min_df"], top),
+    }
@@ -0,0 +1,354 @@
+# vizinhos.py (Pacientes mais parecidos com um perfil de sintomas)
+#
+# Índice exato de vizinhos sobre uma matriz int8: cada paciente vira uma linha
+# com os sintomas codificados como em preprocessamento.py (frequência 1..4,
+# sim/não 0/1, "3 From 10" -> 3). Um milhão de pacientes com 17 sintomas ocupam
+# 17 MB, mapeados do armazém compartilhado por todos os workers.
+#
+# Distância euclidiana com cada sintoma dividido pela sua faixa (uma escala 0..10
+# não pesa mais que um sim/não); sintoma não informado no perfil fica fora da
+# conta. Os pesos 1/faixa² são multiplicados pelo mmc das faixas², então as
+# distâncias ao quadrado são inteiros exatos mesmo em float32, e no empate fica o
+# paciente que vem antes no arquivo.
+#
+# As linhas ficam agrupadas em células pelos valores dos sintomas de maior peso
+# (os sim/não, depois as frequências; até MAX_CELULAS células). A parte da
+# distância que vem desses sintomas é a mesma para a célula inteira e é um piso
+# exato para as linhas dela: a consulta visita as células da menor para a maior
+# e para quando o piso passa do k-ésimo melhor já encontrado. Dentro das
+# células, d² = Σw·x² - 2·Σw·q·x + Σw·q² é um produto de matrizes. Perfis sem
+# nenhum sintoma das células não têm piso útil e vão juntos numa varredura em
+# blocos (bloco x consultas). Uma árvore KD também poda bem perfis completos, mas
+# não atende perfis parciais (cada combinação de sintomas informados pediria
+# outra árvore) e guarda os pontos em float64, 8x a matriz int8.
+import math
+import os
+
+import numpy as np
+
+from importacao import modulo_tardio
+from preprocessamento import (ALVO_SINTOMAS, COLUNAS_ID, fatorar, inferir_esquema, interpretar_valor,
+                              normalizar_colunas_sintomas, preparar_sintomas)
+
+pd = modulo_tardio('pandas')
+
+VIZINHOS_K = int(os.environ.get('VIZINHOS_K', 10))
+VIZINHOS_MAX_K = int(os.environ.get('VIZINHOS_MAX_K', 100))
+VIZINHOS_MAX_CONSULTAS = int(os.environ.get('VIZINHOS_MAX_CONSULTAS', 1000))
+MAX_CELULAS = int(os.environ.get('VIZINHOS_MAX_CELULAS', 4096))
+# Linhas por bloco na varredura; com muitas consultas o bloco encolhe para a
+# matriz de distâncias (linhas x consultas, float32) caber em ELEMENTOS_BLOCO
+TAMANHO_BLOCO = int(os.environ.get('VIZINHOS_BLOCO', 65_536))
+ELEMENTOS_BLOCO = 4 * 2 ** 20
+# Linhas do primeiro passo pelas células (cada passo seguinte dobra)
+LINHAS_POR_PASSO = 2048
+MIN_LINHAS_CELULAS = 8 * LINHAS_POR_PASSO
+
+# Faixa conhecida de cada tipo (escala: 0..máximo); 'numerica' usa a observada
+FAIXAS_TIPO = {'frequencia': (1, 4), 'sim_nao': (0, 1)}
+# Inteiros até 2^24 são exatos em float32
+LIMITE_EXATO = 2 ** 24
+
+
+def _faixa(tipo, maximo, valores):
+    lo, hi = FAIXAS_TIPO.get(tipo, (0, maximo) if tipo == 'escala' else (None, None))
+    if len(valores):
+        lo = min(lo, valores.min()) if lo is not None else valores.min()
+        hi = max(hi, valores.max()) if hi is not None else valores.max()
+    return int(lo or 0), int(hi or 0)
+
+
+def _pesos(minimos, maximos):
+    # -> (pesos inteiros, escala) com pesos[j] = escala / faixa[j]²; as consultas são
+    # limitadas a uma faixa além de cada lado, e todas as somas parciais do produto de
+    # matrizes precisam ficar abaixo de LIMITE_EXATO
+    faixas = np.maximum(maximos - minimos, 1).astype(np.int64)
+    alcance = np.maximum(np.abs(minimos - faixas), np.abs(maximos + faixas))
+    amplitude = np.maximum(np.abs(minimos), np.abs(maximos)) + alcance
+    escala = 1
+    for f in faixas:
+        escala = math.lcm(escala, int(f) ** 2)
+    if escala * float((amplitude ** 2 / faixas ** 2).sum()) >= LIMITE_EXATO:
+        # Faixas grandes (colunas numéricas): pesos arredondados, ainda inteiros
+        escala = int(LIMITE_EXATO / (amplitude ** 2 / faixas ** 2).sum() / 2)
+    pesos = np.maximum(np.round(escala / faixas ** 2), 1).astype(np.int64)
+    return pesos, escala
+
+
+def _colunas_chave(pesos, dominios, max_celulas=MAX_CELULAS):
+    # Sintomas que definem as células: maior peso por passo primeiro, enquanto o
+    # produto dos domínios couber em max_celulas
+    chaves, celulas = [], 1
+    for j in np.argsort(-pesos, kind='stable'):
+        if celulas * dominios[j] <= max_celulas:
+            chaves.append(int(j))
+            celulas *= int(dominios[j])
+    return np.array(sorted(chaves), dtype=np.int64)
+
+
+class IndiceVizinhos:
+
+    def __init__(self, sintomas, tipos, minimos, maximos, chaves, matriz, linhas, inicios,
+                 diagnosticos, classes, pacientes):
+        self.sintomas = [str(s) for s in sintomas]
+        self.tipos = [str(t) for t in tipos]
+        self.minimos = np.asarray(minimos, dtype=np.int64)
+        self.maximos = np.asarray(maximos, dtype=np.int64)
+        self.chaves = np.asarray(chaves, dtype=np.int64)   # sintomas que definem as células
+        self.matriz = matriz                  # (pacientes, sintomas) int8, agrupada por célula
+        self.linhas = linhas                  # linha original (ordem do CSV) de cada linha da matriz
+        self.inicios = inicios                # célula c = matriz[inicios[c]:inicios[c + 1]]
+        self.diagnosticos = diagnosticos      # por linha original; códigos em classes, -1 = sem diagnóstico
+        self.classes = [str(c) for c in classes]
+        self.pacientes = pacientes            # por linha original; ids em UTF-8 (bytes)
+        self.pesos, self.escala = _pesos(self.minimos, self.maximos)
+        self._colunas = {s: j for j, s in enumerate(self.sintomas)}
+
+        # Células não vazias e os valores dos sintomas-chave de cada uma
+        inicios = np.asarray(inicios, dtype=np.int64)
+        self._celulas = np.flatnonzero(np.diff(inicios) > 0)
+        dominios = (self.maximos - self.minimos + 1)[self.chaves]
+        valores = np.empty((len(self._celulas), len(self.chaves)), dtype=np.int64)
+        resto = self._celulas.copy()
+        for pos in range(len(self.chaves) - 1, -1, -1):
+            valores[:, pos] = resto % dominios[pos] + self.minimos[self.chaves[pos]]
+            resto //= dominios[pos]
+        self._valores_celula = valores
+        self._faixas_celula = np.column_stack([inicios[self._celulas], inicios[self._celulas + 1]])
+
+    @classmethod
+    def construir(cls, df, alvo=ALVO_SINTOMAS, max_celulas=MAX_CELULAS):
+        df = normalizar_colunas_sintomas(df)
+        ids = next((c for c in df.columns if c in COLUNAS_ID), None)
+        esquema = inferir_esquema(df, ignorar=set(COLUNAS_ID) | {alvo})
+        numeros = preparar_sintomas(df, alvo=alvo, preencher=None, esquema=esquema)
+
+        sintomas, tipos, minimos, maximos, colunas = [], [], [], [], []
+        for col, (tipo, maximo) in esquema.items():
+            if tipo == 'categorica':
+                continue
+            valores = numeros[col].to_numpy(dtype=np.float64)
+            ausentes = np.isnan(valores)
+            presentes = valores[~ausentes]
+            if (presentes != np.round(presentes)).any() or len(presentes) and (
+                    presentes.min() < -127 or presentes.max() > 127):
+                print(f"[Vizinhos] '{col}' fora do índice (valores não inteiros ou fora do int8).")
+                continue
+            lo, hi = _faixa(tipo, maximo, presentes)
+            if ausentes.any():
+                # Ausente conta como o valor típico da coluna
+                valores[ausentes] = np.round(np.median(presentes)) if len(presentes) else lo
+            sintomas.append(col)
+            tipos.append(tipo)
+            minimos.append(lo)
+            maximos.append(hi)
+            colunas.append(valores.astype(np.int8))
+        if not sintomas:
+            return None
+        minimos, maximos = np.array(minimos, dtype=np.int64), np.array(maximos, dtype=np.int64)
+        matriz = np.column_stack(colunas)
+
+        # Célula de cada linha (número misto nos domínios dos sintomas-chave); a ordenação
+        # estável mantém a ordem do CSV dentro de cada célula
+        pesos, _ = _pesos(minimos, maximos)
+        dominios = maximos - minimos + 1
+        chaves = _colunas_chave(pesos, dominios, max_celulas)
+        celula = np.zeros(len(matriz), dtype=np.int64)
+        for j in chaves:
+            celula = celula * dominios[j] + (matriz[:, j].astype(np.int64) - minimos[j])
+        ordem = np.argsort(celula, kind='stable')
+        total = int(np.prod(dominios[chaves]))
+        inicios = np.zeros(total + 1, dtype=np.int64)
+        np.cumsum(np.bincount(celula, minlength=total), out=inicios[1:])
+
+        if alvo in df.columns:
+            # Rótulos sem espaços nas pontas ('Depression ' e 'Depression' juntos), em ordem alfabética
+            codigos, distintos = fatorar(df[alvo])
+            rotulos = [str(v).strip() for v in distintos]
+            classes = sorted(set(rotulos))
+            tabela = np.array([classes.index(r) for r in rotulos] + [-1], dtype=np.int16)
+            diagnosticos = tabela[codigos]
+        else:
+            classes, diagnosticos = [], np.full(len(df), -1, dtype=np.int16)
+
+        if ids is not None:
+            pacientes = np.char.encode(df[ids].astype(str).to_numpy(dtype=str), 'utf-8')
+        else:
+            pacientes = np.char.encode(np.arange(len(df)).astype(str), 'utf-8')
+        return cls(sintomas, tipos, minimos, maximos, chaves, np.ascontiguousarray(matriz[ordem]),
+                   ordem.astype(np.int32 if len(ordem) < 2 ** 31 else np.int64), inicios,
+                   diagnosticos, classes, pacientes)
+
+    def para_arrays(self):
+        return {
+            "sintomas": np.array(self.sintomas, dtype=str),
+            "tipos": np.array(self.tipos, dtype=str),
+            "minimos": self.minimos,
+            "maximos": self.maximos,
+            "chaves": self.chaves,
+            "matriz": self.matriz,
+            "linhas": self.linhas,
+            "inicios": self.inicios,
+            "diagnosticos": self.diagnosticos,
+            "classes": np.array(self.classes, dtype=str),
+            "pacientes": self.pacientes,
+        }
+
+    @classmethod
+    def de_arrays(cls, arrays):
+        return cls(*(arrays[nome] for nome in ("sintomas", "tipos", "minimos", "maximos", "chaves", "matriz",
+                                               "linhas", "inicios", "diagnosticos", "classes", "pacientes")))
+
+    # --- Consultas ---
+    def codificar(self, perfis):
+        # DataFrame de perfis (nomes do CSV ou já renomeados; texto ou números) ->
+        # (consultas (B, sintomas) int64, informados (B, sintomas) bool)
+        perfis = normalizar_colunas_sintomas(perfis)
+        desconhecidos = [c for c in perfis.columns
+                         if c not in self._colunas and c not in COLUNAS_ID and c != ALVO_SINTOMAS]
+        if desconhecidos:
+            raise ValueError(f"Sintomas desconhecidos: {desconhecidos}. Disponíveis: {self.sintomas}")
+        if len(perfis) > VIZINHOS_MAX_CONSULTAS:
+            raise ValueError(f"No máximo {VIZINHOS_MAX_CONSULTAS} perfis por requisição.")
+        valores = np.full((len(perfis), len(self.sintomas)), np.nan)
+        for col in perfis.columns:
+            j = self._colunas.get(col)
+            if j is not None:
+                valores[:, j] = [interpretar_valor(v, self.tipos[j]) for v in perfis[col].tolist()]
+        informados = ~np.isnan(valores)
+        if len(perfis) and not informados.any(axis=1).all():
+            raise ValueError("Cada perfil precisa de pelo menos um sintoma reconhecido.")
+        # Uma faixa além de cada lado no máximo (ver _pesos), na grade inteira do índice
+        faixas = np.maximum(self.maximos - self.minimos, 1)
+        consultas = np.clip(np.round(np.where(informados, valores, 0)),
+                            self.minimos - faixas, self.maximos + faixas).astype(np.int64)
+        return consultas, informados
+
+    def buscar(self, consultas, informados, k=VIZINHOS_K):
+        # -> (d² inteiros (B, k), linhas originais (B, k)) em ordem de distância e, no
+        # empate, de linha; com menos de k pacientes sobram colunas com linha -1
+        lote = len(consultas)
+        pesos = self.pesos * informados
+        melhores_d = np.full((lote, k), np.inf, dtype=np.float32)
+        melhores_i = np.full((lote, k), -1, dtype=np.int64)
+        # Índice pequeno: uma varredura para o lote todo custa menos que andar pelas células
+        com_piso = pesos[:, self.chaves].any(axis=1) & (len(self.matriz) > MIN_LINHAS_CELULAS)
+        for b in np.flatnonzero(com_piso):
+            self._percorrer_celulas(consultas[b], pesos[b], melhores_d[b:b + 1], melhores_i[b:b + 1])
+        sem_piso = np.flatnonzero(~com_piso)
+        if len(sem_piso):
+            d, i = melhores_d[sem_piso], melhores_i[sem_piso]
+            self._varrer(consultas[sem_piso], pesos[sem_piso], d, i)
+            melhores_d[sem_piso], melhores_i[sem_piso] = d, i
+        return np.where(melhores_i >= 0, melhores_d, 0).astype(np.int64), melhores_i
+
+    @staticmethod
+    def _termos(consultas, pesos):
+        # Coeficientes de x² e de x e a constante Σw·q² de cada consulta
+        return (pesos.T.astype(np.float32), (-2 * pesos * consultas).T.astype(np.float32),
+                (pesos * consultas ** 2).sum(axis=1).astype(np.float32))
+
+    @staticmethod
+    def _distancias(parte, termos, buffer):
+        # buffer: (2, linhas, sintomas) float32; x e x² em metades contíguas
+        m = len(parte)
+        x, x2 = buffer[1, :m], buffer[0, :m]
+        np.copyto(x, parte, casting='unsafe')
+        np.multiply(x, x, out=x2)
+        dist = x2 @ termos[0]
+        dist += x @ termos[1]
+        dist += termos[2]
+        return dist
+
+    def _percorrer_celulas(self, consulta, pesos, melhores_d, melhores_i):
+        # Uma consulta: células em ordem de piso, até o piso passar do k-ésimo melhor
+        # (igual não basta: uma linha anterior com a mesma distância ainda entraria).
+        # Cada passo avalia o prefixo seguinte de células, com o dobro de linhas do anterior
+        pisos = ((self._valores_celula - consulta[self.chaves]) ** 2) @ pesos[self.chaves]
+        ordem = np.argsort(pisos, kind='stable')
+        pisos = pisos[ordem]
+        faixas = self._faixas_celula[ordem]
+        acumuladas = np.cumsum(faixas[:, 1] - faixas[:, 0])
+        termos = self._termos(consulta[None, :], pesos[None, :])
+        buffer = np.empty((2, LINHAS_POR_PASSO, self.matriz.shape[1]), dtype=np.float32)
+        ini, passo = 0, LINHAS_POR_PASSO
+        while ini < len(ordem) and pisos[ini] <= melhores_d[0, -1]:
+            base = acumuladas[ini - 1] if ini else 0
+            fim = int(np.searchsorted(acumuladas, base + passo)) + 1
+            fim = min(fim, int(np.searchsorted(pisos, melhores_d[0, -1], side='right')))
+            parte, linhas = self._linhas_celulas(faixas[ini:fim])
+            if len(parte) > buffer.shape[1]:
+                buffer = np.empty((2, len(parte), self.matriz.shape[1]), dtype=np.float32)
+            self._selecionar(self._distancias(parte, termos, buffer), linhas, melhores_d, melhores_i)
+            ini, passo = fim, 2 * passo
+
+    def _linhas_celulas(self, faixas):
+        # Linhas (matriz, linha original) das células [ini, fim) em sequência
+        if len(faixas) == 1:
+            ini, fim = faixas[0]
+            return self.matriz[ini:fim], self.linhas[ini:fim]
+        tamanhos = faixas[:, 1] - faixas[:, 0]
+        deslocamento = np.repeat(faixas[:, 0] - (np.cumsum(tamanhos) - tamanhos), tamanhos)
+        posicoes = deslocamento + np.arange(len(deslocamento))
+        return self.matriz[posicoes], self.linhas[posicoes]
+
+    def _varrer(self, consultas, pesos, melhores_d, melhores_i):
+        # Várias consultas de uma vez sobre a matriz inteira, em blocos
+        n, lote = len(self.matriz), len(consultas)
+        termos = self._termos(consultas, pesos)
+        bloco = max(1024, min(TAMANHO_BLOCO, ELEMENTOS_BLOCO // max(lote, 1)))
+        buffer = np.empty((2, min(bloco, n), self.matriz.shape[1]), dtype=np.float32)
+        for ini in range(0, n, bloco):
+            dist = self._distancias(self.matriz[ini:ini + bloco], termos, buffer)
+            self._selecionar(dist, self.linhas[ini:ini + bloco], melhores_d, melhores_i)
+
+    @staticmethod
+    def _selecionar(dist, linhas, melhores_d, melhores_i):
+        # dist: (linhas do passo, consultas). Entra quem vem antes do k-ésimo atual por
+        # (distância, linha original); se forem muitos, só os k menores de cada consulta
+        lote, k = melhores_d.shape
+        limite = melhores_d[:, -1]
+        mascara = dist <= limite
+        if np.count_nonzero(mascara) > 4 * k * lote and len(dist) > k:
+            mascara &= dist <= np.partition(dist, k - 1, axis=0)[k - 1]
+        plano = np.flatnonzero(mascara)
+        pos, consultas = np.divmod(plano, lote)
+        d, i = dist.ravel()[plano], linhas[pos].astype(np.int64)
+        # Empatado com o k-ésimo só entra se a linha original vier antes
+        fica = (d < limite[consultas]) | (i < melhores_i[consultas, -1])
+        if not fica.all():
+            consultas, d, i = consultas[fica], d[fica], i[fica]
+        if not len(d):
+            return
+        # Junta com os atuais e fica com os k primeiros de cada consulta
+        q = np.concatenate([np.repeat(np.arange(lote), k), consultas])
+        d = np.concatenate([melhores_d.ravel(), d])
+        i = np.concatenate([melhores_i.ravel(), i])
+        # Vagas ainda vazias (linha -1, distância infinita) vão para o fim
+        ordem = np.lexsort((np.where(i < 0, np.iinfo(np.int64).max, i), d, q))
+        q, d, i = q[ordem], d[ordem], i[ordem]
+        posto = np.arange(len(q)) - np.searchsorted(q, np.arange(lote))[q]
+        manter = posto < k
+        melhores_d[q[manter], posto[manter]] = d[manter]
+        melhores_i[q[manter], posto[manter]] = i[manter]
+
+    def consultar(self, consultas, informados, k=VIZINHOS_K):
+        d2, linhas = self.buscar(consultas, informados, k)
+        resultados = []
+        for dq, lq in zip(d2, linhas):
+            validas = lq >= 0
+            dq, lq = dq[validas], lq[validas]
+            codigos = self.diagnosticos[lq]
+            vizinhos = [
+                {"patient": self.pacientes[i].decode('utf-8'),
+                 "diagnosis": self.classes[c] if c >= 0 else None,
+                 "distance": round(math.sqrt(max(float(dd), 0.0) / self.escala), 6)}
+                for i, c, dd in zip(lq.tolist(), codigos.tolist(), dq.tolist())
+            ]
+            contagem = np.bincount(codigos[codigos >= 0], minlength=len(self.classes))
+            resultados.append({
+                "neighbors": vizinhos,
+                "diagnoses": {c: round(int(v) / len(lq), 4) for c, v in zip(self.classes, contagem) if v}
+                if len(lq) else {},
+            })
+        return resultados